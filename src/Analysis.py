@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from typing import Iterable, Iterator, List
+
+from Chessboard import Game
+import Notation
+
+
+def analyse(fen: str, include_moves: bool = True) -> dict:
+    """Report check, checkmate, stalemate and the legal moves of a FEN position."""
+    try:
+        game = Game.from_fen(fen)
+    except ValueError as error:
+        return {"fen": fen, "error": str(error)}
+
+    color = game.current_turn
+    moves = game.legal_moves(color)
+    in_check = game.is_check(color)
+    result = {
+        "fen": fen,
+        "check": in_check,
+        "checkmate": in_check and not moves,
+        "stalemate": not in_check and not moves,
+        "legal_move_count": len(moves),
+    }
+    if include_moves:
+        result["legal_moves"] = [
+            Notation.format_move(move.start, move.end, "Q" if move.is_promotion else None)
+            for move in moves.values()
+        ]
+    return result
+
+
+def analyse_chunk(fens: List[str], include_moves: bool = True) -> List[dict]:
+    return [analyse(fen, include_moves) for fen in fens]
+
+
+def analyse_stream(
+    fens: Iterable[str],
+    processes: int = None,
+    chunk_size: int = 256,
+    max_pending: int = None,
+    include_moves: bool = True,
+) -> Iterator[dict]:
+    """Analyse a stream of FEN positions in a process pool, yielding results in input order.
+
+    At most max_pending chunks (default: twice the number of processes) are
+    in flight, so the input is only read as fast as results are consumed.
+    With processes=0 everything runs in the calling process.
+    """
+    fens = iter(fens)
+    chunks = iter(lambda: list(islice(fens, chunk_size)), [])
+    if processes == 0:
+        for chunk in chunks:
+            yield from analyse_chunk(chunk, include_moves)
+        return
+
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or 2 * processes
+    with Pool(processes) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(analyse_chunk, (chunk, include_moves)))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def main(argv: List[str] = None) -> None:
+    """Read FEN positions, one per line, and write one JSON result per line."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("input", nargs="?", default="-", help="FEN file, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file, - for stdout")
+    parser.add_argument("-p", "--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--no-moves", action="store_true", help="only report the move count")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    target = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        fens = (line.strip() for line in source if line.strip())
+        results = analyse_stream(
+            fens, args.processes, args.chunk_size, include_moves=not args.no_moves
+        )
+        for result in results:
+            target.write(json.dumps(result) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+
+if __name__ == "__main__":
+    main()
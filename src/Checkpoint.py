@@ -0,0 +1,116 @@
+import gc
+import mmap
+import os
+import struct
+from array import array
+from typing import Iterable, List
+
+from Chessboard import Game
+import MoveCode
+from Piece import SQUARE_POSITIONS
+from PositionRecord import CODE_PIECES, PIECE_CODES, PIECE_TYPES, RECORD_SIZE
+
+
+# File layout:
+#   header      magic, version, game count, offset of the game table
+#   games       one entry per game, see encode_game
+#   game table  uint64 offset of every game entry
+MAGIC = b"CPCK"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxIQ")
+
+# Game entry: position record, move count, keyframe count, then the moves
+# and the keyframe records
+GAME = struct.Struct(f"<{RECORD_SIZE}sIH")
+# Logged move: MoveCode move, square code of the piece, type of the captured piece + 1 or 0
+LOGGED_MOVE = struct.Struct("<IBB")
+
+_TYPE_INDEX = {piece_type.__name__: i for i, piece_type in enumerate(PIECE_TYPES)}
+_PIECE_NAMES = [piece_type.__name__ for piece_type in PIECE_TYPES]
+
+# Buffer size of the checkpoint writer
+_WRITE_BUFFER = 1 << 20
+
+
+def encode_game(game: Game) -> bytes:
+    """Encode the position, move log and keyframes of a game."""
+    parts = [GAME.pack(game.to_record(), len(game.move_log), len(game._keyframes))]
+    pack = LOGGED_MOVE.pack
+    for entry in game.move_log:
+        piece = PIECE_CODES[(PIECE_TYPES[_TYPE_INDEX[entry['piece']]], entry['color'])]
+        captured = entry['captured']
+        parts.append(pack(entry['code'], piece, _TYPE_INDEX[captured] + 1 if captured else 0))
+    parts.extend(game._keyframes)
+    return b"".join(parts)
+
+
+def decode_game(buffer, offset: int = 0) -> Game:
+    """Restore a game from an entry written by encode_game.
+
+    The position and history are restored, the undo stack is not: like
+    after Game.seek, moves played before the checkpoint cannot be undone.
+    """
+    record, moves, keyframes = GAME.unpack_from(buffer, offset)
+    game = Game.from_record(record)
+    offset += GAME.size
+    log = game.move_log
+    for code, piece, captured in LOGGED_MOVE.iter_unpack(buffer[offset:offset + moves * LOGGED_MOVE.size]):
+        piece_type, color = CODE_PIECES[piece]
+        log.append({
+            'piece': piece_type.__name__,
+            'color': color,
+            'start': SQUARE_POSITIONS[code & MoveCode.SQUARE_MASK],
+            'end': SQUARE_POSITIONS[code >> MoveCode.END_SHIFT & MoveCode.SQUARE_MASK],
+            'captured': _PIECE_NAMES[captured - 1] if captured else None,
+            'code': code,
+        })
+    offset += moves * LOGGED_MOVE.size
+    game._keyframes = [
+        bytes(buffer[start:start + RECORD_SIZE])
+        for start in range(offset, offset + keyframes * RECORD_SIZE, RECORD_SIZE)
+    ]
+    return game
+
+
+def save_all(path: str, games: Iterable[Game]) -> int:
+    """Write a checkpoint of games to path and return their number.
+
+    The file is written next to path and renamed when complete, so an
+    interrupted save leaves the previous checkpoint intact.
+    """
+    offsets = array("Q")
+    temporary = path + ".tmp"
+    with open(temporary, "wb", buffering=_WRITE_BUFFER) as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        position = HEADER.size
+        for game in games:
+            entry = encode_game(game)
+            offsets.append(position)
+            f.write(entry)
+            position += len(entry)
+        f.write(offsets.tobytes())
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(offsets), position))
+    os.replace(temporary, path)
+    return len(offsets)
+
+
+def load_all(path: str) -> List[Game]:
+    """Restore every game of a checkpoint written by save_all, in order."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        magic, version, count, table = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"Not a checkpoint file: {path}")
+        if version != VERSION:
+            raise ValueError(f"Unsupported checkpoint version {version}, expected {VERSION}")
+        offsets = array("Q")
+        offsets.frombytes(buffer[table:table + count * 8])
+        # Restoring creates millions of objects and no garbage, pause the
+        # cycle collector instead of letting it rescan them all repeatedly
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return [decode_game(buffer, offset) for offset in offsets]
+        finally:
+            if enabled:
+                gc.enable()
@@ -1,14 +1,90 @@
-import copy
-from typing import List
+import gc
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 from Piece import Queen, Rook, Knight, Bishop, King, Pawn, Position, Piece
-import svgwrite
+from Piece import CAPTURE, CASTLE, EN_PASSANT, END_SHIFT, SQUARE_MASK, SQUARE_POSITIONS
+from Events import Captured, Check, GameEvent, GameOver, Moved
+from Evaluation import PHASE_WEIGHTS, PIECE_SQUARE, SEE_VALUES
+import Notation
+import MoveCache
+import MoveCode
+import Zobrist
+from Zobrist import PIECE_KEYS
+import PositionRecord
+from Snapshot import PositionSnapshot
+
+
+@dataclass
+class Move:
+    """A move record stored in the per-turn legal move index.
+
+    code is the move packed in an int (see MoveCode), as the pieces
+    generate it; the squares and flags are read from it.
+    """
+    piece: Piece
+    code: int
+    captured: Piece = None
+
+    @property
+    def start(self) -> Position:
+        return SQUARE_POSITIONS[self.code & SQUARE_MASK]
+
+    @property
+    def end(self) -> Position:
+        return SQUARE_POSITIONS[self.code >> END_SHIFT & SQUARE_MASK]
+
+    @property
+    def is_capture(self) -> bool:
+        return bool(self.code & CAPTURE)
+
+    @property
+    def is_castle(self) -> bool:
+        return bool(self.code & CASTLE)
+
+    @property
+    def is_en_passant(self) -> bool:
+        return bool(self.code & EN_PASSANT)
+
+    @property
+    def is_promotion(self) -> bool:
+        return MoveCode.promotion_of(self.code) is not None
 
 
 class Game:
     board: List[List[Piece]]
+    # Legal moves of positions seen by any game, by position key; None disables it
+    move_cache = MoveCache.DEFAULT_CACHE
+    # Plies between the position records kept for seek
+    keyframe_interval = 16
+
+    # Game in the starting position that new games copy, built on first use
+    _prototype = None
 
     def __init__(self):
-        self.board = [
+        prototype = Game._prototype
+        if prototype is None:
+            prototype = Game._prototype = Game._starting_position()
+        # Copying the prototype's pieces and index skips rebuilding them
+        prototype._copy_position(self)
+        self._clear_history("white")
+
+    @classmethod
+    def new_many(cls, n: int) -> List["Game"]:
+        """Create n games in the starting position, e.g. to fill a session pool."""
+        # Only new objects are created, so the cycle collector has nothing to find
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return [cls() for _ in range(n)]
+        finally:
+            if enabled:
+                gc.enable()
+
+    @classmethod
+    def _starting_position(cls) -> "Game":
+        game = cls.__new__(cls)
+        game.board = [
             [
                 Rook("white"),
                 Knight("white"),
@@ -54,17 +130,195 @@ class Game:
                 Rook("black"),
             ],
         ]
+        game._reset("white")
+        return game
 
-        for y in range(8):
-            for x in range(8):
-                if self.board[y][x] is not None:
-                    piece = self.board[y][x]
-                    if isinstance(piece, Piece):
-                        piece.position = Position(x, y)
-                        piece.game = self
+    def _reset(self, current_turn: str) -> None:
+        """Initialise the game state for the pieces on self.board."""
+        self._clear_history(current_turn)
+        self.index_pieces()
 
+    def _clear_history(self, current_turn: str) -> None:
         self.move_log = []
-        self.current_turn = "white"
+        # Set while the move log is shared with a clone, copied on next append
+        self._log_shared = False
+        self.current_turn = current_turn
+        # Legal move index per color, rebuilt lazily once per turn
+        self._move_index = {}
+        # What undo_move needs to restore, one entry per move
+        self._undo_stack = []
+        # Position records at plies 0, keyframe_interval, 2 * keyframe_interval...
+        # The first one is taken lazily before the first move
+        self._keyframes = []
+        # (listener, event types) pairs, see subscribe
+        self._listeners = []
+
+    @classmethod
+    def from_fen(cls, fen: str) -> "Game":
+        """Create a game from a FEN string."""
+        parsed = Notation.parse_fen(fen)
+        board = [[None] * 8 for _ in range(8)]
+        for y, row in enumerate(parsed.board):
+            for x, letter in enumerate(row):
+                if letter is None:
+                    continue
+                piece_type = Notation.PIECE_TYPES.get(letter.upper())
+                if piece_type is None:
+                    raise ValueError(f"Invalid FEN piece: {letter!r}")
+                board[y][x] = piece_type("white" if letter.isupper() else "black")
+        return cls._from_board(board, parsed.turn, parsed.castling, parsed.en_passant)
+
+    @classmethod
+    def from_record(cls, record: bytes) -> "Game":
+        """Create a game from a fixed-width position record, see PositionRecord."""
+        board, turn, castling, en_passant = PositionRecord.decode(record)
+        return cls._from_board(board, turn, castling, en_passant)
+
+    def to_record(self) -> bytes:
+        """Return the fixed-width position record of the current position."""
+        return PositionRecord.encode(self)
+
+    def snapshot(self) -> PositionSnapshot:
+        """Return an immutable, hashable snapshot of the current position."""
+        return PositionSnapshot(self.to_record())
+
+    @classmethod
+    def _from_board(
+        cls, board: List[List[Piece]], turn: str, castling: str, en_passant: Position
+    ) -> "Game":
+        """Create a game from a board of fresh pieces and FEN-style state."""
+        for y, row in enumerate(board):
+            for piece in row:
+                if piece is None:
+                    continue
+                if isinstance(piece, Pawn):
+                    piece.has_moved = y != (1 if piece.color == "white" else 6)
+                elif isinstance(piece, (King, Rook)):
+                    piece.has_moved = True
+
+        # Castling rights: K and Q refer to the rooks on the h- and a-file
+        for letter in castling.replace("-", ""):
+            y = 0 if letter.isupper() else 7
+            color = "white" if letter.isupper() else "black"
+            king = board[y][3]
+            rook = board[y][0 if letter.upper() == "K" else 7]
+            if (isinstance(king, King) and king.color == color
+                    and isinstance(rook, Rook) and rook.color == color):
+                king.has_moved = False
+                rook.has_moved = False
+
+        if en_passant is not None:
+            # The pawn that just moved two squares stands behind the target
+            y = 3 if en_passant.y == 2 else 4
+            pawn = board[y][en_passant.x]
+            if isinstance(pawn, Pawn):
+                pawn.en_passant_vulnerable = True
+
+        game = cls.__new__(cls)
+        game.board = board
+        game._reset(turn)
+        return game
+
+    def to_fen(self) -> str:
+        """Return the FEN string of the current position."""
+        ranks = []
+        for y in range(7, -1, -1):
+            rank = ""
+            empty = 0
+            for x in range(7, -1, -1):
+                piece = self.board[y][x]
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                letter = Notation.PIECE_LETTERS[type(piece)]
+                rank += letter if piece.color == "white" else letter.lower()
+            ranks.append(rank + (str(empty) if empty else ""))
+
+        en_passant = "-"
+        pawn = self.en_passant_pawn
+        if pawn is not None and pawn.en_passant_vulnerable:
+            behind = -1 if pawn.color == "white" else 1
+            en_passant = Notation.SQUARE_NAMES[Position(pawn.position.x, pawn.position.y + behind)]
+
+        return " ".join([
+            "/".join(ranks),
+            "w" if self.current_turn == "white" else "b",
+            self.castling_rights(),
+            en_passant,
+            "0",
+            str(len(self.move_log) // 2 + 1),
+        ])
+
+    def castling_rights(self) -> str:
+        """Return the castling rights in FEN form, e.g. "KQkq" or "-"."""
+        rights = ""
+        for color, y, letters in (("white", 0, "KQ"), ("black", 7, "kq")):
+            king = self.board[y][3]
+            if not (isinstance(king, King) and king.color == color and not king.has_moved):
+                continue
+            for x, letter in zip((0, 7), letters):
+                rook = self.board[y][x]
+                if isinstance(rook, Rook) and rook.color == color and not rook.has_moved:
+                    rights += letter
+        return rights or "-"
+
+    def clone(self) -> "Game":
+        """Return an independent copy of the current position.
+
+        Only the board state is copied. Pieces are rebound to the new game
+        and the move log is shared until either game appends to it.
+        """
+        game = Game.__new__(Game)
+        self._copy_position(game)
+        game.move_log = self.move_log
+        self._log_shared = game._log_shared = True
+        game.current_turn = self.current_turn
+        game._move_index = {}
+        # Undo records refer to the pieces of this game, so they are not copied
+        game._undo_stack = []
+        game._keyframes = list(self._keyframes)
+        # Subscribers follow this game only
+        game._listeners = []
+        return game
+
+    def _copy_position(self, game: "Game") -> None:
+        # Copy the pieces, rebound to game, and the index state into game
+        self._sync_pieces()
+        game.board = [[None] * 8 for _ in range(8)]
+        game.pieces = {"white": {}, "black": {}}
+        game.king_positions = dict(self.king_positions)
+        game.piece_counts = {
+            color: counts.copy() for color, counts in self.piece_counts.items()
+        }
+        game.en_passant_pawn = None
+        game.mg_score = self.mg_score
+        game.eg_score = self.eg_score
+        game.phase = self.phase
+        game.pawn_key = self.pawn_key
+        game.board_key = self.board_key
+        # The board, not the piece lists, is what the copy must match
+        for y, row in enumerate(self.board):
+            copies = game.board[y]
+            for x, piece in enumerate(row):
+                if piece is None:
+                    continue
+                position = SQUARE_POSITIONS[y * 8 + x]
+                twin = piece.__class__.__new__(piece.__class__)
+                twin.__dict__ = piece.__dict__.copy()
+                twin.game = game
+                twin.position = position
+                copies[x] = twin
+                game.pieces[piece.color][position] = twin
+                if piece is self.en_passant_pawn:
+                    game.en_passant_pawn = twin
+
+    def __deepcopy__(self, memo) -> "Game":
+        game = self.clone()
+        memo[id(self)] = game
+        return game
 
     def print_board(self) -> None:
         for row in self.board:
@@ -75,94 +329,398 @@ class Game:
     def get_piece_at(self, position: Position) -> Piece:
         return self.board[position.y][position.x]
 
-    def chess_notation_to_position(self, notation: str) -> Position:
-        column_to_letter = {
-            7: "a",
-            6: "b",
-            5: "c",
-            4: "d",
-            3: "e",
-            2: "f",
-            1: "g",
-            0: "h",
-        }
-        row = int(notation[1]) - 1
-
-        column = list(column_to_letter.keys())[
-            list(column_to_letter.values()).index(notation[0])
-        ]
-        return Position(column, row)
+    def index_pieces(self) -> None:
+        """Rebuild the piece lists from the board.
+
+        Moves made through make_move or the pieces keep the lists up to date;
+        this is only needed after editing the board directly.
+        """
+        self.pieces = {"white": {}, "black": {}}
+        self.king_positions = {"white": None, "black": None}
+        self.piece_counts = {"white": Counter(), "black": Counter()}
+        self.en_passant_pawn = None
+        # Evaluation totals, white minus black, see Evaluation.evaluate
+        mg_score = eg_score = phase = 0
+        # Zobrist keys of the piece placement and of the pawns only
+        board_key = pawn_key = 0
+        # Same bookkeeping as _index_piece, inlined: this runs for every new game
+        for y, row in enumerate(self.board):
+            for x, piece in enumerate(row):
+                if piece is None:
+                    continue
+                square = y * 8 + x
+                position = SQUARE_POSITIONS[square]
+                piece.position = position
+                piece.game = self
+                piece_type = type(piece)
+                color = piece.color
+                self.pieces[color][position] = piece
+                self.piece_counts[color][piece_type] += 1
+                mg, eg = PIECE_SQUARE[(piece_type, color)][square]
+                mg_score += mg
+                eg_score += eg
+                phase += PHASE_WEIGHTS[piece_type]
+                key = PIECE_KEYS[(piece_type, color)][square]
+                board_key ^= key
+                if isinstance(piece, King):
+                    self.king_positions[color] = position
+                elif isinstance(piece, Pawn):
+                    pawn_key ^= key
+                    if piece.en_passant_vulnerable:
+                        self.en_passant_pawn = piece
+        self.mg_score, self.eg_score, self.phase = mg_score, eg_score, phase
+        self.board_key, self.pawn_key = board_key, pawn_key
+
+    def _sync_pieces(self) -> None:
+        # The board was edited directly if a listed piece left its square or
+        # if it holds more pieces than the lists, resynchronise them then
+        board = self.board
+        indexed = 0
+        for pieces in self.pieces.values():
+            indexed += len(pieces)
+            for pos, piece in pieces.items():
+                if board[pos.y][pos.x] is not piece:
+                    self._resync()
+                    return
+        if sum(piece is not None for row in board for piece in row) != indexed:
+            self._resync()
+
+    def _resync(self) -> None:
+        self.index_pieces()
+        self._move_index = {}
+
+    def _index_piece(self, piece: Piece, position: Position) -> None:
+        stale = self.pieces[piece.color].get(position)
+        if stale is not None:
+            self._unindex_piece(stale, position)
+        piece_type = type(piece)
+        self.pieces[piece.color][position] = piece
+        self.piece_counts[piece.color][piece_type] += 1
+        if isinstance(piece, King):
+            self.king_positions[piece.color] = position
+        square = position.y * 8 + position.x
+        mg, eg = PIECE_SQUARE[(piece_type, piece.color)][square]
+        self.mg_score += mg
+        self.eg_score += eg
+        self.phase += PHASE_WEIGHTS[piece_type]
+        key = PIECE_KEYS[(piece_type, piece.color)][square]
+        self.board_key ^= key
+        if isinstance(piece, Pawn):
+            self.pawn_key ^= key
+
+    def _unindex_piece(self, piece: Piece, position: Position) -> None:
+        piece_type = type(piece)
+        del self.pieces[piece.color][position]
+        self.piece_counts[piece.color][piece_type] -= 1
+        if self.king_positions[piece.color] == position:
+            self.king_positions[piece.color] = None
+        square = position.y * 8 + position.x
+        mg, eg = PIECE_SQUARE[(piece_type, piece.color)][square]
+        self.mg_score -= mg
+        self.eg_score -= eg
+        self.phase -= PHASE_WEIGHTS[piece_type]
+        key = PIECE_KEYS[(piece_type, piece.color)][square]
+        self.board_key ^= key
+        if isinstance(piece, Pawn):
+            self.pawn_key ^= key
+
+    def _put_piece(self, piece: Piece, position: Position) -> None:
+        """Place a piece on an empty square."""
+        self.board[position.y][position.x] = piece
+        piece.position = position
+        self._index_piece(piece, position)
+
+    def _remove_piece(self, position: Position) -> Piece:
+        """Clear a square and return the piece that was on it, if any."""
+        piece = self.board[position.y][position.x]
+        if piece is None:
+            return None
+        self.board[position.y][position.x] = None
+        if self.pieces[piece.color].get(position) is piece:
+            self._unindex_piece(piece, position)
+        return piece
+
+    def _move_piece(self, piece: Piece, end: Position) -> Piece:
+        """Move a piece to end, returning the piece captured there, if any."""
+        start = piece.position
+        self._remove_piece(start)
+        captured = self._remove_piece(end)
+        self._put_piece(piece, end)
+        if self._listeners:
+            if captured is not None:
+                self._emit(Captured(captured, end))
+            self._emit(Moved(piece, start, end))
+        return captured
+
+    def subscribe(self, listener: Callable[[GameEvent], None], *event_types: type) -> None:
+        """Call listener with every event of the given types, or with all events.
+
+        Events are sent while a move is played: Captured, Moved and then
+        Castled, EnPassant or Promoted as the move requires, followed by
+        Check and GameOver for the side to move. Undoing a move sends nothing.
+        """
+        self._listeners = self._listeners + [(listener, event_types or GameEvent)]
+
+    def unsubscribe(self, listener: Callable[[GameEvent], None]) -> None:
+        """Stop sending events to listener."""
+        self._listeners = [entry for entry in self._listeners if entry[0] != listener]
+
+    def _emit(self, event: GameEvent) -> None:
+        # subscribe and unsubscribe replace the list, so listeners may call them here
+        for listener, event_types in self._listeners:
+            if isinstance(event, event_types):
+                listener(event)
+
+    def _emit_status(self) -> None:
+        color = self.current_turn
+        in_check = self._in_check(color)
+        if in_check:
+            self._emit(Check(color, self.king_positions[color]))
+        if not self.legal_moves(color):
+            if in_check:
+                winner = "black" if color == "white" else "white"
+                self._emit(GameOver("checkmate", winner))
+            else:
+                self._emit(GameOver("stalemate"))
 
-    def full_chess_notation_to_position(self, notation: str) -> Position:
-        # takes in input like a1-a2 and returns the start and end positions
-        # start position is the letters before the dash and the end position is the letters after the dash
-        # start = self.chess_notation_to_position(notation[:2])
-        # end = self.chess_notation_to_position(notation[3:])
-        # return start, end
+    def chess_notation_to_position(self, notation: str) -> Position:
+        return Notation.parse_square(notation)
 
+    def full_chess_notation_to_position(self, notation: str) -> Tuple[Position, Position]:
         # Handle moves like "Ra1-a2", "Nf3-f4", "e2-e4", "Rd1xd8", "Qd1xd4"
-        if "x" in notation or "X" in notation:
-            moves = notation.split("x") if "x" in notation else notation.split("X")
-            # checking start moves
-            if len(moves[0]) == 3:
-                start = self.chess_notation_to_position(moves[0][1:])
-            if len(moves[0]) == 2:
-                start = self.chess_notation_to_position(moves[0])
-            # checking end moves
-            if len(moves[1]) == 2:
-                end = self.chess_notation_to_position(moves[1])
-            if len(moves[1]) == 3:
-                end = self.chess_notation_to_position(moves[1][1:])
-
-            return start, end
-
-        elif "-" in notation:
-            moves = notation.split("-")
-            if len(moves[0]) == 2:
-                start = self.chess_notation_to_position(moves[0])
-            if len(moves[1]) == 2:
-                end = self.chess_notation_to_position(moves[1])
-            if len(moves[0]) == 3:
-                start = self.chess_notation_to_position(moves[0][1:])
-            if len(moves[1]) == 3:
-                end = self.chess_notation_to_position(moves[1][1:])
-            return start, end
-
+        move = Notation.parse_move(notation)
+        return move.start, move.end
+
+    def legal_moves(self, color: str = None) -> Dict[Tuple[Position, Position], Move]:
+        """Return the move index of the given color (defaults to the side to move).
+
+        The index maps (start, end) to a Move record for every move that does
+        not leave the mover's king in check. It is built at most once per turn,
+        so validating and executing a move are plain dict lookups.
+        """
+        color = color or self.current_turn
+        # Drops the index if the board was edited directly
+        self._sync_pieces()
+        index = self._move_index.get(color)
+        if index is None:
+            if color == self.current_turn and self.move_cache is not None:
+                index = self._cached_move_index()
+            else:
+                index = self._build_move_index(color)
+            self._move_index[color] = index
+        return index
+
+    def legal_move_codes(self, color: str = None) -> List[int]:
+        """Return the legal moves of the given color as packed integers, see MoveCode."""
+        return [move.code for move in self.legal_moves(color).values()]
+
+    def _decode(self, code: int) -> Tuple[Position, Position]:
+        promotion = MoveCode.promotion_of(code)
+        if promotion is not None and promotion is not Queen:
+            raise ValueError("Only promotion to a queen is supported")
+        return MoveCode.squares(code)
+
+    def position_key(self) -> int:
+        """Return the Zobrist key of the position, including side to move, castling and en passant."""
+        self._sync_pieces()
+        return self.board_key ^ Zobrist.state_key(self)
+
+    def _cache_key(self) -> int:
+        # The move cache also tells apart the has_moved flags castling reads.
+        # position_key resynchronises first, so board_key matches the board
+        return self.position_key() ^ Zobrist.unmoved_key(self)
+
+    def _cached_move_index(self) -> Dict[Tuple[Position, Position], Move]:
+        key = self._cache_key()
+        entry = self.move_cache.get(key)
+        if entry is None:
+            index = self._build_move_index(self.current_turn)
+            in_check = self._in_check(self.current_turn)
+            codes = [move.code for move in index.values()]
+            self.move_cache.put(key, MoveCache.CachedPosition.from_moves(codes, in_check))
+            return index
+        board = self.board
+        index = {}
+        for code in entry.move_codes():
+            start = code & SQUARE_MASK
+            move = self._describe_move(board[start >> 3][start & 7], code)
+            index[(SQUARE_POSITIONS[start], SQUARE_POSITIONS[code >> END_SHIFT & SQUARE_MASK])] = move
+        return index
+
+    def _build_move_index(self, color: str) -> Dict[Tuple[Position, Position], Move]:
+        # legal_moves has synchronised the piece lists the generators trust
+        index = {}
+        for start, piece in list(self.pieces[color].items()):
+            is_pawn = isinstance(piece, Pawn)
+            for code in piece.move_codes():
+                move = self._describe_move(piece, code)
+                # Pawns already drop moves that expose their king, except en passant
+                if (is_pawn and not code & EN_PASSANT) or not self._leaves_king_in_check(move):
+                    index[(start, SQUARE_POSITIONS[code >> END_SHIFT & SQUARE_MASK])] = move
+        return index
+
+    def _leaves_king_in_check(self, move: Move) -> bool:
+        """Try a move on the board and check if it leaves the mover's king attacked."""
+        piece = move.piece
+        captured_at = move.captured.position if move.captured is not None else None
+        if captured_at is not None:
+            self._remove_piece(captured_at)
+        self._remove_piece(move.start)
+        self._put_piece(piece, move.end)
+
+        in_check = self._in_check(piece.color)
+
+        self._remove_piece(move.end)
+        self._put_piece(piece, move.start)
+        if captured_at is not None:
+            self._put_piece(move.captured, captured_at)
+        return in_check
+
+    def _describe_move(self, piece: Piece, code: int) -> Move:
+        end = code >> END_SHIFT & SQUARE_MASK
+        if code & EN_PASSANT:
+            # The pawn taken stands beside the start square
+            captured = self.board[(code & SQUARE_MASK) >> 3][end & 7]
         else:
-            raise ValueError("Invalid move")
+            captured = self.board[end >> 3][end & 7]
+        return Move(piece, code, captured)
 
-    def make_move(self, start: Position, end: Position) -> None:
+    def make_move(self, start: Union[Position, int], end: Position = None) -> None:
+        """Play a move given by its squares or as a packed integer (see MoveCode)."""
+        if isinstance(start, int):
+            start, end = self._decode(start)
         if not (0 <= start.x < 8 and 0 <= start.y < 8 and 0 <= end.x < 8 and 0 <= end.y < 8):
             raise ValueError("Invalid position")
 
-        piece = self.board[start.y][start.x]
-        if piece is None:
-            raise ValueError("No piece at start position")
-            
-        if piece.color != self.current_turn:
-            raise ValueError("Not your turn")
-
-        valid_moves = piece.get_possible_moves()
-        if end not in valid_moves:
+        self._play(self._legal_move(start, end))
+
+    def _legal_move(self, start: Position, end: Position) -> Move:
+        """Return the legal move of the side to move from start to end, or raise ValueError."""
+        move = self.legal_moves().get((start, end))
+        if move is None:
+            piece = self.board[start.y][start.x]
+            if piece is None:
+                raise ValueError("No piece at start position")
+            if piece.color != self.current_turn:
+                raise ValueError("Not your turn")
             raise ValueError("Invalid move")
+        return move
+
+    def _play(self, move: Move) -> None:
+        """Execute a move without validating it."""
+        piece = move.piece
+        start, end = move.start, move.end
+        if not self._keyframes:
+            self._keyframes.append(self.to_record())
+
+        # Remember what the piece's move method changes, for undo_move
+        en_passant_pawn = self.en_passant_pawn
+        self._undo_stack.append((
+            move,
+            getattr(piece, "has_moved", None),
+            en_passant_pawn,
+            en_passant_pawn is not None and en_passant_pawn.en_passant_vulnerable,
+            self._move_index,
+        ))
 
         # Make the move
-        captured_piece = self.board[end.y][end.x]
         piece.move(end)
+        # En passant is only possible right after the two-square move
+        if self.en_passant_pawn is not None and self.en_passant_pawn is not piece:
+            self.en_passant_pawn.en_passant_vulnerable = False
+            self.en_passant_pawn = None
         
         # Log the move
+        if self._log_shared:
+            self.move_log = list(self.move_log)
+            self._log_shared = False
         self.move_log.append({
             'piece': piece.asText(),
             'color': piece.color,
             'start': start,
             'end': end,
-            'captured': captured_piece.asText() if captured_piece else None
+            'captured': move.captured.asText() if move.captured else None,
+            'code': move.code,
         })
         
         # Switch turns
         self.current_turn = "black" if self.current_turn == "white" else "white"
-
-    def is_valid_move(self, start: Position, end: Position) -> bool:
+        self._move_index = {}
+
+        if len(self.move_log) % self.keyframe_interval == 0:
+            self._keyframes.append(self.to_record())
+
+        if self._listeners:
+            self._emit_status()
+
+    def undo_move(self) -> None:
+        """Take back the last move made with make_move."""
+        if not self._undo_stack:
+            raise ValueError("No move to undo")
+        move, has_moved, en_passant_pawn, vulnerable, move_index = self._undo_stack.pop()
+        piece = move.piece
+
+        # Lift the piece, or the queen it was promoted to, back to its start square
+        self._remove_piece(move.end)
+        self._put_piece(piece, move.start)
+        if has_moved is not None:
+            piece.has_moved = has_moved
+
+        if move.is_castle:
+            rook_start, rook_end = (7, 5) if move.end.x == 6 else (0, 3)
+            rook = self._remove_piece(Position(rook_end, move.start.y))
+            self._put_piece(rook, Position(rook_start, move.start.y))
+            rook.has_moved = False
+
+        if move.captured is not None:
+            self._put_piece(move.captured, move.captured.position)
+
+        if self.en_passant_pawn is not None:
+            self.en_passant_pawn.en_passant_vulnerable = False
+        self.en_passant_pawn = en_passant_pawn
+        if en_passant_pawn is not None:
+            en_passant_pawn.en_passant_vulnerable = vulnerable
+
+        if self._log_shared:
+            self.move_log = self.move_log[:-1]
+            self._log_shared = False
+        else:
+            self.move_log.pop()
+        del self._keyframes[len(self.move_log) // self.keyframe_interval + 1:]
+        self.current_turn = piece.color
+        self._move_index = move_index
+
+    def seek(self, ply: int) -> "Game":
+        """Return a new game at the position after the given number of plies.
+
+        The game starts from the nearest earlier keyframe and replays the
+        remaining logged moves without validating them. Its move log is the
+        history up to ply; moves before the keyframe cannot be undone.
+        """
+        if not 0 <= ply <= len(self.move_log):
+            raise ValueError(f"Ply {ply} is outside the game")
+        if not self._keyframes:
+            # No move was played through this game, only its current position is known
+            if ply != len(self.move_log):
+                raise ValueError(f"No position is recorded for ply {ply}")
+            return self.clone()
+
+        keyframe = ply // self.keyframe_interval
+        game = Game.from_record(self._keyframes[keyframe])
+        base = keyframe * self.keyframe_interval
+        game.move_log = self.move_log[:base]
+        game._keyframes = self._keyframes[:keyframe + 1]
+        for entry in self.move_log[base:ply]:
+            start = entry['start']
+            game._play(game._describe_move(game.board[start.y][start.x], entry['code']))
+        return game
+
+    def is_valid_move(self, start: Union[Position, int], end: Position = None) -> bool:
+        if isinstance(start, int):
+            try:
+                start, end = self._decode(start)
+            except ValueError:
+                return False
         if not (
             0 <= start.x < 8 and 0 <= start.y < 8 and 0 <= end.x < 8 and 0 <= end.y < 8
         ):
@@ -173,150 +731,245 @@ class Game:
         if piece is None:
             return False
 
-        valid_moves = piece.get_possible_moves()
-
-        if end not in valid_moves:
-            return False
-
-        return True
+        return (start, end) in self.legal_moves(piece.color)
 
     def is_check(self, color: str) -> bool:
         """Check if the king of the given color is in check."""
-        # Find the king's position
-        king_pos = None
-        for y in range(8):
-            for x in range(8):
-                piece = self.board[y][x]
-                if isinstance(piece, King) and piece.color == color:
-                    king_pos = Position(x, y)
-                    break
-            if king_pos:
-                break
-            
-        if not king_pos:
+        self._sync_pieces()
+        entry = self._cached_status(color)
+        if entry is not None:
+            return entry.in_check
+        return self._in_check(color)
+
+    def is_square_attacked(self, pos: Position, color: str) -> bool:
+        """Check if any piece of the given color attacks the square."""
+        self._sync_pieces()
+        return self._is_attacked(pos, color)
+
+    def attackers(self, pos: Position, color: str, ignore: Set[int] = frozenset()) -> List[Piece]:
+        """Return the pieces of the given color attacking the square.
+
+        Squares in ignore, as y * 8 + x indices, are treated as empty, which
+        lets sliders attack through pieces that already took part in an exchange.
+        """
+        self._sync_pieces()
+        return list(self._attackers(pos, color, ignore))
+
+    # _in_check and _is_attacked trust the piece lists. They serve the trial
+    # moves made through _put_piece and _remove_piece, which keep the lists
+    # in sync, so the board is not checked for direct edits on every call.
+
+    def _in_check(self, color: str) -> bool:
+        king_pos = self.king_positions[color]
+        if king_pos is None:
+            return False
+        opponent = "black" if color == "white" else "white"
+        return self._is_attacked(king_pos, opponent)
+
+    def _is_attacked(self, pos: Position, color: str, ignore: Set[int] = frozenset()) -> bool:
+        return next(self._attackers(pos, color, ignore), None) is not None
+
+    def _attackers(
+        self, pos: Position, color: str, ignore: Set[int] = frozenset()
+    ) -> Iterator[Piece]:
+        board = self.board
+        for square, piece in self.pieces[color].items():
+            # Skip entries for pieces taken off a temporarily edited board
+            if board[square.y][square.x] is not piece or square.y * 8 + square.x in ignore:
+                continue
+
+            # Pawn attacks
+            if isinstance(piece, Pawn):
+                if piece.color == "white":
+                    if square.y + 1 == pos.y and abs(square.x - pos.x) == 1:
+                        yield piece
+                else:
+                    if square.y - 1 == pos.y and abs(square.x - pos.x) == 1:
+                        yield piece
+                continue
+
+            dx = pos.x - square.x
+            dy = pos.y - square.y
+
+            # Knight attacks
+            if isinstance(piece, Knight):
+                if (abs(dx), abs(dy)) in ((1, 2), (2, 1)):
+                    yield piece
+                continue
+
+            # King attacks (one square in any direction)
+            if isinstance(piece, King):
+                if abs(dx) <= 1 and abs(dy) <= 1 and (dx or dy):
+                    yield piece
+                continue
+
+            # Sliding pieces need a clear path
+            straight = (dx == 0 or dy == 0) and isinstance(piece, (Rook, Queen))
+            diagonal = abs(dx) == abs(dy) and isinstance(piece, (Bishop, Queen))
+            if (dx or dy) and (straight or diagonal):
+                step_x = 0 if dx == 0 else dx // abs(dx)
+                step_y = 0 if dy == 0 else dy // abs(dy)
+                x, y = square.x + step_x, square.y + step_y
+                while (x, y) != (pos.x, pos.y):
+                    if board[y][x] is not None and y * 8 + x not in ignore:
+                        break
+                    x += step_x
+                    y += step_y
+                else:
+                    yield piece
+
+    def gives_check(self, move: Union[Move, int]) -> bool:
+        """Check if a move puts the opponent's king in check, without playing it.
+
+        The move is a Move record of the legal move index or a packed integer
+        move (see MoveCode), which must be legal for the side to move: other
+        codes raise ValueError, as in make_move. Direct checks are tested
+        from the squares the move fills: the destination, and the rook's
+        square when castling. Discovered checks are tested on the lines from
+        the opponent's king through the squares it empties: the start square,
+        the square of a pawn taken en passant and the rook's start square
+        when castling.
+        """
+        if isinstance(move, int):
+            move = self._legal_move(*self._decode(move))
+        piece = move.piece
+        king = self.king_positions["black" if piece.color == "white" else "white"]
+        if king is None:
             return False
 
-        # Check if any opponent piece can attack the king
-        for y in range(8):
-            for x in range(8):
-                piece = self.board[y][x]
-                if piece is None or piece.color == color:
-                    continue
-
-                # Pawn attacks
-                if isinstance(piece, Pawn):
-                    if piece.color == "white":
-                        if (piece.position.y + 1 == king_pos.y and 
-                            abs(piece.position.x - king_pos.x) == 1):
-                            return True
-                    else:
-                        if (piece.position.y - 1 == king_pos.y and 
-                            abs(piece.position.x - king_pos.x) == 1):
-                            return True
-                    continue
+        start, end = move.start, move.end
+        emptied = {start.y * 8 + start.x}
+        filled = {end.y * 8 + end.x: Queen if move.is_promotion else type(piece)}
+        if move.is_en_passant:
+            captured = move.captured.position
+            emptied.add(captured.y * 8 + captured.x)
+        if move.is_castle:
+            rook_start, rook_end = (7, 5) if end.x == 6 else (0, 3)
+            emptied.add(start.y * 8 + rook_start)
+            filled[start.y * 8 + rook_end] = Rook
+        board = self.board
+
+        def is_empty(x: int, y: int) -> bool:
+            square = y * 8 + x
+            if square in filled:
+                return False
+            return square in emptied or board[y][x] is None
+
+        # Direct checks by the pieces on the filled squares
+        for square, piece_type in filled.items():
+            x, y = square & 7, square >> 3
+            dx = king.x - x
+            dy = king.y - y
+            if piece_type is Pawn:
+                if dy == (1 if piece.color == "white" else -1) and abs(dx) == 1:
+                    return True
+                continue
+            if piece_type is Knight:
+                if (abs(dx), abs(dy)) in ((1, 2), (2, 1)):
+                    return True
+                continue
+            straight = (dx == 0 or dy == 0) and piece_type in (Rook, Queen)
+            diagonal = abs(dx) == abs(dy) and piece_type in (Bishop, Queen)
+            if (dx or dy) and (straight or diagonal):
+                step_x = 0 if dx == 0 else dx // abs(dx)
+                step_y = 0 if dy == 0 else dy // abs(dy)
+                x, y = x + step_x, y + step_y
+                while (x, y) != (king.x, king.y):
+                    if not is_empty(x, y):
+                        break
+                    x += step_x
+                    y += step_y
+                else:
+                    return True
+
+        # Discovered checks by sliders behind the emptied squares
+        for square in emptied:
+            dx = (square & 7) - king.x
+            dy = (square >> 3) - king.y
+            straight = dx == 0 or dy == 0
+            if not (dx or dy) or not (straight or abs(dx) == abs(dy)):
+                continue
+            step_x = 0 if dx == 0 else dx // abs(dx)
+            step_y = 0 if dy == 0 else dy // abs(dy)
+            x, y = king.x + step_x, king.y + step_y
+            while 0 <= x < 8 and 0 <= y < 8 and is_empty(x, y):
+                x += step_x
+                y += step_y
+            if not (0 <= x < 8 and 0 <= y < 8) or y * 8 + x in filled:
+                # Off the board, or a filled square already tested above
+                continue
+            slider = board[y][x]
+            if slider.color == piece.color and isinstance(
+                slider, (Rook, Queen) if straight else (Bishop, Queen)
+            ):
+                return True
+        return False
 
-                # Knight attacks
-                if isinstance(piece, Knight):
-                    dx = abs(piece.position.x - king_pos.x)
-                    dy = abs(piece.position.y - king_pos.y)
-                    if (dx == 2 and dy == 1) or (dx == 1 and dy == 2):
-                        return True
-                    continue
+    def capture_moves(self, color: str = None) -> List[Move]:
+        """Return the legal captures and promotions of the given color (defaults to the side to move)."""
+        return [
+            move for move in self.legal_moves(color).values()
+            if move.is_capture or move.is_promotion
+        ]
 
-                # For other pieces, check if there's a clear path
-                dx = king_pos.x - piece.position.x
-                dy = king_pos.y - piece.position.y
-
-                # Rook-like movements (horizontal/vertical)
-                if isinstance(piece, (Rook, Queen)):
-                    if dx == 0 or dy == 0:
-                        step_x = 0 if dx == 0 else dx // abs(dx)
-                        step_y = 0 if dy == 0 else dy // abs(dy)
-                        x, y = piece.position.x + step_x, piece.position.y + step_y
-                        clear_path = True
-                        while (x, y) != (king_pos.x, king_pos.y):
-                            if self.board[y][x] is not None:
-                                clear_path = False
-                                break
-                            x += step_x
-                            y += step_y
-                        if clear_path:
-                            return True
-
-                # Bishop-like movements (diagonal)
-                if isinstance(piece, (Bishop, Queen)):
-                    if abs(dx) == abs(dy):
-                        step_x = dx // abs(dx)
-                        step_y = dy // abs(dy)
-                        x, y = piece.position.x + step_x, piece.position.y + step_y
-                        clear_path = True
-                        while (x, y) != (king_pos.x, king_pos.y):
-                            if self.board[y][x] is not None:
-                                clear_path = False
-                                break
-                            x += step_x
-                            y += step_y
-                        if clear_path:
-                            return True
-
-                # King attacks (one square in any direction)
-                if isinstance(piece, King):
-                    if abs(dx) <= 1 and abs(dy) <= 1:
-                        return True
+    def see(self, move: Move) -> int:
+        """Static exchange evaluation of a move, in centipawns for the mover.
+
+        Plays out the sequence of captures on the destination square, each side
+        always recapturing with its least valuable attacker and free to stop
+        when continuing would lose material. Pins are not taken into account.
+        """
+        end = move.end
+        piece = move.piece
+        on_square = SEE_VALUES[Queen] if move.is_promotion else SEE_VALUES[type(piece)]
+        gains = [SEE_VALUES[type(move.captured)] if move.captured is not None else 0]
+        if move.is_promotion:
+            gains[0] += SEE_VALUES[Queen] - SEE_VALUES[Pawn]
+
+        ignore = {move.start.y * 8 + move.start.x}
+        if move.is_en_passant:
+            ignore.add(move.captured.position.y * 8 + move.captured.position.x)
+        side = "black" if piece.color == "white" else "white"
+        while True:
+            attackers = list(self._attackers(end, side, ignore))
+            if not attackers:
+                break
+            attacker = min(attackers, key=lambda p: SEE_VALUES[type(p)])
+            opponent = "black" if side == "white" else "white"
+            if isinstance(attacker, King) and self._is_attacked(end, opponent, ignore):
+                # The king cannot capture onto a defended square
+                break
+            gains.append(on_square - gains[-1])
+            on_square = SEE_VALUES[type(attacker)]
+            ignore.add(attacker.position.y * 8 + attacker.position.x)
+            side = opponent
 
-        return False
+        # Either side may decline to continue the exchange
+        for i in range(len(gains) - 1, 0, -1):
+            gains[i - 1] = -max(-gains[i - 1], gains[i])
+        return gains[0]
 
     def is_checkmate(self, color: str) -> bool:
-        if not self.is_check(color):
-            return False
-
-        for row in self.board:
-            for piece in row:
-                if isinstance(piece, Piece) and piece.color == color:
-                    valid_moves = piece.get_possible_moves()
-                    for move in valid_moves:
-                        # Make a copy of the game and simulate the move
-                        copy_game = copy.deepcopy(self)
-                        copy_game.make_move(piece.position, move)
-                        # Check if the opponent's king is still in check after the move
-                        if not copy_game.is_check(color):
-                            return False
-
-        return True
+        """Check if the given color is in check and has no legal move."""
+        self._sync_pieces()
+        entry = self._cached_status(color)
+        if entry is not None:
+            return entry.is_checkmate
+        return self._in_check(color) and not self.legal_moves(color)
 
     def is_stalemate(self, color: str) -> bool:
         """Check if the given color is in stalemate."""
-        if self.is_check(color):
-            return False
-
-        # Save original turn
-        original_turn = self.current_turn
-        self.current_turn = color  # Temporarily set turn to check moves
-
-        has_valid_moves = False
-        for row in self.board:
-            for piece in row:
-                if isinstance(piece, Piece) and piece.color == color:
-                    valid_moves = piece.get_possible_moves()
-                    for move in valid_moves:
-                        # Make a copy of the game and simulate the move
-                        copy_game = copy.deepcopy(self)
-                        copy_game.current_turn = color  # Set correct turn in copy
-                        try:
-                            copy_game.make_move(piece.position, move)
-                            if not copy_game.is_check(color):
-                                has_valid_moves = True
-                                break
-                        except ValueError:
-                            continue
-                if has_valid_moves:
-                    break
-            if has_valid_moves:
-                break
-
-        # Restore original turn
-        self.current_turn = original_turn
-        return not has_valid_moves
+        self._sync_pieces()
+        entry = self._cached_status(color)
+        if entry is not None:
+            return entry.is_stalemate
+        return not self._in_check(color) and not self.legal_moves(color)
+
+    def _cached_status(self, color: str) -> Optional[MoveCache.CachedPosition]:
+        # The move cache entry of the position, if color is to move and it is cached
+        if color != self.current_turn or self.move_cache is None:
+            return None
+        return self.move_cache.peek(self._cache_key())
 
     def is_draw(self) -> bool:
         """Check if the game is a draw."""
@@ -324,56 +977,10 @@ class Game:
                 self.is_stalemate("black"))
 
     def to_svg(self) -> str:
-        dwg = svgwrite.Drawing(profile="tiny", size=("450px", "450px"))
-
-        # Drawing the squares
-        for y in range(8):
-            for x in range(8):
-                color = "#ffffff" if (x + y) % 2 == 0 else "#bfbfbf"
-                dwg.add(
-                    dwg.rect(
-                        (50 * x, 50 * y),
-                        (50, 50),
-                        fill=color,
-                        stroke="#000000",
-                        stroke_width=0.2,
-                    )
-                )
-
-        # Drawing the pieces
-        for y in range(8):
-            for x in range(8):
-                piece = self.board[y][x]
-                if piece:
-                    piece.to_svg(dwg, x, y)
-
-        # Drawing the notations
-        for i in range(8):
-            # Add numbers
-            dwg.add(
-                dwg.text(
-                    str(8 - i),
-                    insert=(415, (7 - i) * 50 + 30),
-                    fill="#3d3d3d",
-                    font_size=20,
-                    font_family="serif",
-                    text_anchor="middle",
-                )
-            )
-
-            # Add letters
-            dwg.add(
-                dwg.text(
-                    chr(104 - i),
-                    insert=(i * 50 + 25, 425),
-                    fill="#3d3d3d",
-                    font_size=20,
-                    font_family="serif",
-                    text_anchor="middle",
-                )
-            )
-
-        return dwg.tostring()
+        # Rendering is optional, svgwrite is only imported on first use
+        from Render import board_to_svg
+
+        return board_to_svg(self)
 
 
 # Test
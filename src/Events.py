@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    from Piece import Piece, Position
+
+
+@dataclass(frozen=True)
+class GameEvent:
+    """Base class of the events a Game sends to its subscribers."""
+
+    @property
+    def squares(self) -> Tuple["Position", ...]:
+        """The squares whose content changed."""
+        return ()
+
+
+@dataclass(frozen=True)
+class Moved(GameEvent):
+    piece: "Piece"
+    start: "Position"
+    end: "Position"
+
+    @property
+    def squares(self) -> Tuple["Position", ...]:
+        return (self.start, self.end)
+
+
+@dataclass(frozen=True)
+class Captured(GameEvent):
+    piece: "Piece"
+    square: "Position"
+
+    @property
+    def squares(self) -> Tuple["Position", ...]:
+        return (self.square,)
+
+
+@dataclass(frozen=True)
+class Castled(GameEvent):
+    color: str
+    king_start: "Position"
+    king_end: "Position"
+    rook_start: "Position"
+    rook_end: "Position"
+
+    @property
+    def squares(self) -> Tuple["Position", ...]:
+        return (self.king_start, self.king_end, self.rook_start, self.rook_end)
+
+
+@dataclass(frozen=True)
+class EnPassant(GameEvent):
+    start: "Position"
+    end: "Position"
+    # Square of the pawn taken, beside the start square
+    captured_square: "Position"
+
+    @property
+    def squares(self) -> Tuple["Position", ...]:
+        return (self.start, self.end, self.captured_square)
+
+
+@dataclass(frozen=True)
+class Promoted(GameEvent):
+    # The new piece
+    piece: "Piece"
+    square: "Position"
+
+    @property
+    def squares(self) -> Tuple["Position", ...]:
+        return (self.square,)
+
+
+@dataclass(frozen=True)
+class Check(GameEvent):
+    # Color of the king in check
+    color: str
+    king_square: "Position"
+
+    @property
+    def squares(self) -> Tuple["Position", ...]:
+        return (self.king_square,)
+
+
+@dataclass(frozen=True)
+class GameOver(GameEvent):
+    # "checkmate" or "stalemate"
+    result: str
+    winner: Optional[str] = None
@@ -0,0 +1,237 @@
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from Chessboard import Game, Move
+import Notation
+
+
+INFINITY = 1 << 60
+
+PROVED = "mate"
+DISPROVED = "no mate"
+UNKNOWN = "unknown"
+
+
+class _Node:
+    """Proof-number search node, shared by every path reaching the same position and depth.
+
+    At OR nodes the attacker is to move, at AND nodes the defender. Children
+    are (move, node) pairs, None until the node is expanded.
+    """
+
+    __slots__ = ("is_or", "depth", "pn", "dn", "children")
+
+    def __init__(self, is_or: bool, depth: int, pn: int, dn: int):
+        self.is_or = is_or
+        # Attacker moves left, including the one to play at an OR node
+        self.depth = depth
+        self.pn = pn
+        self.dn = dn
+        self.children = None
+
+    def update(self) -> None:
+        children = [child for _, child in self.children]
+        if not children:
+            return
+        if self.is_or:
+            self.pn = min(child.pn for child in children)
+            self.dn = min(INFINITY, sum(child.dn for child in children))
+        else:
+            self.pn = min(INFINITY, sum(child.pn for child in children))
+            self.dn = min(child.dn for child in children)
+
+    def select(self) -> Tuple[Move, "_Node"]:
+        if self.is_or:
+            return min(self.children, key=lambda item: item[1].pn)
+        return min(self.children, key=lambda item: item[1].dn)
+
+
+@dataclass
+class MateResult:
+    # PROVED, DISPROVED or UNKNOWN when the node limit was reached first
+    status: str
+    # The mating line in move notation, attacker first, when proved
+    line: List[str] = field(default_factory=list)
+    nodes: int = 0
+
+
+class MateSolver:
+    """Proof-number search for forced mates of the side to move.
+
+    Nodes are kept in a table keyed by position record and remaining depth,
+    so transpositions are searched once. The table holds at most max_nodes
+    entries; when it is full the search gives up and reports UNKNOWN.
+    """
+
+    def __init__(self, max_nodes: int = 1_000_000):
+        self.max_nodes = max_nodes
+        self.table: Dict[Tuple[bytes, int], _Node] = {}
+
+    def solve(self, game: Game, moves: int) -> MateResult:
+        """Look for a mate in at most the given number of moves of the side to move."""
+        self.table = {}
+        game = game.clone()
+        root = self._node(game, True, moves)
+
+        while root.pn and root.dn and len(self.table) < self.max_nodes:
+            # Walk down to the most proving node, playing its moves on the board
+            path = [root]
+            node = root
+            while node.children and node.pn and node.dn:
+                move, node = node.select()
+                game.make_move(move.start, move.end)
+                path.append(node)
+
+            if node.children is None:
+                self._expand(game, node)
+            for node in reversed(path):
+                if node.children is not None:
+                    node.update()
+            for _ in range(len(path) - 1):
+                game.undo_move()
+
+        if root.pn == 0:
+            return MateResult(PROVED, self._line(root), len(self.table))
+        if root.dn == 0:
+            return MateResult(DISPROVED, nodes=len(self.table))
+        return MateResult(UNKNOWN, nodes=len(self.table))
+
+    def _node(self, game: Game, is_or: bool, depth: int) -> _Node:
+        key = (game.to_record(), depth)
+        node = self.table.get(key)
+        if node is not None:
+            return node
+
+        color = game.current_turn
+        legal = game.legal_moves(color)
+        if not legal:
+            # Checkmate proves, stalemate or the attacker running out of moves disproves
+            mated = not is_or and game.is_check(color)
+            node = _Node(is_or, depth, 0 if mated else INFINITY, INFINITY if mated else 0)
+            node.children = []
+        elif depth == 0:
+            node = _Node(is_or, depth, INFINITY, 0)
+            node.children = []
+        elif is_or:
+            # Mobility initialisation: every attacker move must fail to disprove
+            node = _Node(is_or, depth, 1, len(legal))
+        else:
+            node = _Node(is_or, depth, len(legal), 1)
+        self.table[key] = node
+        return node
+
+    def _expand(self, game: Game, node: _Node) -> None:
+        children = []
+        depth = node.depth - 1 if node.is_or else node.depth
+        for move in list(game.legal_moves().values()):
+            game.make_move(move.start, move.end)
+            children.append((move, self._node(game, not node.is_or, depth)))
+            game.undo_move()
+        node.children = children
+
+    def _line(self, root: _Node) -> List[str]:
+        lengths = {}
+
+        def length(node: _Node) -> int:
+            # Plies to mate in the proof tree, the defender choosing the longest line
+            if id(node) not in lengths:
+                proved = [child for _, child in node.children if child.pn == 0]
+                if not proved:
+                    lengths[id(node)] = 0
+                elif node.is_or:
+                    lengths[id(node)] = 1 + min(length(child) for child in proved)
+                else:
+                    lengths[id(node)] = 1 + max(length(child) for child in proved)
+            return lengths[id(node)]
+
+        line = []
+        node = root
+        while node.children:
+            pick = min if node.is_or else max
+            move, node = pick(
+                ((move, child) for move, child in node.children if child.pn == 0),
+                key=lambda item: length(item[1]),
+            )
+            line.append(_format(move))
+        return line
+
+
+def _format(move: Move) -> str:
+    return Notation.format_move(move.start, move.end, "Q" if move.is_promotion else None)
+
+
+def solve_mate(game: Game, moves: int, max_nodes: int = 1_000_000) -> MateResult:
+    """Look for a mate in at most the given number of moves of the side to move."""
+    return MateSolver(max_nodes).solve(game, moves)
+
+
+def solve_puzzle(puzzle: Tuple[str, int], max_nodes: int = 1_000_000) -> dict:
+    fen, moves = puzzle
+    try:
+        game = Game.from_fen(fen)
+    except ValueError as error:
+        return {"fen": fen, "error": str(error)}
+    result = solve_mate(game, moves, max_nodes)
+    return {
+        "fen": fen,
+        "moves": moves,
+        "status": result.status,
+        "line": result.line,
+        "nodes": result.nodes,
+    }
+
+
+def _solve_puzzle(task: Tuple[Tuple[str, int], int]) -> dict:
+    return solve_puzzle(*task)
+
+
+def solve_batch(
+    puzzles: Iterable[Tuple[str, int]], processes: int = None, max_nodes: int = 1_000_000
+) -> Iterator[dict]:
+    """Solve (fen, moves) puzzles in a process pool, yielding results in input order.
+
+    With processes=0 everything runs in the calling process.
+    """
+    tasks = ((puzzle, max_nodes) for puzzle in puzzles)
+    if processes == 0:
+        yield from map(_solve_puzzle, tasks)
+        return
+    with Pool(processes) as pool:
+        yield from pool.imap(_solve_puzzle, tasks)
+
+
+def parse_puzzle(line: str, default_moves: int) -> Tuple[str, int]:
+    """Parse a puzzle line "<fen>" or "<fen>; <moves>"."""
+    fen, _, moves = line.partition(";")
+    return fen.strip(), int(moves) if moves.strip() else default_moves
+
+
+def main(argv: List[str] = None) -> None:
+    """Read puzzles, one "<fen>; <moves>" per line, and write one JSON result per line."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("input", nargs="?", default="-", help="puzzle file, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file, - for stdout")
+    parser.add_argument("-p", "--processes", type=int, default=None)
+    parser.add_argument("-n", "--moves", type=int, default=2, help="default mate depth")
+    parser.add_argument("--max-nodes", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    target = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        puzzles = (parse_puzzle(line, args.moves) for line in source if line.strip())
+        for result in solve_batch(puzzles, args.processes, args.max_nodes):
+            target.write(json.dumps(result) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+
+# Estimated bytes per entry on top of its move bytes: the key, the entry
+# object and the slot in the ordered dict
+_ENTRY_OVERHEAD = 200
+
+
+@dataclass(frozen=True)
+class CachedPosition:
+    # Every legal move as a packed integer (see MoveCode), three bytes per move
+    moves: bytes
+    in_check: bool
+
+    @property
+    def is_checkmate(self) -> bool:
+        return self.in_check and not self.moves
+
+    @property
+    def is_stalemate(self) -> bool:
+        return not self.in_check and not self.moves
+
+    def move_codes(self) -> Iterable[int]:
+        moves = self.moves
+        for i in range(0, len(moves), 3):
+            yield moves[i] | moves[i + 1] << 8 | moves[i + 2] << 16
+
+    @classmethod
+    def from_moves(cls, codes: Iterable[int], in_check: bool) -> "CachedPosition":
+        packed = bytearray()
+        for code in codes:
+            packed.extend((code & 0xFF, code >> 8 & 0xFF, code >> 16))
+        return cls(bytes(packed), in_check)
+
+    @property
+    def size(self) -> int:
+        return _ENTRY_OVERHEAD + sys.getsizeof(self.moves)
+
+
+class MoveCache:
+    """Size-bounded LRU cache of legal moves and check status by position key.
+
+    One cache is shared by every Game in the process. Entries only hold
+    move codes, so games rebuild their Move records from their own pieces.
+    The least recently used entries are evicted once the estimated size
+    exceeds max_bytes. All operations are thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = 64 << 20):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[int, CachedPosition]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: int) -> Optional[CachedPosition]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def peek(self, key: int) -> Optional[CachedPosition]:
+        """Return the entry for key without counting a hit or miss or refreshing it."""
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key: int, entry: CachedPosition) -> None:
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self.entries[key] = entry
+            self.bytes += entry.size
+            self._evict()
+
+    def resize(self, max_bytes: int) -> None:
+        """Change the memory budget, evicting entries if needed."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.bytes > self.max_bytes and self.entries:
+            _, entry = self.entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+# Used by every Game unless Game.move_cache is replaced or set to None
+DEFAULT_CACHE = MoveCache()
@@ -0,0 +1,92 @@
+from typing import Optional, Tuple
+
+from Piece import Bishop, Knight, Position, Queen, Rook
+# The piece move generators produce codes, so the layout lives in Piece
+from Piece import CAPTURE, CASTLE, EN_PASSANT, END_SHIFT, SQUARE_MASK, SQUARE_POSITIONS
+import Notation
+
+__all__ = [
+    "CAPTURE", "CASTLE", "EN_PASSANT", "END_SHIFT", "SQUARE_MASK", "SQUARES_MASK",
+    "PROMOTION_SHIFT", "PROMOTION_TYPES", "PROMOTION_CODES",
+    "encode", "start_of", "end_of", "squares", "promotion_of", "to_uci", "to_notation", "parse",
+]
+
+
+# A move packed in an int:
+#   bits 0-5    start square, y * 8 + x
+#   bits 6-11   end square
+#   bits 12-14  promotion piece, index in PROMOTION_TYPES (0 for none)
+#   bits 15-17  flags: CAPTURE, CASTLE and EN_PASSANT
+PROMOTION_SHIFT = 12
+# The start and end squares, which identify a move in a given position
+SQUARES_MASK = 0xFFF
+
+PROMOTION_TYPES = (None, Knight, Bishop, Rook, Queen)
+PROMOTION_CODES = {piece_type: i << PROMOTION_SHIFT for i, piece_type in enumerate(PROMOTION_TYPES) if i}
+
+# UCI promotion letters, e.g. the "q" of "a7a8q"
+_LETTERS = {Knight: "n", Bishop: "b", Rook: "r", Queen: "q"}
+_LETTER_TYPES = {letter: piece_type for piece_type, letter in _LETTERS.items()}
+
+
+def encode(start: Position, end: Position, promotion: type = None, flags: int = 0) -> int:
+    """Pack a move; promotion is the piece type a pawn becomes, if any."""
+    code = start.y * 8 + start.x | (end.y * 8 + end.x) << END_SHIFT | flags
+    if promotion is not None:
+        code |= PROMOTION_CODES[promotion]
+    return code
+
+
+def start_of(code: int) -> Position:
+    return SQUARE_POSITIONS[code & SQUARE_MASK]
+
+
+def end_of(code: int) -> Position:
+    return SQUARE_POSITIONS[code >> END_SHIFT & SQUARE_MASK]
+
+
+def squares(code: int) -> Tuple[Position, Position]:
+    """Return the start and end squares of a move."""
+    return SQUARE_POSITIONS[code & SQUARE_MASK], SQUARE_POSITIONS[code >> END_SHIFT & SQUARE_MASK]
+
+
+def promotion_of(code: int) -> Optional[type]:
+    return PROMOTION_TYPES[code >> PROMOTION_SHIFT & 7]
+
+
+def to_uci(code: int) -> str:
+    """Format a move like "e2e4" or "a7a8q"."""
+    start, end = squares(code)
+    promotion = promotion_of(code)
+    names = Notation.SQUARE_NAMES
+    return names[start] + names[end] + (_LETTERS[promotion] if promotion else "")
+
+
+def to_notation(code: int) -> str:
+    """Format a move in the notation of Notation.parse_move, e.g. "e2-e4" or "b7-b8=Q"."""
+    start, end = squares(code)
+    promotion = promotion_of(code)
+    return Notation.format_move(
+        start, end, Notation.PIECE_LETTERS[promotion] if promotion else None
+    )
+
+
+def parse(notation: str) -> int:
+    """Parse a move in UCI form ("e2e4", "a7a8q") or any form Notation.parse_move reads.
+
+    Only the squares and the promotion piece are set, the flags depend on
+    the position the move is played in.
+    """
+    text = notation.strip()
+    if len(text) in (4, 5) and text[:4].isalnum():
+        start = Notation.parse_square(text[0:2])
+        end = Notation.parse_square(text[2:4])
+        promotion = None
+        if len(text) == 5:
+            promotion = _LETTER_TYPES.get(text[4].lower())
+            if promotion is None:
+                raise ValueError(f"Invalid promotion piece: {text[4]!r}")
+        return encode(start, end, promotion)
+    move = Notation.parse_move(text)
+    promotion = Notation.PIECE_TYPES[move.promotion] if move.promotion else None
+    return encode(move.start, move.end, promotion)
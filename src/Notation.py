@@ -0,0 +1,131 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+from Piece import Bishop, King, Knight, Pawn, Position, Queen, Rook
+
+
+# Column 0 of the board is the h-file, column 7 the a-file
+FILES = "hgfedcba"
+
+# All 64 squares, precomputed once: "a1" -> Position(7, 0)
+SQUARES = {
+    f"{file}{y + 1}": Position(x, y) for x, file in enumerate(FILES) for y in range(8)
+}
+
+# Reverse table: Position(7, 0) -> "a1"
+SQUARE_NAMES = {position: name for name, position in SQUARES.items()}
+
+# FEN letters of the white pieces, black pieces use lowercase
+PIECE_TYPES = {"P": Pawn, "N": Knight, "B": Bishop, "R": Rook, "Q": Queen, "K": King}
+PIECE_LETTERS = {piece_type: letter for letter, piece_type in PIECE_TYPES.items()}
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Expands the digits of a FEN placement so every square is one character
+_FEN_DIGITS = str.maketrans({str(n): "." * n for n in range(1, 9)})
+
+# Piece letter, start square, separator, optional captured piece letter,
+# end square, optional promotion piece and check/mate marker
+_MOVE_PATTERN = re.compile(
+    r"\s*([KQRBNPkqrbnp]?)([a-h][1-8])([-xX:])[KQRBNPkqrbnp]?([a-h][1-8])"
+    r"(?:=?([QRBNqrbn]))?([+#]?)\s*"
+)
+
+
+@dataclass(frozen=True)
+class ParsedMove:
+    start: Position
+    end: Position
+    piece: Optional[str] = None
+    capture: bool = False
+    promotion: Optional[str] = None
+    check: bool = False
+    mate: bool = False
+
+
+@dataclass(frozen=True)
+class ParsedFen:
+    # board[y][x] holds a FEN piece letter or None, with the repo's orientation
+    board: List[List[Optional[str]]]
+    turn: str
+    castling: str
+    en_passant: Optional[Position]
+
+
+def parse_square(notation: str) -> Position:
+    """Convert a square like "e4" to a Position."""
+    try:
+        return SQUARES[notation[:2]]
+    except KeyError:
+        raise ValueError(f"Invalid square: {notation!r}") from None
+
+
+def parse_move(notation: str) -> ParsedMove:
+    """Parse moves like "e2-e4", "Rd1xd8", "b7-b8=Q" or "Qd1xd7#" in a single pass."""
+    match = _MOVE_PATTERN.fullmatch(notation)
+    if match is None:
+        raise ValueError("Invalid move")
+    return _to_parsed_move(match)
+
+
+def parse_moves(notations: Iterable[str]) -> Iterator[ParsedMove]:
+    """Parse a list or stream of move strings, raising ValueError on the first bad one."""
+    fullmatch = _MOVE_PATTERN.fullmatch
+    for notation in notations:
+        match = fullmatch(notation)
+        if match is None:
+            raise ValueError(f"Invalid move: {notation!r}")
+        yield _to_parsed_move(match)
+
+
+def parse_move_text(text: str) -> Iterator[ParsedMove]:
+    """Parse all whitespace separated moves of a text, e.g. a whole game on one line."""
+    return parse_moves(text.split())
+
+
+def format_move(start: Position, end: Position, promotion: Optional[str] = None) -> str:
+    """Format a move in the notation parse_move reads, e.g. "e2-e4" or "b7-b8=Q"."""
+    move = f"{SQUARE_NAMES[start]}-{SQUARE_NAMES[end]}"
+    return f"{move}={promotion}" if promotion else move
+
+
+def expand_fen_placement(placement: str) -> str:
+    """Expand a FEN piece placement to 64 characters, a8 first and "." for empty squares."""
+    squares = placement.translate(_FEN_DIGITS).replace("/", "")
+    if len(squares) != 64:
+        raise ValueError(f"Invalid FEN placement: {placement!r}")
+    return squares
+
+
+def parse_fen(fen: str) -> ParsedFen:
+    """Parse the placement, side to move, castling and en passant fields of a FEN."""
+    fields = fen.split()
+    if len(fields) < 2 or fields[1] not in ("w", "b"):
+        raise ValueError(f"Invalid FEN: {fen!r}")
+    squares = expand_fen_placement(fields[0])
+    # FEN lists rank 8 first and the a-file first, the board starts at h1
+    board = [
+        [None if letter == "." else letter for letter in reversed(squares[56 - 8 * y:64 - 8 * y])]
+        for y in range(8)
+    ]
+    castling = fields[2] if len(fields) > 2 else "-"
+    en_passant = fields[3] if len(fields) > 3 else "-"
+    return ParsedFen(
+        board,
+        "white" if fields[1] == "w" else "black",
+        castling,
+        None if en_passant == "-" else parse_square(en_passant),
+    )
+
+
+def _to_parsed_move(match: "re.Match") -> ParsedMove:
+    piece, start, separator, end, promotion, marker = match.groups()
+    return ParsedMove(
+        SQUARES[start],
+        SQUARES[end],
+        piece.upper() or None,
+        separator != "-",
+        promotion.upper() if promotion else None,
+        marker == "+",
+        marker == "#",
+    )
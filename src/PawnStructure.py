@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from typing import Tuple
+from Piece import Pawn
+
+
+# Penalties and bonuses as (middlegame, endgame) centipawns
+DOUBLED = (-10, -20)
+ISOLATED = (-10, -15)
+BACKWARD = (-8, -10)
+# Passed pawn bonus by rank counted from the pawn's own side
+PASSED_MG = (0, 5, 10, 15, 25, 40, 60, 0)
+PASSED_EG = (0, 10, 20, 35, 60, 100, 150, 0)
+# Middlegame bonus per shield pawn one and two ranks in front of the king
+SHIELD = (15, 8)
+
+
+@dataclass(frozen=True)
+class PawnEntry:
+    key: int
+    # Pawn structure score, white minus black
+    mg: int
+    eg: int
+    # Bit y * 8 + x is set for every passed pawn of white and black
+    passed: Tuple[int, int]
+    # Shield bonus of white and black for a king on each file of its back rank
+    shield: Tuple[Tuple[int, ...], Tuple[int, ...]]
+
+
+def evaluate_pawns(game) -> PawnEntry:
+    """Compute the pawn structure terms of a game from its pawns alone."""
+    pawns = {"white": [], "black": []}
+    for color, pieces in game.pieces.items():
+        for position, piece in pieces.items():
+            if isinstance(piece, Pawn):
+                pawns[color].append((position.x, position.y))
+
+    mg = eg = 0
+    passed = []
+    shields = []
+    for color, sign, forward in (("white", 1, 1), ("black", -1, -1)):
+        own = pawns[color]
+        enemy = pawns["black" if color == "white" else "white"]
+        files = [0] * 10  # padded so x - 1 and x + 1 need no bounds checks
+        for x, y in own:
+            files[x + 1] += 1
+
+        color_mg = color_eg = 0
+        passed_mask = 0
+        for count in files:
+            if count > 1:
+                color_mg += DOUBLED[0] * (count - 1)
+                color_eg += DOUBLED[1] * (count - 1)
+
+        for x, y in own:
+            relative_rank = y if forward == 1 else 7 - y
+            if not files[x] and not files[x + 2]:
+                color_mg += ISOLATED[0]
+                color_eg += ISOLATED[1]
+            elif not any(
+                abs(ox - x) == 1 and (oy - y) * forward <= 0 for ox, oy in own
+            ) and any(
+                abs(ex - x) == 1 and ey == y + 2 * forward for ex, ey in enemy
+            ):
+                # No neighbour can support the pawn and its stop square is attacked
+                color_mg += BACKWARD[0]
+                color_eg += BACKWARD[1]
+
+            if not any(abs(ex - x) <= 1 and (ey - y) * forward > 0 for ex, ey in enemy):
+                passed_mask |= 1 << (y * 8 + x)
+                color_mg += PASSED_MG[relative_rank]
+                color_eg += PASSED_EG[relative_rank]
+
+        back_rank = 0 if forward == 1 else 7
+        shield = []
+        for king_x in range(8):
+            bonus = 0
+            for x, y in own:
+                distance = (y - back_rank) * forward
+                if abs(x - king_x) <= 1 and 1 <= distance <= 2:
+                    bonus += SHIELD[distance - 1]
+            shield.append(bonus)
+
+        mg += sign * color_mg
+        eg += sign * color_eg
+        passed.append(passed_mask)
+        shields.append(tuple(shield))
+
+    return PawnEntry(game.pawn_key, mg, eg, tuple(passed), tuple(shields))
+
+
+class PawnCache:
+    """Fixed-size pawn structure cache indexed by the game's pawn key.
+
+    Each key maps to one slot; a new entry always replaces the old one.
+    """
+
+    def __init__(self, size: int = 1 << 14):
+        if size <= 0 or size & (size - 1):
+            raise ValueError("Pawn cache size must be a power of two")
+        self.entries = [None] * size
+        self.mask = size - 1
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, game) -> PawnEntry:
+        key = game.pawn_key
+        slot = key & self.mask
+        entry = self.entries[slot]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = evaluate_pawns(game)
+        self.entries[slot] = entry
+        return entry
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self) -> None:
+        self.entries = [None] * len(self.entries)
+        self.hits = 0
+        self.misses = 0
+
+
+# Shared by Evaluation.evaluate unless a cache is passed explicitly
+DEFAULT_CACHE = PawnCache()
+
+
+def pawn_score(game, cache: PawnCache = None) -> Tuple[int, int]:
+    """Return the (mg, eg) pawn structure and king shield score, white minus black."""
+    entry = (cache or DEFAULT_CACHE).probe(game)
+    mg = entry.mg
+    for index, color, back_rank, sign in ((0, "white", 0, 1), (1, "black", 7, -1)):
+        king_position = game.king_positions[color]
+        if king_position is not None and abs(king_position.y - back_rank) <= 1:
+            mg += sign * entry.shield[index][king_position.x]
+    return mg, entry.eg
@@ -1,11 +1,13 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List
-import svgwrite
-import os
+from typing import TYPE_CHECKING, List, Tuple
+from Events import Castled, Captured, EnPassant, Moved, Promoted
 
+if TYPE_CHECKING:
+    import svgwrite
 
-@dataclass
+
+@dataclass(frozen=True)
 class Position:
     x: int
     y: int
@@ -20,6 +22,45 @@ class Position:
         return f"({self.x}, {self.y})"
 
 
+# Position of every square index y * 8 + x, shared by all move codes and records
+SQUARE_POSITIONS = [Position(square & 7, square >> 3) for square in range(64)]
+
+# Layout of a move packed in an int, see MoveCode: the start square in
+# bits 0-5, the end square in bits 6-11, the promotion piece in bits 12-14
+# and the flags from bit 15
+END_SHIFT = 6
+SQUARE_MASK = 0x3F
+CAPTURE = 1 << 15
+CASTLE = 1 << 16
+EN_PASSANT = 1 << 17
+# Promotion to a queen, the fourth of MoveCode.PROMOTION_TYPES
+PROMOTE_TO_QUEEN = 4 << 12
+
+STRAIGHT = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def _targets(offsets: Tuple[Tuple[int, int], ...]) -> List[Tuple[int, ...]]:
+    # Squares one step of each offset away from every square, on the board
+    return [
+        tuple(
+            ((square >> 3) + dy) * 8 + (square & 7) + dx for dx, dy in offsets
+            if 0 <= (square & 7) + dx < 8 and 0 <= (square >> 3) + dy < 8
+        )
+        for square in range(64)
+    ]
+
+
+KNIGHT_TARGETS = _targets(((1, 2), (2, 1), (-1, 2), (-2, 1), (-1, -2), (-2, -1), (1, -2), (2, -1)))
+KING_TARGETS = _targets(DIAGONAL + STRAIGHT)
+
+
+def _end_order(code: int) -> int:
+    # Moves are listed by the column, then the row of their end square
+    end = code >> END_SHIFT & SQUARE_MASK
+    return (end & 7) << 3 | end >> 3
+
+
 @dataclass
 class Piece(ABC):
     color: str
@@ -27,7 +68,8 @@ class Piece(ABC):
     game: "Game" = None  # type: ignore
     
     @abstractmethod
-    def get_possible_moves(self) -> List[Position]:
+    def move_codes(self) -> List[int]:
+        """Return the moves of the piece as packed integers sorted by end square, see MoveCode."""
         pass
     
     @abstractmethod
@@ -37,10 +79,37 @@ class Piece(ABC):
     @abstractmethod
     def asText(self) -> str:
         pass
+
+    def get_possible_moves(self) -> List[Position]:
+        """Return the end squares of move_codes."""
+        return [SQUARE_POSITIONS[code >> END_SHIFT & SQUARE_MASK] for code in self.move_codes()]
+
+    def _slide(self, directions: Tuple[Tuple[int, int], ...]) -> List[int]:
+        # Moves of a sliding piece along each direction up to the first piece
+        board = self.game.board
+        start = self.position.y * 8 + self.position.x
+        codes = []
+        for dx, dy in directions:
+            x = self.position.x + dx
+            y = self.position.y + dy
+            while 0 <= x < 8 and 0 <= y < 8:
+                target = board[y][x]
+                if target is None:
+                    codes.append(start | (y * 8 + x) << END_SHIFT)
+                else:
+                    if target.color != self.color:
+                        codes.append(start | (y * 8 + x) << END_SHIFT | CAPTURE)
+                    break
+                x += dx
+                y += dy
+        codes.sort(key=_end_order)
+        return codes
     
-    @abstractmethod
-    def to_svg(self):
-        pass
+    def to_svg(self, dwg: "svgwrite.Drawing", x: int, y: int) -> None:
+        # Rendering is optional, svgwrite is only imported on first use
+        from Render import draw_piece
+
+        draw_piece(self, dwg, x, y)
 
 
 class Pawn(Piece):
@@ -52,149 +121,125 @@ class Pawn(Piece):
     def __str__(self) -> str:
         return "♙" if self.color == "white" else "♟"
 
-    def get_possible_moves(self) -> List[Position]:
-        possible_moves = []
-
+    def move_codes(self) -> List[int]:
+        board = self.game.board
+        x, y = self.position.x, self.position.y
+        start = y * 8 + x
         if self.color == "white":
+            forward, home, passing, last = 1, 1, 4, 7
+        else:
+            forward, home, passing, last = -1, 6, 3, 0
+        codes = []
+
+        ahead = y + forward
+        if 0 <= ahead < 8:
             # Normal moves
-            if self.position.y < 7:
-                if self.game.board[self.position.y + 1][self.position.x] is None:
-                    possible_moves.append(Position(self.position.x, self.position.y + 1))
-                    # First move - two squares
-                    if not self.has_moved and self.position.y == 1:
-                        if self.game.board[self.position.y + 2][self.position.x] is None:
-                            possible_moves.append(Position(self.position.x, self.position.y + 2))
-            
-            # Diagonal captures and en passant
-            if self.position.y < 7:  # Can capture forward
-                # Right diagonal capture
-                if self.position.x + 1 < 8:
-                    # Normal capture
-                    target = self.game.board[self.position.y + 1][self.position.x + 1]
-                    if target is not None and target.color != self.color:
-                        possible_moves.append(Position(self.position.x + 1, self.position.y + 1))
-                    # En passant
-                    if self.position.y == 4:  # White pawns can only en passant from rank 5
-                        target = self.game.board[self.position.y][self.position.x + 1]
-                        if (isinstance(target, Pawn) and 
-                            target.color != self.color and 
-                            target.en_passant_vulnerable):
-                            possible_moves.append(Position(self.position.x + 1, self.position.y + 1))
-                
-                # Left diagonal capture
-                if self.position.x - 1 >= 0:
-                    # Normal capture
-                    target = self.game.board[self.position.y + 1][self.position.x - 1]
-                    if target is not None and target.color != self.color:
-                        possible_moves.append(Position(self.position.x - 1, self.position.y + 1))
-                    # En passant
-                    if self.position.y == 4:  # White pawns can only en passant from rank 5
-                        target = self.game.board[self.position.y][self.position.x - 1]
-                        if (isinstance(target, Pawn) and 
-                            target.color != self.color and 
-                            target.en_passant_vulnerable):
-                            possible_moves.append(Position(self.position.x - 1, self.position.y + 1))
-
-        else:  # Black pawn
-            # Normal moves
-            if self.position.y > 0:
-                if self.game.board[self.position.y - 1][self.position.x] is None:
-                    possible_moves.append(Position(self.position.x, self.position.y - 1))
-                    # First move - two squares
-                    if not self.has_moved and self.position.y == 6:
-                        if self.game.board[self.position.y - 2][self.position.x] is None:
-                            possible_moves.append(Position(self.position.x, self.position.y - 2))
-            
+            if board[ahead][x] is None:
+                codes.append(start | (ahead * 8 + x) << END_SHIFT)
+                # First move - two squares
+                if not self.has_moved and y == home and board[ahead + forward][x] is None:
+                    codes.append(start | ((ahead + forward) * 8 + x) << END_SHIFT)
+
             # Diagonal captures and en passant
-            if self.position.y > 0:  # Can capture forward
-                # Right diagonal capture
-                if self.position.x + 1 < 8:
-                    # Normal capture
-                    target = self.game.board[self.position.y - 1][self.position.x + 1]
-                    if target is not None and target.color != self.color:
-                        possible_moves.append(Position(self.position.x + 1, self.position.y - 1))
-                    # En passant
-                    if self.position.y == 3:  # Black pawns can only en passant from rank 4
-                        target = self.game.board[self.position.y][self.position.x + 1]
-                        if (isinstance(target, Pawn) and 
-                            target.color != self.color and 
-                            target.en_passant_vulnerable):
-                            possible_moves.append(Position(self.position.x + 1, self.position.y - 1))
-                
-                # Left diagonal capture
-                if self.position.x - 1 >= 0:
-                    # Normal capture
-                    target = self.game.board[self.position.y - 1][self.position.x - 1]
-                    if target is not None and target.color != self.color:
-                        possible_moves.append(Position(self.position.x - 1, self.position.y - 1))
-                    # En passant
-                    if self.position.y == 3:  # Black pawns can only en passant from rank 4
-                        target = self.game.board[self.position.y][self.position.x - 1]
-                        if (isinstance(target, Pawn) and 
-                            target.color != self.color and 
-                            target.en_passant_vulnerable):
-                            possible_moves.append(Position(self.position.x - 1, self.position.y - 1))
+            for side in (x + 1, x - 1):
+                if not 0 <= side < 8:
+                    continue
+                # Normal capture
+                target = board[ahead][side]
+                if target is not None and target.color != self.color:
+                    codes.append(start | (ahead * 8 + side) << END_SHIFT | CAPTURE)
+                # En passant, only from the mover's fifth rank
+                if y == passing:
+                    target = board[y][side]
+                    if (isinstance(target, Pawn) and
+                        target.color != self.color and
+                        target.en_passant_vulnerable):
+                        codes.append(start | (ahead * 8 + side) << END_SHIFT | CAPTURE | EN_PASSANT)
+
+            # Handle promotion
+            if ahead == last:
+                codes = [code | PROMOTE_TO_QUEEN for code in codes]
 
         # Filter moves that would put own king in check
-        possible_moves = [move for move in possible_moves if not self._would_be_in_check(move)]
-        return sorted(possible_moves, key=lambda pos: (pos.x, pos.y))
+        codes = [
+            code for code in codes
+            if not self._would_be_in_check(SQUARE_POSITIONS[code >> END_SHIFT & SQUARE_MASK])
+        ]
+        codes.sort(key=_end_order)
+        return codes
 
     def move(self, end: Position) -> None:
+        game = self.game
+        start = self.position
+        passed_at = None
         # Handle en passant capture
-        if abs(end.x - self.position.x) == 1 and self.game.board[end.y][end.x] is None:
+        if abs(end.x - self.position.x) == 1 and game.board[end.y][end.x] is None:
             # This must be an en passant capture
-            captured_pawn_y = self.position.y
-            self.game.board[captured_pawn_y][end.x] = None
+            passed_at = Position(end.x, self.position.y)
+            passed = game._remove_piece(passed_at)
+            if game._listeners:
+                game._emit(Captured(passed, passed_at))
 
-        # Reset en passant vulnerability for all pawns
-        for row in self.game.board:
-            for piece in row:
-                if isinstance(piece, Pawn):
-                    piece.en_passant_vulnerable = False
+        # Reset en passant vulnerability of the last pawn that moved two squares
+        if game.en_passant_pawn is not None:
+            game.en_passant_pawn.en_passant_vulnerable = False
+            game.en_passant_pawn = None
 
         # Set en passant vulnerability if moving two squares
         if abs(end.y - self.position.y) == 2:
             self.en_passant_vulnerable = True
+            game.en_passant_pawn = self
 
         # Handle promotion
         if (self.color == "white" and end.y == 7) or (self.color == "black" and end.y == 0):
-            self.game.board[self.position.y][self.position.x] = None
-            self.game.board[end.y][end.x] = Queen(self.color, end, self.game)
+            game._remove_piece(self.position)
+            captured = game._remove_piece(end)
+            queen = Queen(self.color, end, game)
+            game._put_piece(queen, end)
+            if game._listeners:
+                if captured is not None:
+                    game._emit(Captured(captured, end))
+                game._emit(Moved(self, start, end))
+                game._emit(Promoted(queen, end))
         else:
-            self.game.board[self.position.y][self.position.x] = None
-            self.position = end
-            self.game.board[end.y][end.x] = self
+            game._move_piece(self, end)
+            if passed_at is not None and game._listeners:
+                game._emit(EnPassant(start, end, passed_at))
             
         self.has_moved = True
 
     def _would_be_in_check(self, end: Position) -> bool:
-        # Create a copy of the game state
+        game = self.game
         original_position = self.position
-        original_board = [row[:] for row in self.game.board]
-        
-        # Make the move
-        self.game.board[self.position.y][self.position.x] = None
-        self.position = end
-        self.game.board[end.y][end.x] = self
+
+        # Make the move, an en passant capture takes the pawn beside us
+        passed_at = None
+        if end.x != original_position.x and game.board[end.y][end.x] is None:
+            passed_at = Position(end.x, original_position.y)
+        passed = game._remove_piece(passed_at) if passed_at is not None else None
+        origin = game._remove_piece(original_position)
+        captured = game._remove_piece(end)
+        game._put_piece(self, end)
         
         # Check if the move would put own king in check
-        in_check = self.game.is_check(self.color)
+        in_check = game._in_check(self.color)
         
         # Restore the original state
+        game._remove_piece(end)
+        if captured is not None:
+            game._put_piece(captured, end)
+        if passed is not None:
+            game._put_piece(passed, passed_at)
+        if origin is not None:
+            game._put_piece(origin, original_position)
         self.position = original_position
-        self.game.board = original_board
         
         return in_check
 
     def asText(self):
         return "Pawn"
-    
-    def to_svg(self, dwg: svgwrite.Drawing, x: int, y: int):
-        # Drawing a pawn
-        image_path = os.path.join("src", "images", f"{self.color}_pawn.svg")
-        dwg.add(dwg.image(image_path, insert=(x * 50 + 8, y * 50 + 7), size=(35, 35)))
-        
-        
+
+
 class Rook(Piece):
     def __init__(self, color: str, position: Position = None, game: "Game" = None):
         super().__init__(color, position, game)
@@ -203,348 +248,141 @@ class Rook(Piece):
     def __str__(self) -> str:
         return "♖" if self.color == "white" else "♜"
 
-    def get_possible_moves(self) -> List[Position]:
-        # Move horizontally
-        possible_moves = []
-        for i in range(self.position.x + 1, 8):
-            if self.game.board[self.position.y][i] is None:
-                possible_moves.append(Position(i, self.position.y))
-            else:
-                if self.game.board[self.position.y][i].color != self.color:
-                    possible_moves.append(Position(i, self.position.y))
-                break
-        for i in range(self.position.x - 1, -1, -1):
-            if self.game.board[self.position.y][i] is None:
-                possible_moves.append(Position(i, self.position.y))
-            else:
-                if self.game.board[self.position.y][i].color != self.color:
-                    possible_moves.append(Position(i, self.position.y))
-                break
-        # Move vertically
-        for i in range(self.position.y + 1, 8):
-            if self.game.board[i][self.position.x] is None:
-                possible_moves.append(Position(self.position.x, i))
-            else:
-                if self.game.board[i][self.position.x].color != self.color:
-                    possible_moves.append(Position(self.position.x, i))
-                break
-        for i in range(self.position.y - 1, -1, -1):
-            if self.game.board[i][self.position.x] is None:
-                possible_moves.append(Position(self.position.x, i))
-            else:
-                if self.game.board[i][self.position.x].color != self.color:
-                    possible_moves.append(Position(self.position.x, i))
-                break
-            
-        possible_moves = sorted(possible_moves, key=lambda pos: (pos.x, pos.y))
-        return possible_moves
+    def move_codes(self) -> List[int]:
+        return self._slide(STRAIGHT)
     
     def move(self, end: Position) -> None:
-        self.game.board[self.position.y][self.position.x] = None
-        self.position = end
-        self.game.board[end.y][end.x] = self
+        self.game._move_piece(self, end)
         self.has_moved = True
         
     def asText(self):
         return "Rook"
-    
-    def to_svg(self, dwg: svgwrite.Drawing, x: int, y: int):
-        # Drawing a rook
-        image_path = os.path.join("src", "images", f"{self.color}_rook.svg")
-        dwg.add(dwg.image(image_path, insert=(x * 50 + 8, y * 50 + 7), size=(35, 35)))
 
 
 class Knight(Piece):
     def __str__(self) -> str:
         return "♘" if self.color == "white" else "♞"
 
-    def get_possible_moves(self) -> List[Position]:
-        possible_moves = []
-        for dx, dy in [
-            (1, 2),
-            (2, 1),
-            (-1, 2),
-            (-2, 1),
-            (-1, -2),
-            (-2, -1),
-            (1, -2),
-            (2, -1),
-        ]:
-            x = self.position.x + dx
-            y = self.position.y + dy
-            if 0 <= x < 8 and 0 <= y < 8:
-                if self.game.board[y][x] is None or self.game.board[y][x].color != self.color:
-                    possible_moves.append(Position(x, y))
-        
-        possible_moves = sorted(possible_moves, key=lambda pos: (pos.x, pos.y))
-        return possible_moves
+    def move_codes(self) -> List[int]:
+        board = self.game.board
+        start = self.position.y * 8 + self.position.x
+        codes = []
+        for end in KNIGHT_TARGETS[start]:
+            target = board[end >> 3][end & 7]
+            if target is None:
+                codes.append(start | end << END_SHIFT)
+            elif target.color != self.color:
+                codes.append(start | end << END_SHIFT | CAPTURE)
+        codes.sort(key=_end_order)
+        return codes
     
     def move(self, end: Position) -> None:
-        self.game.board[self.position.y][self.position.x] = None
-        self.position = end
-        self.game.board[end.y][end.x] = self
+        self.game._move_piece(self, end)
         
     def asText(self):
         return "Knight"
-    
-    def to_svg(self, dwg: svgwrite.Drawing, x: int, y: int):
-        # Drawing a knight
-        image_path = os.path.join("src", "images", f"{self.color}_knight.svg")
-        dwg.add(dwg.image(image_path, insert=(x * 50 + 7, y * 50 + 7), size=(35, 35)))
-
 
 
 class Bishop(Piece):
     def __str__(self) -> str:
         return "♗" if self.color == "white" else "♝"
 
-    def get_possible_moves(self) -> List[Position]:
-        possible_moves = []
-        for dx, dy in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-            x = self.position.x + dx
-            y = self.position.y + dy
-            while 0 <= x < 8 and 0 <= y < 8:
-                if self.game.board[y][x] is None:
-                    possible_moves.append(Position(x, y))
-                else:
-                    if self.game.board[y][x].color != self.color:
-                        possible_moves.append(Position(x, y))
-                    break
-                x += dx
-                y += dy
-        
-        possible_moves = sorted(possible_moves, key=lambda pos: (pos.x, pos.y))
-        return possible_moves
+    def move_codes(self) -> List[int]:
+        return self._slide(DIAGONAL)
     
     def move(self, end: Position) -> None:
-        self.game.board[self.position.y][self.position.x] = None
-        self.position = end
-        self.game.board[end.y][end.x] = self
+        self.game._move_piece(self, end)
         
     def asText(self):
         return "Bishop"
-    
-    def to_svg(self, dwg: svgwrite.Drawing, x: int, y: int):
-        # Drawing a bishop
-        image_path = os.path.join("src", "images", f"{self.color}_bishop.svg")
-        dwg.add(dwg.image(image_path, insert=(x * 50 + 8, y * 50 + 7), size=(35, 35)))
 
 
 class Queen(Piece):
     def __str__(self) -> str:
         return "♕" if self.color == "white" else "♛"
 
-    def get_possible_moves(self) -> List[Position]:
-        possible_moves = []
-        for dx, dy in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-            x = self.position.x + dx
-            y = self.position.y + dy
-            while 0 <= x < 8 and 0 <= y < 8:
-                if self.game.board[y][x] is None:
-                    possible_moves.append(Position(x, y))
-                else:
-                    if self.game.board[y][x].color != self.color:
-                        possible_moves.append(Position(x, y))
-                    break
-                x += dx
-                y += dy
-        for i in range(self.position.x + 1, 8):
-            if self.game.board[self.position.y][i] is None:
-                possible_moves.append(Position(i, self.position.y))
-            else:
-                if self.game.board[self.position.y][i].color != self.color:
-                    possible_moves.append(Position(i, self.position.y))
-                break
-        for i in range(self.position.x - 1, -1, -1):
-            if self.game.board[self.position.y][i] is None:
-                possible_moves.append(Position(i, self.position.y))
-            else:
-                if self.game.board[self.position.y][i].color != self.color:
-                    possible_moves.append(Position(i, self.position.y))
-                break
-        for i in range(self.position.y + 1, 8):
-            if self.game.board[i][self.position.x] is None:
-                possible_moves.append(Position(self.position.x, i))
-            else:
-                if self.game.board[i][self.position.x].color != self.color:
-                    possible_moves.append(Position(self.position.x, i))
-                break
-        for i in range(self.position.y - 1, -1, -1):
-            if self.game.board[i][self.position.x] is None:
-                possible_moves.append(Position(self.position.x, i))
-            else:
-                if self.game.board[i][self.position.x].color != self.color:
-                    possible_moves.append(Position(self.position.x, i))
-                break
-        
-        possible_moves = sorted(possible_moves, key=lambda pos: (pos.x, pos.y))
-        return possible_moves
+    def move_codes(self) -> List[int]:
+        return self._slide(DIAGONAL + STRAIGHT)
     
     def move(self, end: Position) -> None:
-        self.game.board[self.position.y][self.position.x] = None
-        self.position = end
-        self.game.board[end.y][end.x] = self
+        self.game._move_piece(self, end)
         
     def asText(self):
         return "Queen"
-    
-    def to_svg(self, dwg: svgwrite.Drawing, x: int, y: int):
-        # Drawing a queen
-        image_path = os.path.join("src", "images", f"{self.color}_queen.svg")
-        dwg.add(dwg.image(image_path, insert=(x * 50 + 8, y * 50 + 7), size=(35, 35)))
-
 
 
 class King(Piece):
+    def __init__(self, color: str, position: Position = None, game: "Game" = None):
+        super().__init__(color, position, game)
+        self.has_moved = False
+
     def __str__(self) -> str:
         return "♔" if self.color == "white" else "♚"
 
-    def get_possible_moves(self) -> List[Position]:
-        possible_moves = []
+    def move_codes(self) -> List[int]:
+        board = self.game.board
+        x, y = self.position.x, self.position.y
+        start = y * 8 + x
+        codes = []
         # Normal moves
-        for dx, dy in [
-            (1, 1), (1, -1), (-1, 1), (-1, -1),
-            (1, 0), (-1, 0), (0, 1), (0, -1),
-        ]:
-            x = self.position.x + dx
-            y = self.position.y + dy
-            if 0 <= x < 8 and 0 <= y < 8:
-                if self.game.board[y][x] is None or self.game.board[y][x].color != self.color:
-                    if not self._would_square_be_attacked(Position(x, y)):
-                        possible_moves.append(Position(x, y))
+        for end in KING_TARGETS[start]:
+            target = board[end >> 3][end & 7]
+            if target is None or target.color != self.color:
+                if not self._would_square_be_attacked(SQUARE_POSITIONS[end]):
+                    codes.append(start | end << END_SHIFT | (CAPTURE if target is not None else 0))
         
         # Castling moves
-        if not hasattr(self, 'has_moved'):
-            self.has_moved = False
-            
         if not self.has_moved:
             # Only check castling if the king is not in check
-            king_pos = Position(self.position.x, self.position.y)
-            if not self._would_square_be_attacked(king_pos):
+            if not self._would_square_be_attacked(self.position):
+                home = x == 4 and y == (0 if self.color == "white" else 7)
+                row = board[y]
                 # Kingside castling
-                if (self.position.x == 4 and 
-                    (self.position.y == 0 if self.color == "white" else self.position.y == 7)):
-                    if (self.game.board[self.position.y][7] is not None and 
-                        isinstance(self.game.board[self.position.y][7], Rook) and
-                        not getattr(self.game.board[self.position.y][7], 'has_moved', True)):
-                        if (self.game.board[self.position.y][5] is None and 
-                            self.game.board[self.position.y][6] is None):
-                            # Check if squares are under attack
-                            if (not self._would_square_be_attacked(Position(5, self.position.y)) and
-                                not self._would_square_be_attacked(Position(6, self.position.y))):
-                                possible_moves.append(Position(6, self.position.y))
+                if home and isinstance(row[7], Rook) and not getattr(row[7], 'has_moved', True):
+                    if row[5] is None and row[6] is None:
+                        # Check if squares are under attack
+                        if (not self._would_square_be_attacked(SQUARE_POSITIONS[y * 8 + 5]) and
+                            not self._would_square_be_attacked(SQUARE_POSITIONS[y * 8 + 6])):
+                            codes.append(start | (y * 8 + 6) << END_SHIFT | CASTLE)
                         
                 # Queenside castling
-                if (self.position.x == 4 and 
-                    (self.position.y == 0 if self.color == "white" else self.position.y == 7)):
-                    if (self.game.board[self.position.y][0] is not None and 
-                        isinstance(self.game.board[self.position.y][0], Rook) and
-                        not getattr(self.game.board[self.position.y][0], 'has_moved', True)):
-                        if (self.game.board[self.position.y][1] is None and 
-                            self.game.board[self.position.y][2] is None and
-                            self.game.board[self.position.y][3] is None):
-                            # Check if squares are under attack
-                            if (not self._would_square_be_attacked(Position(2, self.position.y)) and
-                                not self._would_square_be_attacked(Position(3, self.position.y))):
-                                possible_moves.append(Position(2, self.position.y))
+                if home and isinstance(row[0], Rook) and not getattr(row[0], 'has_moved', True):
+                    if row[1] is None and row[2] is None and row[3] is None:
+                        # Check if squares are under attack
+                        if (not self._would_square_be_attacked(SQUARE_POSITIONS[y * 8 + 2]) and
+                            not self._would_square_be_attacked(SQUARE_POSITIONS[y * 8 + 3])):
+                            codes.append(start | (y * 8 + 2) << END_SHIFT | CASTLE)
                 
-        return sorted(possible_moves, key=lambda pos: (pos.x, pos.y))
+        codes.sort(key=_end_order)
+        return codes
 
     def _would_square_be_attacked(self, pos: Position) -> bool:
         """Check if a square would be attacked by any opponent piece without recursion"""
-        for row in self.game.board:
-            for piece in row:
-                if piece is not None and piece.color != self.color:
-                    # For pawns, check their attack pattern directly
-                    if isinstance(piece, Pawn):
-                        if piece.color == "white":
-                            if (piece.position.y + 1 == pos.y and 
-                                abs(piece.position.x - pos.x) == 1):
-                                return True
-                        else:
-                            if (piece.position.y - 1 == pos.y and 
-                                abs(piece.position.x - pos.x) == 1):
-                                return True
-                        continue
-
-                    # For knights, check their movement pattern directly
-                    if isinstance(piece, Knight):
-                        dx = abs(piece.position.x - pos.x)
-                        dy = abs(piece.position.y - pos.y)
-                        if (dx == 2 and dy == 1) or (dx == 1 and dy == 2):
-                            return True
-                        continue
-
-                    # For other pieces, check if there's a clear path
-                    dx = pos.x - piece.position.x
-                    dy = pos.y - piece.position.y
-
-                    # Rook-like movements (horizontal/vertical)
-                    if isinstance(piece, (Rook, Queen)):
-                        if dx == 0 or dy == 0:
-                            step_x = 0 if dx == 0 else dx // abs(dx)
-                            step_y = 0 if dy == 0 else dy // abs(dy)
-                            x, y = piece.position.x + step_x, piece.position.y + step_y
-                            clear_path = True
-                            while (x, y) != (pos.x, pos.y):
-                                if self.game.board[y][x] is not None:
-                                    clear_path = False
-                                    break
-                                x += step_x
-                                y += step_y
-                            if clear_path:
-                                return True
-
-                    # Bishop-like movements (diagonal)
-                    if isinstance(piece, (Bishop, Queen)):
-                        if abs(dx) == abs(dy):
-                            step_x = dx // abs(dx)
-                            step_y = dy // abs(dy)
-                            x, y = piece.position.x + step_x, piece.position.y + step_y
-                            clear_path = True
-                            while (x, y) != (pos.x, pos.y):
-                                if self.game.board[y][x] is not None:
-                                    clear_path = False
-                                    break
-                                x += step_x
-                                y += step_y
-                            if clear_path:
-                                return True
-
-                    # King attacks (one square in any direction)
-                    if isinstance(piece, King):
-                        if abs(dx) <= 1 and abs(dy) <= 1:
-                            return True
-
-        return False
+        opponent = "black" if self.color == "white" else "white"
+        return self.game._is_attacked(pos, opponent)
 
     def move(self, end: Position) -> None:
+        start = self.position
+        rook_move = None
         # Handle castling
         if not self.has_moved and abs(end.x - self.position.x) == 2:
             # Kingside castling
             if end.x == 6:
                 rook = self.game.board[self.position.y][7]
-                self.game.board[self.position.y][7] = None
-                self.game.board[self.position.y][5] = rook
-                rook.position = Position(5, self.position.y)
+                rook_move = (rook.position, Position(5, self.position.y))
+                self.game._move_piece(rook, Position(5, self.position.y))
                 rook.has_moved = True
             # Queenside castling
             elif end.x == 2:
                 rook = self.game.board[self.position.y][0]
-                self.game.board[self.position.y][0] = None
-                self.game.board[self.position.y][3] = rook
-                rook.position = Position(3, self.position.y)
+                rook_move = (rook.position, Position(3, self.position.y))
+                self.game._move_piece(rook, Position(3, self.position.y))
                 rook.has_moved = True
                 
-        self.game.board[self.position.y][self.position.x] = None
-        self.position = end
-        self.game.board[end.y][end.x] = self
+        self.game._move_piece(self, end)
         self.has_moved = True
+        if rook_move is not None and self.game._listeners:
+            self.game._emit(Castled(self.color, start, end, *rook_move))
         
     def asText(self):
         return "King"
-    
-    def to_svg(self, dwg: svgwrite.Drawing, x: int, y: int):
-        # Drawing a king
-        image_path = os.path.join("src", "images", f"{self.color}_king.svg")
-        dwg.add(dwg.image(image_path, insert=(x * 50 + 8, y * 50 + 7), size=(35, 35)))
\ No newline at end of file
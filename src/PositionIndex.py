@@ -0,0 +1,314 @@
+import argparse
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from collections import Counter, deque
+from itertools import islice
+from multiprocessing import Pool
+from typing import BinaryIO, Iterable, Iterator, List, Tuple, Union
+
+from Chessboard import Game
+import MoveCode
+
+
+# Index file: header, then (position key, game id, ply) entries sorted by key
+MAGIC = b"CPIX"
+VERSION = 1
+HEADER = struct.Struct("<4sIQ")  # magic, version, entry count
+ENTRY = struct.Struct("<QIH")  # position key, game id, ply
+# Side table "<index>.games": header, then the byte offset of every game in the archive
+GAMES_MAGIC = b"CPIG"
+
+# Entries read or written per block when sorting and merging
+_BLOCK = 8192
+# Run files merged at once, kept below the open file limit
+_FAN_IN = 128
+
+_RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+
+
+def iter_moves(line: str) -> Iterator[int]:
+    """Yield the moves of an archive line as packed integers, see MoveCode.
+
+    A line holds one game from the start position, moves separated by
+    whitespace in UCI ("e2e4") or the repo's notation ("e2-e4"). Move
+    numbers like "1." and a trailing result are skipped. Tokens are parsed
+    one at a time, so the moves before a bad token are yielded before it
+    raises ValueError.
+    """
+    for token in line.split():
+        if token not in _RESULTS and not token.rstrip(".").isdigit():
+            yield MoveCode.parse(token)
+
+
+def parse_game(line: str) -> List[int]:
+    """Return all the moves of an archive line, see iter_moves."""
+    return list(iter_moves(line))
+
+
+def game_entries(game_id: int, line: str) -> Iterator[Tuple[int, int, int]]:
+    """Replay a game and yield (position key, game id, ply) for every position.
+
+    Ply 0 is the start position. Replay stops at the first illegal or
+    unreadable move.
+    """
+    game = Game()
+    yield game.position_key(), game_id, 0
+    try:
+        for ply, code in enumerate(iter_moves(line), 1):
+            game.make_move(code)
+            yield game.position_key(), game_id, ply
+    except ValueError:
+        return
+
+
+def _index_chunk(task: Tuple[List[Tuple[int, str]], str]) -> Tuple[str, int]:
+    # Sort the entries of a chunk of games into a run file
+    chunk, directory = task
+    entries = sorted(entry for game_id, line in chunk for entry in game_entries(game_id, line))
+    path = os.path.join(directory, f"run-{chunk[0][0]}.bin")
+    with open(path, "wb") as f:
+        _write_entries(f, entries)
+    return path, len(entries)
+
+
+def _write_entries(f: BinaryIO, entries: Iterable[Tuple[int, int, int]]) -> int:
+    pack = ENTRY.pack
+    count = 0
+    entries = iter(entries)
+    while True:
+        block = list(islice(entries, _BLOCK))
+        if not block:
+            return count
+        f.write(b"".join(pack(*entry) for entry in block))
+        count += len(block)
+
+
+def _read_entries(path: str, offset: int = 0) -> Iterator[Tuple[int, int, int]]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            data = f.read(_BLOCK * ENTRY.size)
+            if not data:
+                return
+            yield from ENTRY.iter_unpack(data)
+
+
+def _merge_runs(runs: List[str], directory: str) -> str:
+    """Merge sorted run files, at most _FAN_IN at a time, into one run file."""
+    generation = 0
+    while len(runs) > 1:
+        merged = []
+        for i in range(0, len(runs), _FAN_IN):
+            group = runs[i:i + _FAN_IN]
+            if len(group) == 1:
+                merged.append(group[0])
+                continue
+            path = os.path.join(directory, f"merge-{generation}-{i}.bin")
+            with open(path, "wb") as f:
+                _write_entries(f, heapq.merge(*(_read_entries(run) for run in group)))
+            for run in group:
+                os.remove(run)
+            merged.append(path)
+        runs = merged
+        generation += 1
+    return runs[0]
+
+
+def _archive_chunks(
+    archive: BinaryIO, offsets: BinaryIO, chunk_size: int
+) -> Iterator[List[Tuple[int, str]]]:
+    # Read games chunk by chunk, appending their offsets to the side table
+    chunk = []
+    game_id = 0
+    position = archive.tell()
+    for raw in archive:
+        line = raw.decode()
+        if line.strip():
+            offsets.write(struct.pack("<Q", position))
+            chunk.append((game_id, line))
+            game_id += 1
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        position += len(raw)
+    if chunk:
+        yield chunk
+
+
+def build_index(
+    archive: str,
+    path: str,
+    processes: int = None,
+    chunk_size: int = 256,
+    max_pending: int = None,
+    temp_dir: str = None,
+) -> int:
+    """Index every position of the games of an archive, one game per line.
+
+    Chunks of games are replayed in a process pool, each sorted into a run
+    file, and the runs are merged into path. At most max_pending chunks
+    (default: twice the number of processes) are in flight, so neither the
+    archive nor the entries have to fit in memory. The game offsets go to
+    path + ".games". With processes=0 everything runs in the calling
+    process. Returns the number of entries.
+    """
+    directory = tempfile.mkdtemp(prefix="position-index-", dir=temp_dir)
+    try:
+        runs = []
+        with open(archive, "rb") as source, open(path + ".games", "wb") as offsets:
+            offsets.write(HEADER.pack(GAMES_MAGIC, VERSION, 0))
+            tasks = ((chunk, directory) for chunk in _archive_chunks(source, offsets, chunk_size))
+            if processes == 0:
+                runs = [_index_chunk(task) for task in tasks]
+            else:
+                processes = processes or os.cpu_count() or 1
+                max_pending = max_pending or 2 * processes
+                with Pool(processes) as pool:
+                    pending = deque()
+                    for task in tasks:
+                        pending.append(pool.apply_async(_index_chunk, (task,)))
+                        if len(pending) >= max_pending:
+                            runs.append(pending.popleft().get())
+                    while pending:
+                        runs.append(pending.popleft().get())
+            games = (offsets.tell() - HEADER.size) // 8
+            offsets.seek(0)
+            offsets.write(HEADER.pack(GAMES_MAGIC, VERSION, games))
+
+        count = sum(entries for _, entries in runs)
+        with open(path + ".tmp", "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, count))
+            if runs:
+                with open(_merge_runs([run for run, _ in runs], directory), "rb") as merged:
+                    shutil.copyfileobj(merged, f)
+        os.replace(path + ".tmp", path)
+        return count
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class PositionIndex:
+    """Read-only view of an index written by build_index.
+
+    The entries are memory-mapped and binary-searched by position key, so
+    a query reads a few pages of the file whatever its size. The archive
+    is only needed to read the games back, e.g. for continuations.
+    """
+
+    def __init__(self, path: str, archive: str = None):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a version {VERSION} position index: {path}")
+        with open(path + ".games", "rb") as f:
+            magic, version, games = HEADER.unpack(f.read(HEADER.size))
+            if magic != GAMES_MAGIC or version != VERSION:
+                self.close()
+                raise ValueError(f"Not a version {VERSION} game table: {path}.games")
+            self.offsets = array("Q")
+            self.offsets.frombytes(f.read(games * 8))
+        self.archive = archive
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "PositionIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _key_at(self, i: int) -> int:
+        return struct.unpack_from("<Q", self._map, HEADER.size + i * ENTRY.size)[0]
+
+    def lookup(self, position: Union[Game, int]) -> List[Tuple[int, int]]:
+        """Return (game id, ply) of every time a game reached the position.
+
+        The position is a Game or its position key.
+        """
+        key = position.position_key() if isinstance(position, Game) else position
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        hits = []
+        offset = HEADER.size + low * ENTRY.size
+        end = HEADER.size + self.count * ENTRY.size
+        while offset < end:
+            entry_key, game_id, ply = ENTRY.unpack_from(self._map, offset)
+            if entry_key != key:
+                break
+            hits.append((game_id, ply))
+            offset += ENTRY.size
+        return hits
+
+    def game_line(self, game_id: int) -> str:
+        """Read a game's line from the archive."""
+        if self.archive is None:
+            raise ValueError("The index was opened without its archive")
+        with open(self.archive, "rb") as f:
+            f.seek(self.offsets[game_id])
+            return f.readline().decode()
+
+    def continuations(self, position: Union[Game, int]) -> Counter:
+        """Count the moves played from the position, in UCI notation.
+
+        As when indexing, a game's line is only read up to its first
+        unreadable move.
+        """
+        moves = Counter()
+        for game_id, ply in self.lookup(position):
+            try:
+                code = next(islice(iter_moves(self.game_line(game_id)), ply, None), None)
+            except ValueError:
+                continue
+            if code is not None:
+                moves[MoveCode.to_uci(code)] += 1
+        return moves
+
+
+def main(argv: List[str] = None) -> None:
+    """Build a position index of a game archive, or query one with a FEN."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index an archive, one game per line")
+    build.add_argument("archive")
+    build.add_argument("index")
+    build.add_argument("-p", "--processes", type=int, default=None)
+    build.add_argument("--chunk-size", type=int, default=256)
+    query = commands.add_parser("query", help="list the games that reached a position")
+    query.add_argument("index")
+    query.add_argument("fen")
+    query.add_argument("--archive", help="archive the index was built from, to show continuations")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build_index(args.archive, args.index, args.processes, args.chunk_size)
+        print(f"{count} positions indexed", file=sys.stderr)
+        return
+    with PositionIndex(args.index, args.archive) as index:
+        game = Game.from_fen(args.fen)
+        for game_id, ply in index.lookup(game):
+            print(f"game {game_id} ply {ply}")
+        if args.archive:
+            for move, count in index.continuations(game).most_common():
+                print(f"{move} {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from typing import List, Optional, Tuple
+from Piece import Bishop, King, Knight, Pawn, Piece, Position, Queen, Rook
+
+
+# Record layout:
+#   bytes 0-63  square codes, index y * 8 + x
+#   byte 64     flags: bit 0 set if black is to move, bits 1-4 castling KQkq
+#   byte 65     board column of the en passant target square, NO_EN_PASSANT if none
+RECORD_SIZE = 66
+FLAGS = 64
+EN_PASSANT = 65
+NO_EN_PASSANT = 255
+
+BLACK_TO_MOVE = 1
+CASTLING_BITS = {"K": 2, "Q": 4, "k": 8, "q": 16}
+
+# Square codes: 0 is empty, 1-6 white and 7-12 black pieces
+PIECE_TYPES = (Pawn, Knight, Bishop, Rook, Queen, King)
+PIECE_CODES = {
+    (piece_type, color): index + 1 + (6 if color == "black" else 0)
+    for color in ("white", "black")
+    for index, piece_type in enumerate(PIECE_TYPES)
+}
+CODE_PIECES = {code: piece for piece, code in PIECE_CODES.items()}
+
+
+def encode(game) -> bytes:
+    """Encode the position of a game as a RECORD_SIZE byte record."""
+    record = bytearray(RECORD_SIZE)
+    encode_into(game, record)
+    return bytes(record)
+
+
+def encode_into(game, buffer, offset: int = 0) -> None:
+    """Write the record of a game into a writable buffer at offset."""
+    record = bytearray(RECORD_SIZE)
+    # Picks up pieces placed or removed on the board directly
+    game._sync_pieces()
+    for color, pieces in game.pieces.items():
+        for position, piece in pieces.items():
+            record[position.y * 8 + position.x] = PIECE_CODES[(type(piece), color)]
+
+    flags = BLACK_TO_MOVE if game.current_turn == "black" else 0
+    for letter in game.castling_rights().replace("-", ""):
+        flags |= CASTLING_BITS[letter]
+    record[FLAGS] = flags
+
+    pawn = game.en_passant_pawn
+    if pawn is not None and pawn.en_passant_vulnerable:
+        record[EN_PASSANT] = pawn.position.x
+    else:
+        record[EN_PASSANT] = NO_EN_PASSANT
+
+    buffer[offset:offset + RECORD_SIZE] = record
+
+
+def decode(record) -> Tuple[List[List[Optional[Piece]]], str, str, Optional[Position]]:
+    """Decode a record into a board of new pieces, turn, castling rights and en passant target."""
+    if len(record) < RECORD_SIZE:
+        raise ValueError("Position record is too short")
+
+    board = [[None] * 8 for _ in range(8)]
+    for square in range(64):
+        code = record[square]
+        if code:
+            try:
+                piece_type, color = CODE_PIECES[code]
+            except KeyError:
+                raise ValueError(f"Invalid square code: {code}") from None
+            board[square >> 3][square & 7] = piece_type(color)
+
+    flags = record[FLAGS]
+    turn = "black" if flags & BLACK_TO_MOVE else "white"
+    castling = "".join(letter for letter, bit in CASTLING_BITS.items() if flags & bit) or "-"
+
+    en_passant = None
+    if record[EN_PASSANT] != NO_EN_PASSANT:
+        # The target square lies behind the pawn of the side that just moved
+        en_passant = Position(record[EN_PASSANT], 2 if turn == "black" else 5)
+
+    return board, turn, castling, en_passant
@@ -0,0 +1,214 @@
+import os
+from multiprocessing import Pool
+from typing import Sequence, Tuple, Union
+
+import svgwrite
+
+from Chessboard import Game
+from Events import Captured, Moved, Promoted
+
+
+# Per piece offset of the image inside its 50px square
+IMAGE_OFFSETS = {"Knight": (7, 7)}
+DEFAULT_IMAGE_OFFSET = (8, 7)
+
+
+PIECE_NAMES = ("pawn", "knight", "bishop", "rook", "queen", "king")
+# Size of one board with its notation, and the gap between boards of a sheet
+BOARD_SIZE = 450
+SHEET_GAP = 20
+
+
+def _image_path(color: str, name: str) -> str:
+    return os.path.join("src", "images", f"{color}_{name}.svg")
+
+
+def draw_piece(piece, dwg: svgwrite.Drawing, x: int, y: int) -> None:
+    """Draw a piece image on the square at (x, y)."""
+    name = piece.asText().lower()
+    image_path = _image_path(piece.color, name)
+    dx, dy = IMAGE_OFFSETS.get(piece.asText(), DEFAULT_IMAGE_OFFSET)
+    dwg.add(dwg.image(image_path, insert=(x * 50 + dx, y * 50 + dy), size=(35, 35)))
+
+
+def board_to_svg(game) -> str:
+    """Render the board of a game as an SVG document."""
+    dwg = svgwrite.Drawing(profile="tiny", size=("450px", "450px"))
+    _draw_board(dwg, dwg)
+
+    # Drawing the pieces
+    for y in range(8):
+        for x in range(8):
+            piece = game.board[y][x]
+            if piece:
+                draw_piece(piece, dwg, x, y)
+
+    return dwg.tostring()
+
+
+def _draw_board(dwg: svgwrite.Drawing, parent) -> None:
+    # Drawing the squares
+    for y in range(8):
+        for x in range(8):
+            color = "#ffffff" if (x + y) % 2 == 0 else "#bfbfbf"
+            parent.add(
+                dwg.rect(
+                    (50 * x, 50 * y),
+                    (50, 50),
+                    fill=color,
+                    stroke="#000000",
+                    stroke_width=0.2,
+                )
+            )
+
+    # Drawing the notations
+    for i in range(8):
+        # Add numbers
+        parent.add(
+            dwg.text(
+                str(8 - i),
+                insert=(415, (7 - i) * 50 + 30),
+                fill="#3d3d3d",
+                font_size=20,
+                font_family="serif",
+                text_anchor="middle",
+            )
+        )
+
+        # Add letters
+        parent.add(
+            dwg.text(
+                chr(104 - i),
+                insert=(i * 50 + 25, 425),
+                fill="#3d3d3d",
+                font_size=20,
+                font_family="serif",
+                text_anchor="middle",
+            )
+        )
+
+
+def _drawing(width: int, height: int) -> svgwrite.Drawing:
+    # Board and piece glyphs are defined once, every board and piece is a <use>
+    dwg = svgwrite.Drawing(profile="full", size=(f"{width}px", f"{height}px"), debug=False)
+    board = dwg.g(id="board")
+    _draw_board(dwg, board)
+    dwg.defs.add(board)
+    for color in ("white", "black"):
+        for name in PIECE_NAMES:
+            dx, dy = IMAGE_OFFSETS.get(name.capitalize(), DEFAULT_IMAGE_OFFSET)
+            glyph = dwg.g(id=f"{color}_{name}")
+            glyph.add(dwg.image(_image_path(color, name), insert=(dx, dy), size=(35, 35)))
+            dwg.defs.add(glyph)
+    return dwg
+
+
+def _use_piece(dwg: svgwrite.Drawing, piece, x: int, y: int):
+    return dwg.use(f"#{piece.color}_{piece.asText().lower()}", insert=(x * 50, y * 50))
+
+
+def _hide(dwg: svgwrite.Drawing, use, at: float) -> None:
+    use.add(dwg.set(attributeName="visibility", to="hidden", begin=f"{at:g}s", fill="freeze"))
+
+
+def game_to_svg(game: Game, move_duration: float = 1.0) -> str:
+    """Render a whole game as one animated SVG document.
+
+    The game is replayed from its first logged position. Each piece is
+    drawn once and every move adds SMIL animations to the pieces it moves,
+    captures or promotes, one move every move_duration seconds.
+    """
+    replay = game.seek(0)
+    dwg = _drawing(BOARD_SIZE, BOARD_SIZE)
+    dwg.add(dwg.use("#board"))
+    uses = {}
+    for pieces in replay.pieces.values():
+        for position, piece in pieces.items():
+            uses[id(piece)] = _use_piece(dwg, piece, position.x, position.y)
+
+    slide = move_duration / 2
+    begin = 0.0
+    moved = None
+
+    def on_event(event) -> None:
+        # Pieces slide during the first half of the move, captures and
+        # promotions take effect once the slide is over
+        nonlocal moved
+        if isinstance(event, Moved):
+            moved = event.piece
+            use = uses[id(event.piece)]
+            for attribute, start, end in (
+                ("x", event.start.x, event.end.x), ("y", event.start.y, event.end.y)
+            ):
+                if start != end:
+                    use.add(dwg.animate(
+                        attributeName=attribute, from_=start * 50, to=end * 50,
+                        begin=f"{begin:g}s", dur=f"{slide:g}s", fill="freeze",
+                    ))
+        elif isinstance(event, Captured):
+            _hide(dwg, uses[id(event.piece)], begin + slide)
+        elif isinstance(event, Promoted):
+            # The pawn that just moved is replaced by the new piece
+            _hide(dwg, uses[id(moved)], begin + slide)
+            use = _use_piece(dwg, event.piece, event.square.x, event.square.y)
+            use["visibility"] = "hidden"
+            use.add(dwg.set(
+                attributeName="visibility", to="visible", begin=f"{begin + slide:g}s", fill="freeze",
+            ))
+            uses[id(event.piece)] = use
+
+    replay.subscribe(on_event, Moved, Captured, Promoted)
+    for entry in game.move_log[len(replay.move_log):]:
+        replay.make_move(entry['start'], entry['end'])
+        begin += move_duration
+    for use in uses.values():
+        dwg.add(use)
+    return dwg.tostring()
+
+
+def _position_fragment(task: Tuple[bytes, int, int]) -> str:
+    # One board of a sheet as a <g> of <use> elements, from a position record
+    record, left, top = task
+    game = Game.from_record(record)
+    dwg = svgwrite.Drawing(profile="full", debug=False)
+    group = dwg.g(transform=f"translate({left},{top})")
+    group.add(dwg.use("#board"))
+    for pieces in game.pieces.values():
+        for position, piece in pieces.items():
+            group.add(_use_piece(dwg, piece, position.x, position.y))
+    return group.tostring()
+
+
+def positions_to_svg(
+    positions: Sequence[Union[Game, str, bytes]],
+    columns: int = 4,
+    processes: int = 0,
+    chunk_size: int = 64,
+) -> str:
+    """Render many positions as a sheet of boards in one SVG document.
+
+    Positions are games, FEN strings or position records. With processes
+    other than 0 the boards are rendered in a process pool (None for one
+    process per CPU), chunk_size boards per task.
+    """
+    step = BOARD_SIZE + SHEET_GAP
+    tasks = []
+    for i, position in enumerate(positions):
+        if isinstance(position, str):
+            position = Game.from_fen(position)
+        if isinstance(position, Game):
+            position = position.to_record()
+        tasks.append((position, i % columns * step, i // columns * step))
+
+    if processes == 0:
+        fragments = list(map(_position_fragment, tasks))
+    else:
+        with Pool(processes) as pool:
+            fragments = pool.map(_position_fragment, tasks, chunk_size)
+
+    rows = max((len(tasks) + columns - 1) // columns, 1)
+    width = min(len(tasks), columns) * step - SHEET_GAP if tasks else BOARD_SIZE
+    document = _drawing(max(width, BOARD_SIZE), rows * step - SHEET_GAP).tostring()
+    # The boards are added as text, svgwrite elements do not cross processes
+    closing = document.rindex("</svg>")
+    return document[:closing] + "".join(fragments) + document[closing:]
@@ -0,0 +1,264 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from Chessboard import Game, Move
+from Evaluation import evaluate
+import MoveCode
+from PawnStructure import PawnCache
+from Piece import Position
+
+
+# Larger than any evaluation; mate scores are MATE minus the distance in plies
+MATE = 100_000
+MAX_DEPTH = 64
+
+
+@dataclass
+class SearchStats:
+    nodes: int = 0
+    # Captures skipped because static exchange evaluation says they lose material
+    see_pruned: int = 0
+
+
+def ordered_captures(game: Game, min_see: int = 0) -> List[Tuple[int, Move]]:
+    """Return (see, move) for the captures and promotions of the side to move.
+
+    Moves whose exchange loses more than -min_see are dropped; the rest are
+    sorted best exchange first.
+    """
+    scored = [(game.see(move), move) for move in game.capture_moves()]
+    scored = [(score, move) for score, move in scored if score >= min_see]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return scored
+
+
+def quiescence(
+    game: Game,
+    alpha: int = -MATE,
+    beta: int = MATE,
+    ply: int = 0,
+    stats: SearchStats = None,
+    pawn_cache: PawnCache = None,
+    check_limits: Callable[[], None] = None,
+) -> int:
+    """Search captures and promotions until the position is quiet.
+
+    Returns a fail-soft score from the point of view of the side to move.
+    Captures that lose material by static exchange evaluation are not
+    searched. When the side to move is in check every evasion is searched
+    instead, so mates at the end of a capture sequence are found.
+    check_limits is called at every node and may raise to abandon the
+    search; the game is restored before the exception propagates.
+    """
+    if check_limits is not None:
+        check_limits()
+    if stats is not None:
+        stats.nodes += 1
+    color = game.current_turn
+
+    if game.is_check(color):
+        moves = list(game.legal_moves().values())
+        if not moves:
+            return -MATE + ply
+        best = -MATE + ply
+    else:
+        best = evaluate(game, pawn_cache=pawn_cache)
+        if best >= beta:
+            return best
+        alpha = max(alpha, best)
+        moves = []
+        for see, move in ordered_captures(game, -MATE):
+            if see < 0:
+                if stats is not None:
+                    stats.see_pruned += 1
+                continue
+            moves.append(move)
+
+    for move in moves:
+        game.make_move(move.start, move.end)
+        try:
+            score = -quiescence(game, -beta, -alpha, ply + 1, stats, pawn_cache, check_limits)
+        finally:
+            game.undo_move()
+        if score > best:
+            best = score
+            if score > alpha:
+                alpha = score
+                if score >= beta:
+                    break
+    return best
+
+
+@dataclass
+class SearchResult:
+    # Best move found, None if the side to move has no legal move
+    move: Optional[Move]
+    score: int
+    depth: int
+    nodes: int
+    # Principal variation, starting with move
+    pv: List[Move] = field(default_factory=list)
+
+
+class _Stopped(Exception):
+    pass
+
+
+class Searcher:
+    """Iterative deepening alpha-beta search with quiescence search at the leaves.
+
+    A search is limited by depth, nodes and/or time. stop() and the
+    deadline attribute may be used from another thread while a search runs.
+    To search on another thread, call set_limits() before starting it and
+    run() on it, so a stop() sent in between is not lost.
+    The best move of every searched position is remembered for move
+    ordering, across searches, until clear() is called.
+    """
+
+    def __init__(self, pawn_cache: PawnCache = None, max_table_size: int = 1 << 20):
+        self.pawn_cache = pawn_cache
+        self.max_table_size = max_table_size
+        self.stats = SearchStats()
+        # time.monotonic() value at which the search stops, None for no limit
+        self.deadline = None
+        self.max_nodes = None
+        self._stop = threading.Event()
+        # Best move found in each position, packed as in MoveCode
+        self._best_moves: Dict[int, int] = {}
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def clear(self) -> None:
+        self._best_moves.clear()
+
+    def set_limits(self, nodes: int = None, movetime: float = None) -> None:
+        """Clear a previous stop() and set the node and time limits of the next run()."""
+        self._stop.clear()
+        self.max_nodes = nodes
+        self.deadline = time.monotonic() + movetime if movetime is not None else None
+
+    def search(
+        self,
+        game: Game,
+        depth: int = None,
+        nodes: int = None,
+        movetime: float = None,
+        on_iteration: Callable[[SearchResult], None] = None,
+    ) -> SearchResult:
+        """Search the position of game, which is left untouched.
+
+        movetime is in seconds. Without any limit the search runs until
+        stop() is called or MAX_DEPTH is reached. on_iteration is called
+        with the result of every completed depth.
+        """
+        self.set_limits(nodes, movetime)
+        return self.run(game, depth, on_iteration)
+
+    def run(
+        self,
+        game: Game,
+        depth: int = None,
+        on_iteration: Callable[[SearchResult], None] = None,
+    ) -> SearchResult:
+        """Search like search(), with the limits of the last set_limits() call.
+
+        A stop() received since then ends it at once, with the first legal move.
+        """
+        self.stats = SearchStats()
+        if len(self._best_moves) > self.max_table_size:
+            self._best_moves.clear()
+
+        game = game.clone()
+        moves = list(game.legal_moves().values())
+        if not moves:
+            score = -MATE if game.is_check(game.current_turn) else 0
+            return SearchResult(None, score, 0, 0)
+
+        result = SearchResult(moves[0], 0, 0, 0, [moves[0]])
+        for current in range(1, min(depth or MAX_DEPTH, MAX_DEPTH) + 1):
+            try:
+                score = self._alphabeta(game, current, -MATE, MATE, 0)
+            except _Stopped:
+                break
+            pv = self._principal_variation(game, current)
+            result = SearchResult(pv[0], score, current, self.stats.nodes, pv)
+            if on_iteration is not None:
+                on_iteration(result)
+            if abs(score) >= MATE - MAX_DEPTH:
+                break
+        result.nodes = self.stats.nodes
+        return result
+
+    def _check_limits(self) -> None:
+        if self._stop.is_set():
+            raise _Stopped()
+        if self.max_nodes is not None and self.stats.nodes >= self.max_nodes:
+            raise _Stopped()
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise _Stopped()
+
+    def _alphabeta(self, game: Game, depth: int, alpha: int, beta: int, ply: int) -> int:
+        if depth <= 0:
+            return quiescence(
+                game, alpha, beta, ply, self.stats, self.pawn_cache, self._check_limits
+            )
+        self._check_limits()
+
+        self.stats.nodes += 1
+        moves = game.legal_moves()
+        if not moves:
+            return -MATE + ply if game.is_check(game.current_turn) else 0
+
+        key = game.position_key()
+        best_score = -MATE - 1
+        best_move = None
+        best = self._best_moves.get(key)
+        best_squares = MoveCode.squares(best) if best is not None else None
+        for move in self._order(game, moves, best_squares):
+            game.make_move(move.start, move.end)
+            try:
+                score = -self._alphabeta(game, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.undo_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        self._best_moves[key] = best_move.code
+        return best_score
+
+    def _order(
+        self, game: Game, moves: Dict[Tuple[Position, Position], Move],
+        best: Optional[Tuple[Position, Position]],
+    ) -> List[Move]:
+        # Best move from an earlier search first, then winning and equal
+        # captures, quiet moves and finally captures losing material
+        def priority(item):
+            squares, move = item
+            if squares == best:
+                return 1_000_000
+            if move.is_capture or move.is_promotion:
+                see = game.see(move)
+                return 100_000 + see if see >= 0 else see
+            return 0
+
+        return [move for _, move in sorted(moves.items(), key=priority, reverse=True)]
+
+    def _principal_variation(self, game: Game, depth: int) -> List[Move]:
+        pv = []
+        for _ in range(depth):
+            code = self._best_moves.get(game.position_key())
+            move = game.legal_moves().get(MoveCode.squares(code)) if code is not None else None
+            if move is None:
+                break
+            pv.append(move)
+            game.make_move(move.start, move.end)
+        for _ in pv:
+            game.undo_move()
+        return pv
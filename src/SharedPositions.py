@@ -0,0 +1,158 @@
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.util import Finalize
+from typing import Callable, Iterable, Iterator, Sequence, Tuple, Union
+
+from Chessboard import Game
+import PositionRecord
+from PositionRecord import RECORD_SIZE
+
+
+class SharedPositionBuffer:
+    """Ring buffer of position records and int64 result slots in shared memory.
+
+    The owning process pushes positions and releases slots once their results
+    are read. Workers attach to the same block by name, build games straight
+    from the records and write their results back, so no position is pickled.
+    """
+
+    def __init__(self, capacity: int, result_width: int = 1, name: str = None):
+        self.capacity = capacity
+        self.result_width = result_width
+        size = capacity * (RECORD_SIZE + 8 * result_width)
+        if name is None:
+            self.shm = SharedMemory(create=True, size=size)
+        else:
+            self.shm = SharedMemory(name=name)
+        records_size = capacity * RECORD_SIZE
+        self.records = self.shm.buf[:records_size]
+        self.results = self.shm.buf[records_size:size].cast("q")
+        # Absolute counters of pushed and released positions
+        self.head = 0
+        self.tail = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self) -> int:
+        return self.head - self.tail
+
+    def push(self, position: Union[Game, bytes]) -> int:
+        """Store a game or a record in the next free slot and return the slot."""
+        if self.head - self.tail == self.capacity:
+            raise BufferError("Shared position buffer is full")
+        slot = self.head % self.capacity
+        offset = slot * RECORD_SIZE
+        if isinstance(position, Game):
+            PositionRecord.encode_into(position, self.records, offset)
+        else:
+            self.records[offset:offset + RECORD_SIZE] = position
+        self.head += 1
+        return slot
+
+    def release(self, count: int = 1) -> None:
+        """Free the oldest count slots."""
+        if count > self.head - self.tail:
+            raise ValueError("Cannot release more slots than were pushed")
+        self.tail += count
+
+    def record(self, slot: int) -> memoryview:
+        return self.records[slot * RECORD_SIZE:(slot + 1) * RECORD_SIZE]
+
+    def game(self, slot: int) -> Game:
+        return Game.from_record(self.record(slot))
+
+    def set_result(self, slot: int, values: Sequence[int]) -> None:
+        start = slot * self.result_width
+        for i in range(self.result_width):
+            self.results[start + i] = values[i] if i < len(values) else 0
+
+    def result(self, slot: int) -> Tuple[int, ...]:
+        start = slot * self.result_width
+        return tuple(self.results[start:start + self.result_width])
+
+    def close(self) -> None:
+        self.records.release()
+        self.results.release()
+        self.shm.close()
+
+    def unlink(self) -> None:
+        self.shm.unlink()
+
+    def __enter__(self) -> "SharedPositionBuffer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+        self.unlink()
+
+
+# Buffers attached by the current worker process, by name
+_attached = {}
+
+
+def _init_worker() -> None:
+    # Pool workers exit normally once the pool is closed and joined
+    Finalize(None, _close_attached, exitpriority=0)
+
+
+def _close_attached() -> None:
+    for buffer in _attached.values():
+        buffer.close()
+    _attached.clear()
+
+
+def _run_slots(task) -> None:
+    name, capacity, result_width, slots, func = task
+    buffer = _attached.get(name)
+    if buffer is None:
+        buffer = _attached[name] = SharedPositionBuffer(capacity, result_width, name)
+    for slot in slots:
+        buffer.set_result(slot, func(buffer.game(slot)))
+
+
+def map_shared(
+    func: Callable[[Game], Sequence[int]],
+    positions: Iterable[Union[Game, bytes]],
+    processes: int = None,
+    capacity: int = 4096,
+    result_width: int = 1,
+    chunk_size: int = 256,
+) -> Iterator[Tuple[int, ...]]:
+    """Apply func to every position in a process pool and yield the results in order.
+
+    Positions travel through a SharedPositionBuffer, workers only receive slot
+    ranges of up to chunk_size positions. Slots are refilled and submitted
+    again as soon as the results of their range are yielded, so workers keep
+    going while the caller consumes results. func must be a picklable
+    top-level function returning at most result_width integers.
+    """
+    with SharedPositionBuffer(capacity, result_width) as buffer:
+        pool = Pool(processes, initializer=_init_worker)
+        try:
+            positions = iter(positions)
+            # (async result, slots) of the submitted ranges, oldest first
+            pending = deque()
+            exhausted = False
+            while True:
+                while not exhausted and len(buffer) < capacity:
+                    room = min(chunk_size, capacity - len(buffer))
+                    slots = [buffer.push(position) for position in islice(positions, room)]
+                    exhausted = len(slots) < room
+                    if slots:
+                        task = (buffer.name, capacity, result_width, slots, func)
+                        pending.append((pool.apply_async(_run_slots, (task,)), slots))
+                if not pending:
+                    break
+                result, slots = pending.popleft()
+                result.get()
+                for slot in slots:
+                    yield buffer.result(slot)
+                buffer.release(len(slots))
+            pool.close()
+            pool.join()
+        finally:
+            pool.terminate()
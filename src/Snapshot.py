@@ -0,0 +1,232 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from Piece import (
+    DIAGONAL, KING_TARGETS, KNIGHT_TARGETS, SQUARE_POSITIONS, STRAIGHT,
+    Bishop, King, Knight, Pawn, Position, Queen, Rook,
+)
+import PositionRecord
+from PositionRecord import (
+    BLACK_TO_MOVE, CASTLING_BITS, CODE_PIECES, EN_PASSANT, FLAGS, NO_EN_PASSANT, PIECE_CODES,
+)
+
+if TYPE_CHECKING:
+    from Chessboard import Game
+
+
+def _rays(directions: Tuple[Tuple[int, int], ...]) -> List[Tuple[Tuple[int, ...], ...]]:
+    table = []
+    for square in range(64):
+        rays = []
+        for dx, dy in directions:
+            x, y = (square & 7) + dx, (square >> 3) + dy
+            ray = []
+            while 0 <= x < 8 and 0 <= y < 8:
+                ray.append(y * 8 + x)
+                x += dx
+                y += dy
+            if ray:
+                rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return table
+
+
+STRAIGHT_RAYS = _rays(STRAIGHT)
+DIAGONAL_RAYS = _rays(DIAGONAL)
+
+_COLORS = ("white", "black")
+# Square codes per color and piece type
+_CODES = {color: {t: PIECE_CODES[(t, color)] for t in PositionRecord.PIECE_TYPES} for color in _COLORS}
+
+# Castling bit lost when a king or rook leaves, or a rook is captured on, a square
+_CASTLING_SQUARES = {
+    3: CASTLING_BITS["K"] | CASTLING_BITS["Q"],
+    0: CASTLING_BITS["K"],
+    7: CASTLING_BITS["Q"],
+    59: CASTLING_BITS["k"] | CASTLING_BITS["q"],
+    56: CASTLING_BITS["k"],
+    63: CASTLING_BITS["q"],
+}
+
+
+def _color_of(code: int) -> Optional[str]:
+    if not code:
+        return None
+    return "white" if code <= 6 else "black"
+
+
+@dataclass(frozen=True)
+class PositionSnapshot:
+    """Immutable, hashable position backed by a PositionRecord.
+
+    Every query is a pure function of the record, so a snapshot can be
+    shared between threads or tasks without locks. Moves are the same as
+    Game.legal_moves of the side to move: promotions are to a queen and
+    castling moves are not generated.
+    """
+
+    record: bytes
+
+    @property
+    def current_turn(self) -> str:
+        return "black" if self.record[FLAGS] & BLACK_TO_MOVE else "white"
+
+    def get_piece_at(self, position: Position) -> Optional[Tuple[type, str]]:
+        """Return (piece_type, color) of the piece on a square, or None."""
+        code = self.record[position.y * 8 + position.x]
+        return CODE_PIECES[code] if code else None
+
+    def king_position(self, color: str) -> Optional[Position]:
+        square = self.record.find(_CODES[color][King], 0, 64)
+        return SQUARE_POSITIONS[square] if square >= 0 else None
+
+    def is_square_attacked(self, position: Position, color: str) -> bool:
+        """Check if any piece of the given color attacks the square."""
+        return _attacked(self.record, position.y * 8 + position.x, color)
+
+    def is_check(self, color: str = None) -> bool:
+        color = color or self.current_turn
+        king = self.king_position(color)
+        opponent = "black" if color == "white" else "white"
+        return king is not None and self.is_square_attacked(king, opponent)
+
+    def legal_moves(self) -> List[Tuple[Position, Position]]:
+        """Return the (start, end) pairs of the legal moves of the side to move."""
+        color = self.current_turn
+        opponent = "black" if color == "white" else "white"
+        king_code = _CODES[color][King]
+        moves = []
+        for start, end in _pseudo_legal(self.record, color):
+            board = _play(self.record, start, end)
+            king = board.find(king_code, 0, 64)
+            if king < 0 or not _attacked(board, king, opponent):
+                moves.append((SQUARE_POSITIONS[start], SQUARE_POSITIONS[end]))
+        return moves
+
+    def is_checkmate(self) -> bool:
+        return self.is_check() and not self.legal_moves()
+
+    def is_stalemate(self) -> bool:
+        return not self.is_check() and not self.legal_moves()
+
+    def play(self, start: Position, end: Position) -> "PositionSnapshot":
+        """Return the snapshot after a legal move of the side to move."""
+        if (start, end) not in self.legal_moves():
+            raise ValueError("Invalid move")
+        return PositionSnapshot(bytes(_play(
+            self.record, start.y * 8 + start.x, end.y * 8 + end.x
+        )))
+
+    def to_game(self) -> "Game":
+        # Chessboard depends on this module, so it is imported on first use
+        from Chessboard import Game
+
+        return Game.from_record(self.record)
+
+
+def _attacked(board, square: int, color: str) -> bool:
+    codes = _CODES[color]
+    x, y = square & 7, square >> 3
+    # A pawn attacks the square from one rank behind it, seen from its side
+    pawn_y = y - 1 if color == "white" else y + 1
+    if 0 <= pawn_y < 8:
+        for pawn_x in (x - 1, x + 1):
+            if 0 <= pawn_x < 8 and board[pawn_y * 8 + pawn_x] == codes[Pawn]:
+                return True
+    for target in KNIGHT_TARGETS[square]:
+        if board[target] == codes[Knight]:
+            return True
+    for target in KING_TARGETS[square]:
+        if board[target] == codes[King]:
+            return True
+    for rays, sliders in (
+        (STRAIGHT_RAYS, (codes[Rook], codes[Queen])),
+        (DIAGONAL_RAYS, (codes[Bishop], codes[Queen])),
+    ):
+        for ray in rays[square]:
+            for target in ray:
+                code = board[target]
+                if code:
+                    if code in sliders:
+                        return True
+                    break
+    return False
+
+
+def _pseudo_legal(record: bytes, color: str) -> List[Tuple[int, int]]:
+    moves = []
+    forward = 8 if color == "white" else -8
+    home_rank = 1 if color == "white" else 6
+    en_passant = record[EN_PASSANT]
+    # The pawn that just moved two squares stands on this rank
+    en_passant_rank = 4 if color == "white" else 3
+    for start in range(64):
+        code = record[start]
+        if _color_of(code) != color:
+            continue
+        piece_type = CODE_PIECES[code][0]
+        x, y = start & 7, start >> 3
+        if piece_type is Pawn:
+            one = start + forward
+            if 0 <= one < 64 and not record[one]:
+                moves.append((start, one))
+                two = one + forward
+                if y == home_rank and not record[two]:
+                    moves.append((start, two))
+            for dx in (-1, 1):
+                if not 0 <= x + dx < 8 or not 0 <= one < 64:
+                    continue
+                target = one + dx
+                if record[target] and _color_of(record[target]) != color:
+                    moves.append((start, target))
+                elif (y == en_passant_rank and en_passant == x + dx
+                        and record[start + dx] == PIECE_CODES[(Pawn, _other(color))]):
+                    moves.append((start, target))
+        elif piece_type in (Knight, King):
+            table = KNIGHT_TARGETS if piece_type is Knight else KING_TARGETS
+            for target in table[start]:
+                if _color_of(record[target]) != color:
+                    moves.append((start, target))
+        else:
+            rays = ()
+            if piece_type in (Rook, Queen):
+                rays += STRAIGHT_RAYS[start]
+            if piece_type in (Bishop, Queen):
+                rays += DIAGONAL_RAYS[start]
+            for ray in rays:
+                for target in ray:
+                    target_color = _color_of(record[target])
+                    if target_color != color:
+                        moves.append((start, target))
+                    if target_color is not None:
+                        break
+    return moves
+
+
+def _other(color: str) -> str:
+    return "black" if color == "white" else "white"
+
+
+def _play(record: bytes, start: int, end: int) -> bytearray:
+    """Return the record after moving the piece on start to end."""
+    board = bytearray(record)
+    code = board[start]
+    piece_type, color = CODE_PIECES[code]
+    new_en_passant = NO_EN_PASSANT
+
+    if piece_type is Pawn:
+        if (end - start) % 8 and not board[end]:
+            # En passant: the captured pawn is beside the start square
+            board[(start & ~7) + (end & 7)] = 0
+        if abs(end - start) == 16:
+            new_en_passant = end & 7
+        if end >> 3 in (0, 7):
+            code = PIECE_CODES[(Queen, color)]
+
+    board[start] = 0
+    board[end] = code
+    board[FLAGS] ^= BLACK_TO_MOVE
+    board[FLAGS] &= ~(_CASTLING_SQUARES.get(start, 0) | _CASTLING_SQUARES.get(end, 0)) & 0xFF
+    board[EN_PASSANT] = new_en_passant
+    return board
+
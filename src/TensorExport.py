@@ -0,0 +1,184 @@
+import os
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, List, Sequence, Union
+
+import numpy as np
+
+from Chessboard import Game
+import Notation
+
+
+# Plane order: white pawn, knight, bishop, rook, queen, king, then black
+PLANE_LETTERS = "PNBRQKpnbrqk"
+CASTLING_LETTERS = "KQkq"
+EMPTY = 255
+
+# Byte value of a FEN letter -> plane, EMPTY for "." and anything unknown
+_PLANE_LUT = np.full(256, EMPTY, dtype=np.uint8)
+for _plane, _letter in enumerate(PLANE_LETTERS):
+    _PLANE_LUT[ord(_letter)] = _plane
+
+_PLANE_OF_PIECE = {
+    (Notation.PIECE_TYPES[letter.upper()], "white" if letter.isupper() else "black"): plane
+    for plane, letter in enumerate(PLANE_LETTERS)
+}
+
+
+@dataclass
+class PositionTensors:
+    # planes[n, plane, y, x] is 1 if the piece of that plane stands on (x, y)
+    planes: np.ndarray
+    # 1 if white is to move
+    side_to_move: np.ndarray
+    # One column per right, in KQkq order
+    castling: np.ndarray
+    # One-hot board column of the en passant target square, all zero if none
+    en_passant: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.planes)
+
+
+def allocate(n: int) -> PositionTensors:
+    """Allocate zeroed buffers for n positions."""
+    return PositionTensors(
+        np.zeros((n, 12, 8, 8), dtype=np.uint8),
+        np.zeros(n, dtype=np.uint8),
+        np.zeros((n, 4), dtype=np.uint8),
+        np.zeros((n, 8), dtype=np.uint8),
+    )
+
+
+def encode_positions(
+    positions: Sequence[Union[Game, str]], out: PositionTensors = None, offset: int = 0
+) -> PositionTensors:
+    """Encode Game objects and/or FEN strings into out[offset:offset + len(positions)].
+
+    Buffers are allocated when out is None. Existing rows are overwritten.
+    """
+    if out is None:
+        out = allocate(len(positions))
+    end = offset + len(positions)
+    if end > len(out):
+        raise ValueError("Output buffers are too small")
+    for array in (out.planes, out.side_to_move, out.castling, out.en_passant):
+        array[offset:end] = 0
+
+    fens, fen_rows, games, game_rows = [], [], [], []
+    for row, position in enumerate(positions, offset):
+        if isinstance(position, str):
+            fens.append(position)
+            fen_rows.append(row)
+        else:
+            games.append(position)
+            game_rows.append(row)
+
+    if fens:
+        _encode_fens(fens, np.array(fen_rows, dtype=np.intp), out)
+    if games:
+        _encode_games(games, np.array(game_rows, dtype=np.intp), out)
+    return out
+
+
+def _encode_fens(fens: List[str], rows: np.ndarray, out: PositionTensors) -> None:
+    fields = [fen.split() for fen in fens]
+    for fen, parts in zip(fens, fields):
+        if len(parts) < 2 or parts[1] not in ("w", "b"):
+            raise ValueError(f"Invalid FEN: {fen!r}")
+
+    placement = "".join(Notation.expand_fen_placement(parts[0]) for parts in fields)
+    codes = np.frombuffer(placement.encode("ascii"), dtype=np.uint8).reshape(-1, 8, 8)
+    planes = _PLANE_LUT[codes]
+    if np.any((planes == EMPTY) & (codes != ord("."))):
+        raise ValueError("Invalid piece letter in FEN placement")
+
+    # FEN starts at a8, the board at h1: flip both axes
+    planes = planes[:, ::-1, ::-1]
+    n, y, x = np.nonzero(planes != EMPTY)
+    out.planes[rows[n], planes[n, y, x], y, x] = 1
+
+    out.side_to_move[rows] = [parts[1] == "w" for parts in fields]
+    castling = [parts[2] if len(parts) > 2 else "-" for parts in fields]
+    for column, letter in enumerate(CASTLING_LETTERS):
+        out.castling[rows, column] = [letter in rights for rights in castling]
+
+    targets = [parts[3] if len(parts) > 3 else "-" for parts in fields]
+    with_target = [i for i, square in enumerate(targets) if square != "-"]
+    if with_target:
+        columns = [Notation.parse_square(targets[i]).x for i in with_target]
+        out.en_passant[rows[with_target], columns] = 1
+
+
+def _encode_games(games: List[Game], rows: np.ndarray, out: PositionTensors) -> None:
+    ns, planes, ys, xs = [], [], [], []
+    for n, game in enumerate(games):
+        # Picks up pieces placed or removed on the board directly
+        game._sync_pieces()
+        for color, pieces in game.pieces.items():
+            for position, piece in pieces.items():
+                ns.append(n)
+                planes.append(_PLANE_OF_PIECE[(type(piece), color)])
+                ys.append(position.y)
+                xs.append(position.x)
+    out.planes[rows[ns], planes, ys, xs] = 1
+
+    out.side_to_move[rows] = [game.current_turn == "white" for game in games]
+    castling = [game.castling_rights() for game in games]
+    for column, letter in enumerate(CASTLING_LETTERS):
+        out.castling[rows, column] = [letter in rights for rights in castling]
+
+    for n, game in enumerate(games):
+        pawn = game.en_passant_pawn
+        if pawn is not None and pawn.en_passant_vulnerable:
+            out.en_passant[rows[n], pawn.position.x] = 1
+
+
+def open_shard(path: str, n: int) -> PositionTensors:
+    """Create memory-mapped .npy files for n positions, named <path>_<field>.npy."""
+    def open_memmap(field, shape):
+        return np.lib.format.open_memmap(
+            f"{path}_{field}.npy", mode="w+", dtype=np.uint8, shape=shape
+        )
+
+    return PositionTensors(
+        open_memmap("planes", (n, 12, 8, 8)),
+        open_memmap("side_to_move", (n,)),
+        open_memmap("castling", (n, 4)),
+        open_memmap("en_passant", (n, 8)),
+    )
+
+
+def load_shard(path: str) -> PositionTensors:
+    """Open the .npy files of a shard read-only as memory maps."""
+    return PositionTensors(*(
+        np.load(f"{path}_{field}.npy", mmap_mode="r")
+        for field in ("planes", "side_to_move", "castling", "en_passant")
+    ))
+
+
+def export_shards(
+    positions: Iterable[Union[Game, str]],
+    directory: str,
+    shard_size: int = 100_000,
+    prefix: str = "positions",
+) -> List[str]:
+    """Stream positions into memory-mapped shards of at most shard_size positions.
+
+    Returns the base path of every shard, to be opened with load_shard.
+    """
+    os.makedirs(directory, exist_ok=True)
+    iterator = iter(positions)
+    paths = []
+    while True:
+        chunk = list(islice(iterator, shard_size))
+        if not chunk:
+            break
+        path = os.path.join(directory, f"{prefix}_{len(paths):05d}")
+        shard = open_shard(path, len(chunk))
+        encode_positions(chunk, shard)
+        for array in (shard.planes, shard.side_to_move, shard.castling, shard.en_passant):
+            array.flush()
+        del shard
+        paths.append(path)
+    return paths
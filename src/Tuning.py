@@ -0,0 +1,245 @@
+import argparse
+import json
+import math
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from Chessboard import Game
+import Evaluation
+from Evaluation import MATERIAL_EG, MATERIAL_MG, MAX_PHASE, TABLES_EG, TABLES_MG
+
+
+# Feature k = type index * 64 + diagram square, see Evaluation._diagram_index
+PIECE_TYPES = list(TABLES_MG)
+FEATURES = len(PIECE_TYPES) * 64
+MAX_PIECES = 32
+
+RESULTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+
+
+@dataclass
+class FeatureSet:
+    # Feature index of every piece, padded with sign 0
+    indices: np.ndarray  # (n, MAX_PIECES) uint16
+    # +1 for white pieces, -1 for black pieces, 0 for padding
+    signs: np.ndarray  # (n, MAX_PIECES) int8
+    phase: np.ndarray  # (n,) uint8, capped at MAX_PHASE
+    # Game result from white's point of view: 1, 0.5 or 0
+    results: np.ndarray  # (n,) float32
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+
+def parse_labelled(line: str) -> Tuple[str, float]:
+    """Parse "<fen> <result>", the result being 1-0, 0-1, 1/2-1/2 or a number."""
+    fen, _, result = line.strip().rpartition(" ")
+    result = result.strip('";')
+    value = RESULTS.get(result)
+    if value is None:
+        value = float(result)
+    return fen.rstrip(" ;"), value
+
+
+def _allocate(n: int, path: Optional[str]) -> FeatureSet:
+    def array(field, shape, dtype):
+        if path is None:
+            return np.zeros(shape, dtype=dtype)
+        return np.lib.format.open_memmap(f"{path}_{field}.npy", mode="w+", dtype=dtype, shape=shape)
+
+    return FeatureSet(
+        array("indices", (n, MAX_PIECES), np.uint16),
+        array("signs", (n, MAX_PIECES), np.int8),
+        array("phase", (n,), np.uint8),
+        array("results", (n,), np.float32),
+    )
+
+
+def extract_features(
+    positions: List[Tuple[str, float]], path: str = None
+) -> FeatureSet:
+    """Build the feature arrays of (fen, result) pairs.
+
+    With a path, the arrays are memory-mapped .npy files named
+    <path>_<field>.npy, to be opened again with load_features.
+    """
+    features = _allocate(len(positions), path)
+    type_index = {piece_type: i for i, piece_type in enumerate(PIECE_TYPES)}
+    for row, (fen, result) in enumerate(positions):
+        game = Game.from_fen(fen)
+        column = 0
+        for color, sign in (("white", 1), ("black", -1)):
+            for position, piece in game.pieces[color].items():
+                square = Evaluation._diagram_index(color, position.x, position.y)
+                features.indices[row, column] = type_index[type(piece)] * 64 + square
+                features.signs[row, column] = sign
+                column += 1
+        features.phase[row] = min(game.phase, MAX_PHASE)
+        features.results[row] = result
+    if path is not None:
+        for array in (features.indices, features.signs, features.phase, features.results):
+            array.flush()
+    return features
+
+
+def load_features(path: str) -> FeatureSet:
+    """Open the arrays written by extract_features read-only as memory maps."""
+    return FeatureSet(*(
+        np.load(f"{path}_{field}.npy", mmap_mode="r")
+        for field in ("indices", "signs", "phase", "results")
+    ))
+
+
+def initial_weights() -> np.ndarray:
+    """Return the current evaluation as a (2, FEATURES) array of mg and eg weights."""
+    weights = np.zeros((2, FEATURES))
+    for i, piece_type in enumerate(PIECE_TYPES):
+        weights[0, i * 64:(i + 1) * 64] = np.add(TABLES_MG[piece_type], MATERIAL_MG[piece_type])
+        weights[1, i * 64:(i + 1) * 64] = np.add(TABLES_EG[piece_type], MATERIAL_EG[piece_type])
+    return weights
+
+
+def evaluate_batch(weights: np.ndarray, features: FeatureSet) -> np.ndarray:
+    """Return the tapered evaluation of every position, from white's point of view."""
+    indices = np.asarray(features.indices, dtype=np.intp)
+    signs = np.asarray(features.signs, dtype=np.float64)
+    mg = (weights[0][indices] * signs).sum(axis=1)
+    eg = (weights[1][indices] * signs).sum(axis=1)
+    phase = np.asarray(features.phase, dtype=np.float64) / MAX_PHASE
+    return mg * phase + eg * (1 - phase)
+
+
+def _sigmoid(scores: np.ndarray, k: float) -> np.ndarray:
+    return 1 / (1 + np.power(10.0, -k * scores / 400))
+
+
+def loss(weights: np.ndarray, features: FeatureSet, k: float = 1.0) -> float:
+    """Mean squared error between the results and the predicted win probability."""
+    predicted = _sigmoid(evaluate_batch(weights, features), k)
+    return float(np.mean((np.asarray(features.results) - predicted) ** 2))
+
+
+def _gradient(weights: np.ndarray, features: FeatureSet, k: float) -> np.ndarray:
+    indices = np.asarray(features.indices, dtype=np.intp)
+    signs = np.asarray(features.signs, dtype=np.float64)
+    phase = np.asarray(features.phase, dtype=np.float64) / MAX_PHASE
+    predicted = _sigmoid(evaluate_batch(weights, features), k)
+    # d loss / d score for every position
+    slope = (
+        -2 * (np.asarray(features.results) - predicted) * predicted * (1 - predicted)
+        * math.log(10) * k / 400 / len(predicted)
+    )
+    gradient = np.empty_like(weights)
+    for row, taper in ((0, phase), (1, 1 - phase)):
+        contributions = (slope * taper)[:, None] * signs
+        gradient[row] = np.bincount(indices.ravel(), contributions.ravel(), FEATURES)
+    return gradient
+
+
+def fit_scale(weights: np.ndarray, features: FeatureSet, candidates: Iterable[float] = None) -> float:
+    """Return the sigmoid scale k that best fits the current weights."""
+    candidates = np.linspace(0.2, 3.0, 29) if candidates is None else candidates
+    return min(candidates, key=lambda k: loss(weights, features, k))
+
+
+def tune(
+    features: FeatureSet,
+    weights: np.ndarray = None,
+    epochs: int = 100,
+    batch_size: int = 65536,
+    learning_rate: float = 1.0,
+    k: float = 1.0,
+) -> np.ndarray:
+    """Fit mg and eg weights by mini-batch gradient descent with Adam.
+
+    Batches are contiguous slices, so memory-mapped features are read
+    sequentially. Returns the tuned weights; the input weights are not changed.
+    """
+    weights = initial_weights() if weights is None else weights.copy()
+    first = np.zeros_like(weights)
+    second = np.zeros_like(weights)
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    step = 0
+    for _ in range(epochs):
+        for start in range(0, len(features), batch_size):
+            batch = FeatureSet(
+                features.indices[start:start + batch_size],
+                features.signs[start:start + batch_size],
+                features.phase[start:start + batch_size],
+                features.results[start:start + batch_size],
+            )
+            gradient = _gradient(weights, batch, k)
+            step += 1
+            first = beta1 * first + (1 - beta1) * gradient
+            second = beta2 * second + (1 - beta2) * gradient ** 2
+            corrected = first / (1 - beta1 ** step)
+            scale = np.sqrt(second / (1 - beta2 ** step)) + epsilon
+            weights -= learning_rate * corrected / scale
+    return weights
+
+
+def export_tables(weights: np.ndarray) -> Tuple[Dict[type, List[int]], Dict[type, List[int]]]:
+    """Split tuned weights into piece-square tables in Evaluation's layout.
+
+    Material values stay those of Evaluation, the tables absorb the rest, so
+    the result can be passed to Evaluation.build_piece_square.
+    """
+    tables = ({}, {})
+    for i, piece_type in enumerate(PIECE_TYPES):
+        for row, material in ((0, MATERIAL_MG), (1, MATERIAL_EG)):
+            values = np.rint(weights[row, i * 64:(i + 1) * 64]).astype(int) - material[piece_type]
+            tables[row][piece_type] = values.tolist()
+    return tables
+
+
+def save_tables(path: str, weights: np.ndarray) -> None:
+    """Write the exported tables as JSON, keyed by piece name."""
+    tables_mg, tables_eg = export_tables(weights)
+    with open(path, "w") as f:
+        json.dump({
+            "mg": {piece_type.__name__: table for piece_type, table in tables_mg.items()},
+            "eg": {piece_type.__name__: table for piece_type, table in tables_eg.items()},
+        }, f)
+
+
+def load_tables(path: str) -> Tuple[Dict[type, List[int]], Dict[type, List[int]]]:
+    """Read tables written by save_tables."""
+    names = {piece_type.__name__: piece_type for piece_type in PIECE_TYPES}
+    with open(path) as f:
+        data = json.load(f)
+    return tuple(
+        {names[name]: table for name, table in data[phase].items()} for phase in ("mg", "eg")
+    )
+
+
+def main(argv: List[str] = None) -> None:
+    """Tune the piece-square tables on "<fen> <result>" lines and write them as JSON."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("input", help="labelled positions, one per line")
+    parser.add_argument("-o", "--output", default="tables.json")
+    parser.add_argument("--cache", help="base path of memory-mapped feature files to reuse")
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=65536)
+    parser.add_argument("--learning-rate", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    if args.cache and os.path.exists(f"{args.cache}_results.npy"):
+        features = load_features(args.cache)
+    else:
+        with open(args.input) as f:
+            positions = [parse_labelled(line) for line in f if line.strip()]
+        features = extract_features(positions, args.cache)
+
+    weights = initial_weights()
+    k = fit_scale(weights, features)
+    print(f"{len(features)} positions, k = {k:.2f}, loss {loss(weights, features, k):.6f}")
+    weights = tune(features, weights, args.epochs, args.batch_size, args.learning_rate, k)
+    print(f"tuned loss {loss(weights, features, k):.6f}")
+    save_tables(args.output, weights)
+
+
+if __name__ == "__main__":
+    main()
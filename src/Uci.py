@@ -0,0 +1,239 @@
+import sys
+import threading
+import time
+from typing import Callable, List, Optional
+
+from Chessboard import Game, Move
+import MoveCode
+import Notation
+from Search import MATE, MAX_DEPTH, Searcher, SearchResult
+
+
+ENGINE_NAME = "epita_python_chess"
+ENGINE_AUTHOR = "epita_python_chess authors"
+
+
+def format_uci(move: Move) -> str:
+    """Format a move in UCI long algebraic notation, e.g. "e2e4" or "a7a8q"."""
+    names = Notation.SQUARE_NAMES
+    return names[move.start] + names[move.end] + ("q" if move.is_promotion else "")
+
+
+class UciEngine:
+    """UCI front-end keeping one Game and one Searcher alive across commands.
+
+    Commands are passed to handle() one line at a time. Searches run on a
+    background thread, so isready, stop and ponderhit are answered while
+    a search is in progress. Output lines go to write, which must accept
+    calls from the search thread.
+    """
+
+    def __init__(self, write: Callable[[str], None] = None):
+        self._write = write or _print_line
+        self._lock = threading.Lock()
+        self.searcher = Searcher()
+        self.game = Game()
+        # Position command the game currently reflects
+        self.base = "startpos"
+        self.moves: List[str] = []
+        self._thread: Optional[threading.Thread] = None
+        # Time to spend once a ponder search turns into a real one, in seconds
+        self._ponder_movetime: Optional[float] = None
+        # Cleared during ponder and infinite searches, whose bestmove waits for stop
+        self._release = threading.Event()
+
+    def send(self, line: str) -> None:
+        with self._lock:
+            self._write(line)
+
+    def handle(self, line: str) -> bool:
+        """Handle one command line; returns False once the engine should quit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        try:
+            return self._dispatch(command, args)
+        except Exception as error:
+            # A bad command must not end the process the GUI talks to
+            self.send(f"info string error in {command}: {error}")
+            return True
+
+    def _dispatch(self, command: str, args: List[str]) -> bool:
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stop()
+            self.searcher.clear()
+            self.set_position("startpos", [])
+        elif command == "position":
+            self.stop()
+            self._position(args)
+        elif command == "go":
+            self.stop()
+            self._go(args)
+        elif command == "ponderhit":
+            self._ponderhit()
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            return False
+        return True
+
+    def _position(self, args: List[str]) -> None:
+        if "moves" in args:
+            split = args.index("moves")
+            base_args, moves = args[:split], args[split + 1:]
+        else:
+            base_args, moves = args, []
+        if base_args[:1] == ["fen"]:
+            base = " ".join(base_args[1:])
+        else:
+            base = "startpos"
+        self.set_position(base, moves)
+
+    def set_position(self, base: str, moves: List[str]) -> None:
+        """Bring the game to base plus moves, reusing the moves already played.
+
+        When base is unchanged, only the moves after the common prefix with
+        the current position are undone or played.
+        """
+        if base != self.base:
+            self.game = Game() if base == "startpos" else Game.from_fen(base)
+            self.base = base
+            self.moves = []
+
+        common = 0
+        for played, move in zip(self.moves, moves):
+            if played != move:
+                break
+            common += 1
+        for _ in range(len(self.moves) - common):
+            self.game.undo_move()
+        del self.moves[common:]
+
+        for move in moves[common:]:
+            # Keeps the promotion letter, so under-promotions are rejected
+            self.game.make_move(MoveCode.parse(move))
+            self.moves.append(move)
+
+    def _go(self, args: List[str]) -> None:
+        options = {}
+        flags = set()
+        i = 0
+        while i < len(args):
+            name = args[i]
+            if name in ("ponder", "infinite"):
+                flags.add(name)
+                i += 1
+            elif name == "searchmoves":
+                # Restricting the root moves is not supported, the rest is ignored
+                break
+            else:
+                if i + 1 < len(args):
+                    options[name] = int(args[i + 1])
+                i += 2
+
+        movetime = self._movetime(options)
+        depth = options.get("depth")
+        nodes = options.get("nodes")
+        if "ponder" in flags:
+            # Think on the opponent's time until ponderhit or stop
+            self._ponder_movetime = movetime
+            movetime = None
+        elif "infinite" in flags:
+            movetime = None
+        if flags:
+            self._release.clear()
+        else:
+            self._release.set()
+        # Limits are set before the thread starts, so a stop or ponderhit
+        # arriving before the search begins still applies to it
+        self.searcher.set_limits(nodes, movetime)
+        game = self.game.clone()
+        self._thread = threading.Thread(target=self._search, args=(game, depth), daemon=True)
+        self._thread.start()
+
+    def _movetime(self, options: dict) -> Optional[float]:
+        if "movetime" in options:
+            return options["movetime"] / 1000
+        side = "w" if self.game.current_turn == "white" else "b"
+        if f"{side}time" not in options:
+            return None
+        remaining = options[f"{side}time"]
+        increment = options.get(f"{side}inc", 0)
+        moves_to_go = options.get("movestogo", 30)
+        budget = remaining / max(moves_to_go, 1) + increment / 2
+        # Keep a safety margin for the last moves before the time control
+        return max(min(budget, remaining / 2), 10) / 1000
+
+    def _search(self, game: Game, depth: int) -> None:
+        start = time.monotonic()
+
+        def info(result: SearchResult) -> None:
+            elapsed = int((time.monotonic() - start) * 1000)
+            pv = " ".join(format_uci(move) for move in result.pv)
+            self.send(
+                f"info depth {result.depth} score {_format_score(result.score)} "
+                f"nodes {result.nodes} time {elapsed} pv {pv}"
+            )
+
+        result = self.searcher.run(game, depth, info)
+        self._release.wait()
+        if result.move is None:
+            self.send("bestmove 0000")
+        elif len(result.pv) > 1:
+            self.send(f"bestmove {format_uci(result.move)} ponder {format_uci(result.pv[1])}")
+        else:
+            self.send(f"bestmove {format_uci(result.move)}")
+
+    def _ponderhit(self) -> None:
+        # The opponent played the expected move: the ponder search becomes a timed one
+        if self._ponder_movetime is not None:
+            self.searcher.deadline = time.monotonic() + self._ponder_movetime
+        self._ponder_movetime = None
+        self._release.set()
+
+    def stop(self) -> None:
+        """Stop the running search, if any, and wait for its bestmove."""
+        if self._thread is not None:
+            self.searcher.stop()
+            self._release.set()
+            self._thread.join()
+            self._thread = None
+        self._ponder_movetime = None
+
+    def wait(self) -> None:
+        """Wait until the running search finishes on its own."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def _format_score(score: int) -> str:
+    if abs(score) >= MATE - MAX_DEPTH:
+        plies = MATE - abs(score)
+        moves = (plies + 1) // 2
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+def _print_line(line: str) -> None:
+    print(line, flush=True)
+
+
+def main() -> None:
+    """Run the engine on standard input and output."""
+    engine = UciEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from Chessboard import Game
+import MoveCode
+
+
+# Cached node statuses, for the side to move at the node
+ONGOING = "ongoing"
+CHECK = "check"
+CHECKMATE = "checkmate"
+STALEMATE = "stalemate"
+
+
+class VariationNode:
+    """A position of a variation tree, reached by move from its parent.
+
+    Children are keyed by the start and end squares of their move, so
+    lines sharing a prefix share its nodes.
+    """
+
+    __slots__ = ("move", "parent", "ply", "children", "comment", "nags", "_status")
+
+    def __init__(self, move: Optional[int], parent: Optional["VariationNode"]):
+        # MoveCode move from the parent, None for the root
+        self.move = move
+        self.parent = parent
+        self.ply = parent.ply + 1 if parent is not None else 0
+        self.children: Dict[int, VariationNode] = {}
+        self.comment: Optional[str] = None
+        # Numeric annotation glyphs, e.g. 1 for "!" and 2 for "?"
+        self.nags: List[int] = []
+        self._status: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f"VariationNode({' '.join(self.line()) or 'root'})"
+
+    def path(self) -> List["VariationNode"]:
+        """Return the nodes from the root's first child down to this node."""
+        nodes = []
+        node = self
+        while node.parent is not None:
+            nodes.append(node)
+            node = node.parent
+        nodes.reverse()
+        return nodes
+
+    def line(self) -> List[str]:
+        """Return the moves leading to this node in UCI notation."""
+        return [MoveCode.to_uci(node.move) for node in self.path()]
+
+    def is_leaf(self) -> bool:
+        return not self.children
+
+
+class VariationTree:
+    """Tree of the lines explored from a position, on a single game.
+
+    The tree plays its moves on its own copy of the starting game. Going
+    to another node undoes the moves back to the common ancestor and
+    plays the ones down to the node, so switching between sibling lines
+    costs one undo and one move.
+    """
+
+    def __init__(self, game: Game):
+        self.game = game.clone()
+        self.root = VariationNode(None, None)
+        self.current = self.root
+        self.size = 1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def play(self, move: Union[int, str]) -> VariationNode:
+        """Play a move from the current node and return the child it leads to.
+
+        The move is a MoveCode move or notation MoveCode.parse reads. A
+        child is only created the first time a move is played from a node.
+        """
+        if isinstance(move, str):
+            move = MoveCode.parse(move)
+        self.game.make_move(move)
+        key = move & MoveCode.SQUARES_MASK
+        node = self.current.children.get(key)
+        if node is None:
+            node = VariationNode(self.game.move_log[-1]['code'], self.current)
+            self.current.children[key] = node
+            self.size += 1
+        self.current = node
+        return node
+
+    def add_line(self, moves: Iterable[Union[int, str]], node: VariationNode = None) -> VariationNode:
+        """Play moves from node (the current node by default) and return the last node."""
+        if node is not None:
+            self.goto(node)
+        for move in moves:
+            self.play(move)
+        return self.current
+
+    def goto(self, node: VariationNode) -> None:
+        """Bring the game to the position of node."""
+        target = node
+        current = self.current
+        down = []
+        # Climb from the deeper node first, then from both until they meet
+        while node.ply > current.ply:
+            down.append(node)
+            node = node.parent
+        while current.ply > node.ply:
+            self.game.undo_move()
+            current = current.parent
+        while current is not node:
+            self.game.undo_move()
+            current = current.parent
+            down.append(node)
+            node = node.parent
+        for child in reversed(down):
+            self.game.make_move(child.move)
+        self.current = target
+
+    def back(self) -> None:
+        """Go to the parent of the current node."""
+        if self.current.parent is not None:
+            self.goto(self.current.parent)
+
+    def status(self, node: VariationNode = None) -> str:
+        """Return ONGOING, CHECK, CHECKMATE or STALEMATE for the side to move at node.
+
+        The status is computed on the first call and cached in the node;
+        computing it moves the tree to the node.
+        """
+        node = node or self.current
+        if node._status is None:
+            self.goto(node)
+            game = self.game
+            in_check = game.is_check(game.current_turn)
+            if game.legal_moves():
+                node._status = CHECK if in_check else ONGOING
+            else:
+                node._status = CHECKMATE if in_check else STALEMATE
+        return node._status
+
+    def annotate(
+        self, node: VariationNode = None, comment: str = None, nags: Iterable[int] = ()
+    ) -> None:
+        """Set the comment of node (the current node by default) and add glyphs."""
+        node = node or self.current
+        if comment is not None:
+            node.comment = comment
+        node.nags.extend(nag for nag in nags if nag not in node.nags)
+
+    def remove(self, node: VariationNode) -> None:
+        """Delete node and its subtree, moving to its parent if the current node is inside."""
+        if node.parent is None:
+            raise ValueError("The root cannot be removed")
+        ancestor = self.current
+        while ancestor is not None and ancestor is not node:
+            ancestor = ancestor.parent
+        if ancestor is node:
+            self.goto(node.parent)
+        del node.parent.children[node.move & MoveCode.SQUARES_MASK]
+        self.size -= sum(1 for _ in self.nodes(node))
+
+    def nodes(self, node: VariationNode = None) -> Iterator[VariationNode]:
+        """Yield node (the root by default) and all its descendants, depth first."""
+        stack = [node or self.root]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(list(node.children.values())))
+
+    def leaves(self) -> Iterator[VariationNode]:
+        """Yield the last node of every line."""
+        return (node for node in self.nodes() if node.is_leaf())
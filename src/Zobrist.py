@@ -0,0 +1,75 @@
+import random
+from Piece import Bishop, King, Knight, Pawn, Queen, Rook
+
+
+# Fixed seed so keys are identical in every process and across runs
+_random = random.Random(0x5EED_C0DE)
+
+# PIECE_KEYS[(piece_type, color)][y * 8 + x] is a random 64-bit key
+PIECE_KEYS = {
+    (piece_type, color): [_random.getrandbits(64) for _ in range(64)]
+    for piece_type in (Pawn, Knight, Bishop, Rook, Queen, King)
+    for color in ("white", "black")
+}
+
+# Drawn after the piece keys, in this order, so stored keys stay valid
+SIDE_KEY = _random.getrandbits(64)
+CASTLING_KEYS = {letter: _random.getrandbits(64) for letter in "KQkq"}
+# Indexed by the board column of the en passant target square
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]
+# Indexed by the square of an unmoved king or corner rook, see unmoved_key
+UNMOVED_KEYS = [_random.getrandbits(64) for _ in range(64)]
+
+
+def pawn_key(game) -> int:
+    """Recompute the pawn-only key of a game from its board."""
+    key = 0
+    for y, row in enumerate(game.board):
+        for x, piece in enumerate(row):
+            if isinstance(piece, Pawn):
+                key ^= PIECE_KEYS[(Pawn, piece.color)][y * 8 + x]
+    return key
+
+
+def board_key(game) -> int:
+    """Recompute the key of the piece placement of a game from its board."""
+    key = 0
+    for y, row in enumerate(game.board):
+        for x, piece in enumerate(row):
+            if piece is not None:
+                key ^= PIECE_KEYS[(type(piece), piece.color)][y * 8 + x]
+    return key
+
+
+def state_key(game) -> int:
+    """Return the key of the side to move, castling rights and en passant column."""
+    key = SIDE_KEY if game.current_turn == "black" else 0
+    for letter in game.castling_rights().replace("-", ""):
+        key ^= CASTLING_KEYS[letter]
+    pawn = game.en_passant_pawn
+    if pawn is not None and pawn.en_passant_vulnerable:
+        key ^= EN_PASSANT_KEYS[pawn.position.x]
+    return key
+
+
+def unmoved_key(game) -> int:
+    """Return the key of the unmoved kings and corner rooks.
+
+    The castling moves depend on these has_moved flags, which
+    castling_rights only reports for kings on their starting square.
+    """
+    board = game.board
+    key = 0
+    for position in game.king_positions.values():
+        if position is not None and not board[position.y][position.x].has_moved:
+            key ^= UNMOVED_KEYS[position.y * 8 + position.x]
+    for square in (0, 7, 56, 63):
+        piece = board[square >> 3][square & 7]
+        if isinstance(piece, Rook) and not piece.has_moved:
+            key ^= UNMOVED_KEYS[square]
+    return key
+
+
+def position_key(game) -> int:
+    """Recompute the full position key of a game from its board."""
+    return board_key(game) ^ state_key(game)
@@ -53,12 +53,9 @@ def main():
             print("Invalid move. Please try again.")
             continue
 
-        if not game.is_valid_move(start, end):
-            print("Invalid move. Please try again.")
-            continue
-        
-        piece = game.get_piece_at(start)
-        if piece.color != turn:
+        # The index only holds moves of the side to move, so this lookup
+        # covers both the validity and the colour check
+        if (start, end) not in game.legal_moves(turn):
             print("Invalid move. Please try again.")
             continue
 
@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+import unittest
+import Analysis
+import Notation
+
+
+FOOLS_MATE = "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+STALEMATE = "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"
+CHECK = "4k3/8/8/8/8/8/4r3/4K3 w - - 0 1"
+
+
+class AnalysisTest(unittest.TestCase):
+    def test_start_position(self):
+        result = Analysis.analyse(Notation.START_FEN)
+        self.assertFalse(result["check"])
+        self.assertEqual(result["legal_move_count"], 20)
+        self.assertIn("e2-e4", result["legal_moves"])
+
+    def test_checkmate(self):
+        result = Analysis.analyse(FOOLS_MATE)
+        self.assertTrue(result["check"])
+        self.assertTrue(result["checkmate"])
+        self.assertEqual(result["legal_moves"], [])
+
+    def test_stalemate(self):
+        result = Analysis.analyse(STALEMATE)
+        self.assertTrue(result["stalemate"])
+        self.assertFalse(result["checkmate"])
+
+    def test_check(self):
+        result = Analysis.analyse(CHECK)
+        self.assertTrue(result["check"])
+        self.assertFalse(result["checkmate"])
+        self.assertEqual(sorted(result["legal_moves"]), ["e1-d1", "e1-e2", "e1-f1"])
+
+    def test_invalid_fen(self):
+        self.assertIn("error", Analysis.analyse("not a fen"))
+
+    def test_stream_keeps_order(self):
+        fens = [FOOLS_MATE, Notation.START_FEN, STALEMATE] * 3
+        results = list(Analysis.analyse_stream(fens, processes=2, chunk_size=2, max_pending=2))
+        self.assertEqual([result["fen"] for result in results], fens)
+        inline = list(Analysis.analyse_stream(fens, processes=0, chunk_size=2))
+        self.assertEqual(results, inline)
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "positions.fen")
+            target = os.path.join(directory, "results.jsonl")
+            with open(source, "w") as f:
+                f.write(f"{FOOLS_MATE}\n\n{CHECK}\n")
+            Analysis.main([source, "-o", target, "-p", "1", "--no-moves"])
+            with open(target) as f:
+                results = [json.loads(line) for line in f]
+        self.assertEqual(len(results), 2)
+        self.assertTrue(results[0]["checkmate"])
+        self.assertNotIn("legal_moves", results[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import struct
+import tempfile
+import unittest
+from Chessboard import Game
+import Checkpoint
+import MoveCode
+from Notation import parse_square
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "games.ckpt")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        long_game = Game()
+        for _ in range(5):
+            for move in ("g1f3", "g8f6", "f3g1", "f6g8"):
+                long_game.make_move(MoveCode.parse(move))
+        games = [Game(), Game(), Game(), Game.from_fen("4k3/P7/8/8/8/8/8/4K3 w - - 0 1"), long_game]
+        # A capture, en passant available and a promotion in the log
+        lines = ["e2e4 d7d5 e4d5 d8d5", "e2e4 a7a6 e4e5 d7d5", "a7a8"]
+        for game, line in zip(games[1:], lines):
+            for move in line.split():
+                game.make_move(MoveCode.parse(move))
+        self.assertEqual(Checkpoint.save_all(self.path, games), len(games))
+        restored = Checkpoint.load_all(self.path)
+        self.assertEqual(len(restored), len(games))
+        for game, copy in zip(games, restored):
+            self.assertEqual(copy.to_fen(), game.to_fen())
+            self.assertEqual(copy.move_log, game.move_log)
+            self.assertEqual(copy.position_key(), game.position_key())
+            self.assertEqual(len(copy.legal_moves()), len(game.legal_moves()))
+        # Keyframes are kept, so seek works on restored games
+        self.assertEqual(restored[4].seek(17).to_fen(), long_game.seek(17).to_fen())
+        restored[2].make_move(MoveCode.parse("e5d6"))
+        self.assertIsNone(restored[2].get_piece_at(parse_square("d5")))
+
+    def test_empty_checkpoint(self):
+        self.assertEqual(Checkpoint.save_all(self.path, iter([])), 0)
+        self.assertEqual(Checkpoint.load_all(self.path), [])
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_version_is_checked(self):
+        Checkpoint.save_all(self.path, [Game()])
+        with open(self.path, "r+b") as f:
+            f.seek(4)
+            f.write(struct.pack("<H", Checkpoint.VERSION + 1))
+        with self.assertRaises(ValueError):
+            Checkpoint.load_all(self.path)
+        with open(self.path, "wb") as f:
+            f.write(bytes(Checkpoint.HEADER.size))
+        with self.assertRaises(ValueError):
+            Checkpoint.load_all(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,11 @@
+import copy
+import os
+import subprocess
+import sys
 import unittest
 from Chessboard import Game, Position, Piece, Rook, Knight, Bishop, Queen, King, Pawn
+import MoveCode
+from Notation import parse_square
 
 
 class ChessboardTest(unittest.TestCase):
@@ -35,10 +41,317 @@ class ChessboardTest(unittest.TestCase):
         valid = game.is_valid_move(Position(4, 6), Position(4, 4))
         self.assertTrue(valid)
 
+    def test_legal_moves(self):
+        game = Game()
+        moves = game.legal_moves()
+        self.assertEqual(len(moves), 20)
+        move = moves[(Position(4, 1), Position(4, 3))]
+        self.assertIsInstance(move.piece, Pawn)
+        self.assertFalse(move.is_capture)
+        self.assertNotIn((Position(4, 6), Position(4, 4)), moves)
+
+    def test_legal_moves_capture(self):
+        game = Game()
+        game.make_move(Position(4, 1), Position(4, 3))
+        game.make_move(Position(3, 6), Position(3, 4))
+        move = game.legal_moves()[(Position(4, 3), Position(3, 4))]
+        self.assertTrue(move.is_capture)
+        self.assertIsInstance(move.captured, Pawn)
+        self.assertFalse(move.is_en_passant)
+
+    def test_make_move_not_your_turn(self):
+        game = Game()
+        with self.assertRaises(ValueError):
+            game.make_move(Position(4, 6), Position(4, 4))
+
+    def test_piece_lists(self):
+        game = Game()
+        self.assertEqual(len(game.pieces["white"]), 16)
+        self.assertEqual(game.king_positions["black"], Position(3, 7))
+        self.assertEqual(game.piece_counts["black"][Pawn], 8)
+
+    def test_piece_lists_after_capture(self):
+        game = Game()
+        game.make_move(Position(4, 1), Position(4, 3))
+        game.make_move(Position(3, 6), Position(3, 4))
+        game.make_move(Position(4, 3), Position(3, 4))
+        self.assertEqual(game.piece_counts["black"][Pawn], 7)
+        self.assertIs(game.pieces["white"][Position(3, 4)], game.get_piece_at(Position(3, 4)))
+        self.assertNotIn(Position(4, 3), game.pieces["white"])
+
+    def test_piece_lists_after_promotion(self):
+        game = Game()
+        game.board[6][0] = None
+        game.board[7][0] = None
+        game.board[6][0] = game.board[1][0]
+        game.board[1][0] = None
+        game.index_pieces()
+        game.make_move(Position(0, 6), Position(0, 7))
+        self.assertIsInstance(game.pieces["white"][Position(0, 7)], Queen)
+        self.assertEqual(game.piece_counts["white"][Pawn], 7)
+        self.assertEqual(game.piece_counts["white"][Queen], 2)
+        self.assertEqual(game.piece_counts["black"][Rook], 1)
+
+    def test_king_position_after_move(self):
+        game = Game()
+        game.make_move(Position(3, 1), Position(3, 2))
+        game.make_move(Position(0, 6), Position(0, 5))
+        game.make_move(Position(3, 0), Position(3, 1))
+        self.assertEqual(game.king_positions["white"], Position(3, 1))
+
+    def test_clone(self):
+        game = Game()
+        game.make_move(Position(4, 1), Position(4, 3))
+        clone = game.clone()
+        self.assertIsNot(clone.get_piece_at(Position(4, 3)), game.get_piece_at(Position(4, 3)))
+        self.assertIs(clone.get_piece_at(Position(4, 3)).game, clone)
+        self.assertIs(clone.pieces["white"][Position(4, 3)], clone.get_piece_at(Position(4, 3)))
+        self.assertEqual(clone.current_turn, "black")
+
+        clone.make_move(Position(3, 6), Position(3, 4))
+        self.assertIsNone(game.get_piece_at(Position(3, 4)))
+        self.assertEqual(len(game.move_log), 1)
+        self.assertEqual(len(clone.move_log), 2)
+
+    def test_new_games_are_independent(self):
+        game = Game()
+        game.make_move(Position(4, 1), Position(4, 3))
+        fresh = Game()
+        self.assertIsNone(fresh.get_piece_at(Position(4, 3)))
+        self.assertIsNot(fresh.get_piece_at(Position(0, 0)), game.get_piece_at(Position(0, 0)))
+        self.assertIs(fresh.get_piece_at(Position(0, 0)).game, fresh)
+        self.assertEqual(fresh.move_log, [])
+        self.assertEqual(fresh.board_key, Game._starting_position().board_key)
+
+        games = Game.new_many(3)
+        self.assertEqual(len(games), 3)
+        games[0].make_move(Position(4, 1), Position(4, 3))
+        self.assertEqual(games[1].to_fen(), fresh.to_fen())
+        self.assertEqual(len(games[2].legal_moves()), 20)
+
+    def test_clone_shares_move_log_until_append(self):
+        game = Game()
+        game.make_move(Position(4, 1), Position(4, 3))
+        clone = game.clone()
+        self.assertIs(clone.move_log, game.move_log)
+        game.make_move(Position(3, 6), Position(3, 4))
+        self.assertEqual(len(clone.move_log), 1)
+
+    def test_deepcopy(self):
+        game = Game()
+        game.make_move(Position(1, 1), Position(1, 3))
+        clone = copy.deepcopy(game)
+        self.assertIsInstance(clone, Game)
+        self.assertIs(clone.en_passant_pawn, clone.get_piece_at(Position(1, 3)))
+
+    def test_copies_keep_pieces_put_on_the_board(self):
+        game = Game()
+        game.board[3][3] = Queen("white", Position(3, 3), game)
+        for clone in (game.clone(), copy.deepcopy(game)):
+            queen = clone.get_piece_at(Position(3, 3))
+            self.assertIsInstance(queen, Queen)
+            self.assertIs(queen.game, clone)
+            self.assertIs(clone.pieces["white"][Position(3, 3)], queen)
+            self.assertEqual(clone.board_key, game.board_key)
+
+    def test_to_fen(self):
+        game = Game()
+        self.assertEqual(game.to_fen(), "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        game.make_move(Position(3, 1), Position(3, 3))
+        self.assertEqual(game.to_fen(), "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1")
+
+    def test_from_fen(self):
+        fen = "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w Kq f6 0 1"
+        game = Game.from_fen(fen)
+        self.assertEqual(game.to_fen(), fen)
+        self.assertIsInstance(game.get_piece_at(Position(3, 0)), King)
+        self.assertEqual(game.castling_rights(), "Kq")
+        move = game.legal_moves()[(Position(3, 4), Position(2, 5))]
+        self.assertTrue(move.is_en_passant)
+
+    def test_en_passant_expires(self):
+        game = Game.from_fen("4k3/3p4/8/4P3/8/8/8/4K3 b - - 0 1")
+        game.make_move(Position(4, 6), Position(4, 4))
+        self.assertTrue(game.is_valid_move(Position(3, 4), Position(4, 5)))
+        game.make_move(Position(3, 0), Position(2, 0))
+        game.make_move(Position(3, 7), Position(2, 7))
+        self.assertFalse(game.is_valid_move(Position(3, 4), Position(4, 5)))
+        self.assertEqual(game.to_fen().split()[3], "-")
+
+    def test_en_passant_captures_checking_pawn(self):
+        game = Game.from_fen("8/8/8/1k6/Pp6/8/8/4K3 b - a3 0 1")
+        self.assertTrue(game.is_check("black"))
+        self.assertTrue(game.is_valid_move(Position(6, 3), Position(7, 2)))
+
+    def test_from_fen_invalid(self):
+        with self.assertRaises(ValueError):
+            Game.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1")
+        with self.assertRaises(ValueError):
+            Game.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNZ w KQkq - 0 1")
+
+    def test_legal_moves_exclude_self_check(self):
+        # The knight on e2 is pinned by the rook on e8
+        game = Game.from_fen("4r1k1/8/8/8/8/8/4N3/4K3 w - - 0 1")
+        self.assertFalse(game.is_valid_move(Position(3, 1), Position(5, 2)))
+        self.assertNotIn((Position(3, 0), Position(3, 1)), game.legal_moves())
+
+    def test_is_checkmate_fools_mate(self):
+        game = Game.from_fen("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3")
+        self.assertTrue(game.is_checkmate("white"))
+        self.assertFalse(game.is_checkmate("black"))
+
+    def test_undo_move(self):
+        game = Game()
+        fen = game.to_fen()
+        game.make_move(Position(3, 1), Position(3, 3))
+        game.undo_move()
+        self.assertEqual(game.to_fen(), fen)
+        self.assertEqual(game.move_log, [])
+        with self.assertRaises(ValueError):
+            game.undo_move()
+
+    def test_undo_capture_and_en_passant(self):
+        fen = "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w Kq f6 0 1"
+        game = Game.from_fen(fen)
+        game.make_move(Position(3, 4), Position(2, 5))
+        self.assertIsNone(game.get_piece_at(Position(2, 4)))
+        game.undo_move()
+        self.assertEqual(game.to_fen(), fen)
+        self.assertEqual(game.piece_counts["black"][Pawn], 8)
+
+    def test_undo_promotion(self):
+        fen = "4k3/P7/8/8/8/8/8/4K3 w - - 0 1"
+        game = Game.from_fen(fen)
+        game.make_move(Position(7, 6), Position(7, 7))
+        game.undo_move()
+        self.assertEqual(game.to_fen(), fen)
+        self.assertIsInstance(game.get_piece_at(Position(7, 6)), Pawn)
+
+    def test_seek(self):
+        game = Game()
+        game.keyframe_interval = 4
+        fens = [game.to_fen()]
+        for _ in range(30):
+            move = min(game.legal_moves().values(), key=lambda m: (m.start.y, m.end.x, m.end.y))
+            game.make_move(move.start, move.end)
+            fens.append(game.to_fen())
+        for ply, fen in enumerate(fens):
+            seeked = game.seek(ply)
+            self.assertEqual(seeked.to_fen(), fen)
+            self.assertEqual(len(seeked.move_log), ply)
+        self.assertEqual(game.to_fen(), fens[-1])
+        with self.assertRaises(ValueError):
+            game.seek(31)
+
+    def test_seek_without_keyframes(self):
+        game = Game.from_fen("4k3/8/8/8/8/8/8/4K3 w - - 0 1")
+        self.assertEqual(game.seek(0).to_fen(), game.to_fen())
+        # A move log without the positions it was played from
+        game.move_log = [{'code': MoveCode.parse("d1d2")}]
+        with self.assertRaises(ValueError):
+            game.seek(0)
+        self.assertEqual(game.seek(1).to_fen(), game.to_fen())
+
+    def test_seek_after_undo(self):
+        game = Game()
+        game.keyframe_interval = 2
+        for start, end in [((3, 1), (3, 3)), ((3, 6), (3, 4)), ((1, 0), (2, 2)), ((1, 7), (2, 5))]:
+            game.make_move(Position(*start), Position(*end))
+        game.undo_move()
+        game.undo_move()
+        game.make_move(Position(6, 0), Position(5, 2))
+        self.assertEqual(game.seek(3).to_fen(), game.to_fen())
+
+    def test_undo_castling(self):
+        game = Game()
+        game.board[0] = [Rook("white"), None, None, None, King("white"), None, None, Rook("white")]
+        game.index_pieces()
+        game.make_move(Position(4, 0), Position(6, 0))
+        self.assertIsInstance(game.get_piece_at(Position(5, 0)), Rook)
+        game.undo_move()
+        self.assertIsInstance(game.get_piece_at(Position(7, 0)), Rook)
+        self.assertIsNone(game.get_piece_at(Position(5, 0)))
+        self.assertFalse(game.get_piece_at(Position(4, 0)).has_moved)
+        self.assertIn((Position(4, 0), Position(6, 0)), game.legal_moves())
+
+    def test_gives_check(self):
+        def gives_check(fen, start, end):
+            game = Game.from_fen(fen)
+            move = game.legal_moves()[(parse_square(start), parse_square(end))]
+            self.assertEqual(game.gives_check(move), game.gives_check(move.code))
+            return game.gives_check(move)
+
+        # Direct checks, including by a promoted queen
+        self.assertTrue(gives_check("4k3/8/8/8/8/8/8/R3K3 w - - 0 1", "a1", "a8"))
+        self.assertFalse(gives_check("4k3/8/8/8/8/8/8/R3K3 w - - 0 1", "a1", "a7"))
+        self.assertTrue(gives_check("4k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7", "a8"))
+        self.assertTrue(gives_check("4k3/8/8/3N4/8/8/8/4K3 w - - 0 1", "d5", "f6"))
+        # Discovered checks, including through a pawn taken en passant
+        self.assertTrue(gives_check("4k3/8/8/8/8/8/4N3/4R1K1 w - - 0 1", "e2", "c3"))
+        self.assertTrue(gives_check("8/8/8/k2pP2R/8/8/8/4K3 w - d6 0 1", "e5", "d6"))
+        self.assertFalse(gives_check("8/8/8/k2pP2R/8/8/8/4K3 w - d6 0 1", "e5", "e6"))
+
+        # Castling checks with the rook, the board is edited as in test_undo_castling
+        game = Game.from_fen("2k5/8/8/8/8/8/8/8 w - - 0 1")
+        game.board[0] = [Rook("white"), None, None, None, King("white"), None, None, Rook("white")]
+        game.index_pieces()
+        fen = game.to_fen()
+        self.assertTrue(game.gives_check(game.legal_moves()[(Position(4, 0), Position(6, 0))]))
+        self.assertFalse(game.gives_check(game.legal_moves()[(Position(4, 0), Position(2, 0))]))
+        self.assertEqual(game.to_fen(), fen)
+
+    def test_gives_check_rejects_illegal_codes(self):
+        game = Game()
+        for move in ("e3e4", "e7e5", "e2e5"):
+            with self.assertRaises(ValueError):
+                game.gives_check(MoveCode.parse(move))
+
     def test_is_check(self):
         game = Game()
         self.assertFalse(game.is_check("white"))
 
+    def test_check_after_board_edit(self):
+        game = Game()
+        game.legal_moves()
+        # Open the e-file and put a black rook on e5
+        game.board[1][3] = None
+        game.board[4][3] = Rook("black", Position(3, 4), game)
+        self.assertTrue(game.is_check("white"))
+        self.assertTrue(game.is_square_attacked(Position(3, 1), "black"))
+        self.assertFalse(game.is_checkmate("white"))
+        # Only blocking on e2 is left
+        self.assertEqual(
+            {start for start, end in game.legal_moves()},
+            {Position(1, 0), Position(2, 0), Position(4, 0)},
+        )
+
+    def test_check_after_piece_added(self):
+        game = Game()
+        # A black knight on f3, which no piece list holds yet
+        game.board[2][2] = Knight("black", Position(2, 2), game)
+        self.assertTrue(game.is_check("white"))
+        self.assertEqual(game.piece_counts["black"][Knight], 3)
+        game.legal_moves()
+        self.assertTrue(game.is_check("white"))
+
+        game = Game()
+        game.legal_moves()
+        # The pawn on d2 is pinned by a bishop added on b4
+        game.board[3][6] = Bishop("black", Position(6, 3), game)
+        self.assertNotIn((Position(4, 1), Position(4, 2)), game.legal_moves())
+
+    def test_make_move_after_board_edit(self):
+        game = Game()
+        self.assertTrue(game.is_valid_move(Position(0, 1), Position(0, 2)))
+        # Open the e-file and check the white king from e5
+        game.board[1][3] = None
+        game.board[4][3] = Rook("black", Position(3, 4), game)
+        self.assertFalse(game.is_valid_move(Position(0, 1), Position(0, 2)))
+        with self.assertRaises(ValueError):
+            game.make_move(Position(0, 1), Position(0, 2))
+        game.make_move(Position(2, 0), Position(3, 1))
+        self.assertIsInstance(game.get_piece_at(Position(3, 1)), Bishop)
+
     def test_is_checkmate(self):
         game = Game()
         self.assertFalse(game.is_checkmate("white"))
@@ -56,6 +369,16 @@ class ChessboardTest(unittest.TestCase):
         svg_content = game.to_svg()
         self.assertTrue(len(svg_content) > 0)
 
+    def test_core_import_is_headless(self):
+        code = "import sys, Chessboard; print('svgwrite' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
 
 if __name__ == "__main__":
     unittest.main()
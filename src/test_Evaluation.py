@@ -0,0 +1,50 @@
+import unittest
+from Chessboard import Game
+from Piece import Position, Queen
+import Evaluation
+
+
+class EvaluationTest(unittest.TestCase):
+    def test_start_position_is_balanced(self):
+        game = Game()
+        self.assertEqual(Evaluation.evaluate(game, verify=True), 0)
+        self.assertEqual(game.phase, Evaluation.MAX_PHASE)
+
+    def test_side_to_move_perspective(self):
+        game = Game.from_fen("4k3/8/8/8/8/8/8/3QK3 w - - 0 1")
+        self.assertGreater(Evaluation.evaluate(game), 900)
+        game = Game.from_fen("4k3/8/8/8/8/8/8/3QK3 b - - 0 1")
+        self.assertLess(Evaluation.evaluate(game), -900)
+
+    def test_incremental_matches_full_recompute(self):
+        game = Game()
+        moves = [
+            (Position(3, 1), Position(3, 3)),
+            (Position(4, 6), Position(4, 4)),
+            (Position(3, 3), Position(4, 4)),
+            (Position(4, 7), Position(4, 4)),
+        ]
+        for start, end in moves:
+            game.make_move(start, end)
+            Evaluation.evaluate(game, verify=True)
+        game.undo_move()
+        game.undo_move()
+        Evaluation.evaluate(game, verify=True)
+
+    def test_promotion(self):
+        game = Game.from_fen("4k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        before = game.mg_score
+        game.make_move(Position(7, 6), Position(7, 7))
+        self.assertIsInstance(game.get_piece_at(Position(7, 7)), Queen)
+        self.assertGreater(game.mg_score - before, 800)
+        Evaluation.evaluate(game, verify=True)
+
+    def test_verify_detects_stale_scores(self):
+        game = Game()
+        game.board[1][0] = None
+        with self.assertRaises(AssertionError):
+            Evaluation.evaluate(game, verify=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from Chessboard import Game
+from Events import Captured, Castled, Check, EnPassant, GameOver, Moved, Promoted
+import MoveCode
+from Notation import parse_square
+from Piece import King, Position, Queen, Rook
+
+
+class EventsTest(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+
+    def test_moved_and_captured(self):
+        game = Game()
+        for move in ("e2e4", "d7d5"):
+            game.make_move(MoveCode.parse(move))
+        game.subscribe(self.events.append)
+        game.make_move(MoveCode.parse("e4d5"))
+        captured, moved = self.events
+        self.assertIsInstance(captured, Captured)
+        self.assertEqual(captured.square, parse_square("d5"))
+        self.assertEqual(captured.piece.color, "black")
+        self.assertIsInstance(moved, Moved)
+        self.assertEqual(moved.squares, (parse_square("e4"), parse_square("d5")))
+
+    def test_event_type_filter_and_unsubscribe(self):
+        game = Game()
+        game.subscribe(self.events.append, Captured)
+        for move in ("e2e4", "d7d5", "e4d5"):
+            game.make_move(MoveCode.parse(move))
+        self.assertEqual([type(event) for event in self.events], [Captured])
+        game.unsubscribe(self.events.append)
+        game.make_move(MoveCode.parse("d8d5"))
+        self.assertEqual(len(self.events), 1)
+
+    def test_en_passant(self):
+        game = Game()
+        for move in ("e2e4", "a7a6", "e4e5", "d7d5"):
+            game.make_move(MoveCode.parse(move))
+        game.subscribe(self.events.append)
+        game.make_move(MoveCode.parse("e5d6"))
+        self.assertEqual([type(event) for event in self.events], [Captured, Moved, EnPassant])
+        self.assertEqual(self.events[0].square, parse_square("d5"))
+        self.assertEqual(
+            self.events[2].squares, (parse_square("e5"), parse_square("d6"), parse_square("d5"))
+        )
+
+    def test_promotion_and_check(self):
+        game = Game.from_fen("4k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        game.subscribe(self.events.append)
+        game.make_move(MoveCode.parse("a7a8"))
+        self.assertEqual([type(event) for event in self.events], [Moved, Promoted, Check])
+        self.assertIsInstance(self.events[1].piece, Queen)
+        self.assertEqual(self.events[2].color, "black")
+        self.assertEqual(self.events[2].king_square, parse_square("e8"))
+
+    def test_checkmate_and_stalemate(self):
+        game = Game()
+        game.subscribe(self.events.append, GameOver)
+        for move in ("f2f3", "e7e5", "g2g4", "d8h4"):
+            game.make_move(MoveCode.parse(move))
+        self.assertEqual(self.events, [GameOver("checkmate", "black")])
+
+        game = Game.from_fen("7k/8/5K2/6Q1/8/8/8/8 w - - 0 1")
+        game.subscribe(self.events.append, GameOver)
+        game.make_move(MoveCode.parse("g5g6"))
+        self.assertEqual(self.events[-1], GameOver("stalemate"))
+
+    def test_castling(self):
+        # Castling is played by the king's move method, with the king on x=4
+        game = Game.from_fen("4k3/8/8/8/8/8/8/8 w - - 0 1")
+        king = King("white", Position(4, 0), game)
+        rook = Rook("white", Position(7, 0), game)
+        king.has_moved = rook.has_moved = False
+        game._put_piece(king, king.position)
+        game._put_piece(rook, rook.position)
+        game.subscribe(self.events.append)
+        king.move(Position(6, 0))
+        self.assertEqual([type(event) for event in self.events], [Moved, Moved, Castled])
+        self.assertEqual(
+            self.events[2].squares,
+            (Position(4, 0), Position(6, 0), Position(7, 0), Position(5, 0)),
+        )
+
+    def test_clone_and_undo_send_nothing(self):
+        game = Game()
+        game.subscribe(self.events.append)
+        game.clone().make_move(MoveCode.parse("e2e4"))
+        game.make_move(parse_square("e2"), parse_square("e4"))
+        count = len(self.events)
+        game.undo_move()
+        self.assertEqual(len(self.events), count)
+
+
+if __name__ == "__main__":
+    unittest.main()
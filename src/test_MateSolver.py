@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import unittest
+from Chessboard import Game
+import MateSolver
+
+
+MATE_IN_ONE = "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 0 1"
+MATE_IN_TWO = "k7/8/2K5/8/8/8/8/7R w - - 0 1"
+STALEMATE = "k7/8/1Q6/8/8/8/8/7K b - - 0 1"
+
+
+class MateSolverTest(unittest.TestCase):
+    def test_mate_in_one(self):
+        result = MateSolver.solve_mate(Game.from_fen(MATE_IN_ONE), 1)
+        self.assertEqual(result.status, MateSolver.PROVED)
+        self.assertEqual(result.line, ["f3-f7"])
+
+    def test_mate_in_two(self):
+        game = Game.from_fen(MATE_IN_TWO)
+        result = MateSolver.solve_mate(game, 2)
+        self.assertEqual(result.status, MateSolver.PROVED)
+        self.assertEqual(len(result.line), 3)
+        # The line is playable and ends in mate; the input game is untouched
+        replay = Game.from_fen(MATE_IN_TWO)
+        for notation in result.line:
+            replay.make_move(*replay.full_chess_notation_to_position(notation))
+        self.assertTrue(replay.is_checkmate(replay.current_turn))
+        self.assertEqual(game.to_fen(), MATE_IN_TWO)
+
+    def test_no_mate_within_depth(self):
+        result = MateSolver.solve_mate(Game.from_fen(MATE_IN_TWO), 1)
+        self.assertEqual(result.status, MateSolver.DISPROVED)
+        self.assertEqual(result.line, [])
+
+    def test_stalemated(self):
+        result = MateSolver.solve_mate(Game.from_fen(STALEMATE), 1)
+        self.assertEqual(result.status, MateSolver.DISPROVED)
+
+    def test_node_limit(self):
+        result = MateSolver.solve_mate(Game.from_fen(MATE_IN_TWO), 2, max_nodes=5)
+        self.assertEqual(result.status, MateSolver.UNKNOWN)
+
+    def test_batch(self):
+        puzzles = [(MATE_IN_ONE, 1), (MATE_IN_TWO, 1), ("not a fen", 1)]
+        results = list(MateSolver.solve_batch(puzzles, processes=2))
+        self.assertEqual([r.get("status") for r in results], ["mate", "no mate", None])
+        self.assertIn("error", results[2])
+        self.assertEqual(results, list(MateSolver.solve_batch(puzzles, processes=0)))
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "puzzles.txt")
+            target = os.path.join(directory, "results.jsonl")
+            with open(source, "w") as f:
+                f.write(f"{MATE_IN_ONE}\n\n{MATE_IN_TWO}; 2\n")
+            MateSolver.main([source, "-o", target, "-p", "1", "-n", "1"])
+            with open(target) as f:
+                results = [json.loads(line) for line in f]
+        self.assertEqual([result["moves"] for result in results], [1, 2])
+        self.assertEqual([result["status"] for result in results], ["mate", "mate"])
+
+
+if __name__ == "__main__":
+    unittest.main()
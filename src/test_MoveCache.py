@@ -0,0 +1,126 @@
+import unittest
+from Chessboard import Game
+from MoveCache import CachedPosition, MoveCache
+import MoveCode
+from Notation import parse_square
+from Piece import Knight, Position
+import Zobrist
+
+
+class MoveCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = MoveCache()
+        self.previous = Game.move_cache
+        Game.move_cache = self.cache
+
+    def tearDown(self):
+        Game.move_cache = self.previous
+
+    def test_shared_between_games(self):
+        first = Game()
+        self.assertEqual(len(first.legal_moves()), 20)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+        second = Game()
+        moves = second.legal_moves()
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(set(moves), set(first.legal_moves()))
+        # Moves are rebuilt from the pieces of the game asking for them
+        move = moves[(parse_square("e2"), parse_square("e4"))]
+        self.assertIs(move.piece, second.get_piece_at(parse_square("e2")))
+
+    def test_transpositions_share_a_key(self):
+        first, second = Game(), Game()
+        for move in ("g1-f3", "g8-f6", "b1-c3"):
+            first.make_move(MoveCode.parse(move))
+        for move in ("b1-c3", "g8-f6", "g1-f3"):
+            second.make_move(MoveCode.parse(move))
+        self.assertEqual(first.position_key(), second.position_key())
+        self.assertEqual(first.position_key(), Zobrist.position_key(first))
+        first.legal_moves()
+        hits = self.cache.hits
+        second.legal_moves()
+        self.assertEqual(self.cache.hits, hits + 1)
+
+    def test_key_includes_side_and_en_passant(self):
+        game = Game()
+        start = game.position_key()
+        game.make_move(MoveCode.parse("e2-e4"))
+        with_target = game.position_key()
+        for move in ("g8-f6", "g1-f3", "f6-g8", "f3-g1"):
+            game.make_move(MoveCode.parse(move))
+        self.assertNotEqual(game.position_key(), with_target)
+        self.assertEqual(game.position_key(), Zobrist.position_key(game))
+        game.make_move(MoveCode.parse("e7-e5"))
+        self.assertNotEqual(game.position_key(), start)
+
+    def test_status(self):
+        entry = CachedPosition.from_moves([], True)
+        self.assertTrue(entry.is_checkmate)
+        self.assertFalse(entry.is_stalemate)
+        game = Game.from_fen("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3")
+        self.assertTrue(game.is_checkmate("white"))
+        self.assertTrue(self.cache.get(game._cache_key()).is_checkmate)
+
+    def test_status_from_cache(self):
+        fen = "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+        Game.from_fen(fen).legal_moves()
+        stats = self.cache.stats()
+        game = Game.from_fen(fen)
+        self.assertTrue(game.is_check("white"))
+        self.assertTrue(game.is_checkmate("white"))
+        self.assertFalse(game.is_stalemate("white"))
+        # Answered from the entry, without generating moves or counting lookups
+        self.assertEqual(game._move_index, {})
+        self.assertEqual(self.cache.stats(), stats)
+        stalemate = "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"
+        self.assertTrue(Game.from_fen(stalemate).is_stalemate("black"))
+        # The second game reads the entry the first one stored
+        game = Game.from_fen(stalemate)
+        self.assertTrue(game.is_stalemate("black"))
+        self.assertEqual(game._move_index, {})
+
+    def test_board_edits_do_not_leak(self):
+        edited = Game()
+        # A black knight on f3, put there without going through the game
+        edited.board[2][2] = Knight("black", Position(2, 2), edited)
+        self.assertNotEqual(edited.position_key(), Game().position_key())
+        self.assertEqual(edited.position_key(), Zobrist.position_key(edited))
+        self.assertEqual(len(edited.legal_moves()), 3)
+        game = Game()
+        self.assertEqual(len(game.legal_moves()), 20)
+        self.assertFalse(game.is_check("white"))
+
+    def test_key_includes_unmoved_king(self):
+        # A king on d1 only castles if it has never moved
+        fen = "k7/8/8/8/8/8/8/3K3R w - - 0 1"
+        unmoved = Game.from_fen(fen)
+        unmoved.get_piece_at(Position(4, 0)).has_moved = False
+        unmoved.get_piece_at(Position(0, 0)).has_moved = False
+        castle = (Position(4, 0), Position(2, 0))
+        self.assertIn(castle, unmoved.legal_moves())
+        self.assertNotIn(castle, Game.from_fen(fen).legal_moves())
+
+    def test_eviction(self):
+        game = Game()
+        game.legal_moves()
+        size = self.cache.bytes
+        self.cache.resize(2 * size + 100)
+        # make_move caches the position after e2-e4 as well
+        for move in ("e2-e4", "e7-e5"):
+            game.make_move(MoveCode.parse(move))
+        game.legal_moves()
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertLessEqual(self.cache.bytes, self.cache.max_bytes)
+        # The start position was used least recently and is gone
+        self.assertIsNone(self.cache.get(Game()._cache_key()))
+
+    def test_disabled(self):
+        Game.move_cache = None
+        self.assertEqual(len(Game().legal_moves()), 20)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
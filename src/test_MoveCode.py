@@ -0,0 +1,87 @@
+import unittest
+from Chessboard import Game
+import MoveCode
+from Notation import parse_square
+import Piece
+from Piece import Knight, Position, Queen
+
+
+class MoveCodeTest(unittest.TestCase):
+    def test_round_trip(self):
+        e2, e4 = parse_square("e2"), parse_square("e4")
+        code = MoveCode.encode(e2, e4)
+        self.assertEqual(MoveCode.squares(code), (e2, e4))
+        self.assertIs(MoveCode.start_of(code), MoveCode.start_of(MoveCode.encode(e2, e2)))
+        self.assertIsNone(MoveCode.promotion_of(code))
+        self.assertEqual(MoveCode.to_uci(code), "e2e4")
+        self.assertEqual(MoveCode.to_notation(code), "e2-e4")
+
+        code = MoveCode.encode(parse_square("b7"), parse_square("b8"), Knight, MoveCode.CAPTURE)
+        self.assertIs(MoveCode.promotion_of(code), Knight)
+        self.assertTrue(code & MoveCode.CAPTURE)
+        self.assertEqual(MoveCode.to_uci(code), "b7b8n")
+        self.assertEqual(MoveCode.to_notation(code), "b7-b8=N")
+
+    def test_parse(self):
+        self.assertEqual(MoveCode.parse("e2e4"), MoveCode.parse("e2-e4"))
+        self.assertEqual(MoveCode.parse("a7a8q"), MoveCode.parse("a7-a8=Q"))
+        self.assertIs(MoveCode.promotion_of(MoveCode.parse("a7a8q")), Queen)
+        self.assertEqual(
+            MoveCode.squares(MoveCode.parse("Rd1xd8")), (parse_square("d1"), parse_square("d8"))
+        )
+        with self.assertRaises(ValueError):
+            MoveCode.parse("a7a8k")
+
+    def test_piece_move_codes(self):
+        game = Game.from_fen("4k3/P7/8/3pP3/8/8/8/4K3 w - d6 0 1")
+        pawn = game.get_piece_at(parse_square("e5"))
+        codes = {MoveCode.to_uci(code): code for code in pawn.move_codes()}
+        self.assertEqual(set(codes), {"e5e6", "e5d6"})
+        self.assertEqual(codes["e5d6"] & (MoveCode.CAPTURE | MoveCode.EN_PASSANT),
+                         MoveCode.CAPTURE | MoveCode.EN_PASSANT)
+        self.assertFalse(codes["e5e6"] & MoveCode.CAPTURE)
+        promotion = game.get_piece_at(parse_square("a7")).move_codes()
+        self.assertEqual([MoveCode.promotion_of(code) for code in promotion], [Queen])
+
+    def test_generators_produce_codes(self):
+        self.assertEqual(Piece.PROMOTE_TO_QUEEN, MoveCode.PROMOTION_CODES[Queen])
+        # A king on d1 that has not moved can castle towards the rook on h1
+        game = Game.from_fen("k7/8/8/8/8/8/8/3K3R w - - 0 1")
+        king = game.get_piece_at(parse_square("d1"))
+        king.has_moved = game.get_piece_at(parse_square("h1")).has_moved = False
+        castles = [code for code in king.move_codes() if code & MoveCode.CASTLE]
+        self.assertEqual([MoveCode.to_uci(code) for code in castles], ["d1f1"])
+        move = game.legal_moves()[MoveCode.squares(castles[0])]
+        self.assertEqual(move.code, castles[0])
+        self.assertTrue(move.is_castle)
+
+    def test_game_accepts_codes(self):
+        game = Game()
+        codes = game.legal_move_codes()
+        self.assertEqual(len(set(codes)), 20)
+        self.assertIn(MoveCode.parse("e2e4"), codes)
+        self.assertTrue(game.is_valid_move(MoveCode.parse("g1f3")))
+        self.assertFalse(game.is_valid_move(MoveCode.parse("e2e5")))
+        game.make_move(MoveCode.parse("e2e4"))
+        self.assertEqual(game.move_log[-1]['code'], MoveCode.parse("e2e4"))
+        with self.assertRaises(ValueError):
+            game.make_move(MoveCode.parse("e2e4"))
+
+    def test_underpromotion_is_rejected(self):
+        game = Game.from_fen("4k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        code = MoveCode.parse("a7a8n")
+        self.assertFalse(game.is_valid_move(code))
+        with self.assertRaises(ValueError):
+            game.make_move(code)
+        game.make_move(MoveCode.parse("a7a8q"))
+        self.assertIs(MoveCode.promotion_of(game.move_log[-1]['code']), Queen)
+
+    def test_move_record_code(self):
+        game = Game()
+        for (start, end), move in game.legal_moves().items():
+            self.assertEqual(MoveCode.squares(move.code), (start, end))
+        self.assertEqual(MoveCode.encode(Position(0, 0), Position(0, 0)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from Piece import Position
+import Notation
+
+
+class NotationTest(unittest.TestCase):
+    def test_square_table(self):
+        self.assertEqual(len(Notation.SQUARES), 64)
+        self.assertEqual(Notation.parse_square("a1"), Position(7, 0))
+        self.assertEqual(Notation.parse_square("h8"), Position(0, 7))
+
+    def test_invalid_square(self):
+        with self.assertRaises(ValueError):
+            Notation.parse_square("z9")
+
+    def test_parse_move(self):
+        move = Notation.parse_move("e2-e4")
+        self.assertEqual(move.start, Position(3, 1))
+        self.assertEqual(move.end, Position(3, 3))
+        self.assertIsNone(move.piece)
+        self.assertFalse(move.capture)
+
+    def test_parse_capture_with_markers(self):
+        move = Notation.parse_move("Qd1xd7#")
+        self.assertEqual(move.piece, "Q")
+        self.assertTrue(move.capture)
+        self.assertTrue(move.mate)
+        self.assertFalse(move.check)
+
+    def test_parse_promotion(self):
+        move = Notation.parse_move("b7-b8=N+")
+        self.assertEqual(move.end, Position(6, 7))
+        self.assertEqual(move.promotion, "N")
+        self.assertTrue(move.check)
+
+    def test_invalid_move(self):
+        for notation in ["e2e4", "Ra1-a9", "", "e2-e4=K"]:
+            with self.assertRaises(ValueError):
+                Notation.parse_move(notation)
+
+    def test_parse_moves(self):
+        moves = list(Notation.parse_move_text("e2-e4 e7-e5\nNg1-f3"))
+        self.assertEqual(len(moves), 3)
+        self.assertEqual(moves[2].piece, "N")
+        with self.assertRaises(ValueError):
+            list(Notation.parse_moves(["e2-e4", "bad"]))
+
+    def test_parse_fen(self):
+        fen = Notation.parse_fen("4k3/8/8/8/4P3/8/8/4K3 b - e3 0 1")
+        self.assertEqual(fen.board[0][3], "K")
+        self.assertEqual(fen.board[3][3], "P")
+        self.assertEqual(fen.board[7][3], "k")
+        self.assertEqual(fen.turn, "black")
+        self.assertEqual(fen.castling, "-")
+        self.assertEqual(fen.en_passant, Position(3, 2))
+
+    def test_invalid_fen(self):
+        with self.assertRaises(ValueError):
+            Notation.parse_fen("4k3/8/8/8/8/8/4K3 w - - 0 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
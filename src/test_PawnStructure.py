@@ -0,0 +1,68 @@
+import unittest
+from Chessboard import Game
+from Piece import Position
+import PawnStructure
+from PawnStructure import PawnCache, evaluate_pawns
+
+
+class PawnStructureTest(unittest.TestCase):
+    def test_start_position_is_symmetric(self):
+        entry = evaluate_pawns(Game())
+        self.assertEqual((entry.mg, entry.eg), (0, 0))
+        self.assertEqual(entry.passed, (0, 0))
+
+    def test_passed_doubled_and_isolated(self):
+        # White: doubled isolated pawns on the a-file, passed pawn on d5
+        game = Game.from_fen("4k3/5ppp/8/3P4/8/P7/P7/4K3 w - - 0 1")
+        entry = evaluate_pawns(game)
+        white_passed = entry.passed[0]
+        self.assertTrue(white_passed & (1 << (4 * 8 + 4)))
+        self.assertLess(
+            evaluate_pawns(Game.from_fen("4k3/8/8/8/8/P7/P7/4K3 w - - 0 1")).eg,
+            evaluate_pawns(Game.from_fen("4k3/8/8/8/8/8/PP6/4K3 w - - 0 1")).eg,
+        )
+
+    def test_pawn_key_changes_only_with_pawns(self):
+        game = Game()
+        key = game.pawn_key
+        game.make_move(Position(1, 0), Position(2, 2))
+        self.assertEqual(game.pawn_key, key)
+        game.make_move(Position(3, 6), Position(3, 4))
+        self.assertNotEqual(game.pawn_key, key)
+        game.undo_move()
+        self.assertEqual(game.pawn_key, key)
+
+    def test_pawn_key_after_capture_and_promotion(self):
+        game = Game.from_fen("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        key = game.pawn_key
+        game.make_move(Position(7, 6), Position(6, 7))
+        self.assertEqual(game.pawn_key, 0)
+        game.undo_move()
+        self.assertEqual(game.pawn_key, key)
+
+    def test_cache(self):
+        cache = PawnCache(size=8)
+        game = Game()
+        first = cache.probe(game)
+        game.make_move(Position(1, 0), Position(2, 2))
+        self.assertIs(cache.probe(game), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.hit_rate, 0.5)
+        cache.clear()
+        self.assertEqual(cache.hits, 0)
+        with self.assertRaises(ValueError):
+            PawnCache(size=10)
+
+    def test_king_shield(self):
+        sheltered = Game.from_fen("4k3/8/8/8/8/8/5PPP/6K1 w - - 0 1")
+        exposed = Game.from_fen("4k3/8/8/8/8/8/5PPP/1K6 w - - 0 1")
+        cache = PawnCache()
+        self.assertGreater(
+            PawnStructure.pawn_score(sheltered, cache)[0],
+            PawnStructure.pawn_score(exposed, cache)[0],
+        )
+        self.assertEqual(cache.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
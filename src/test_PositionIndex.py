@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from Chessboard import Game
+import MoveCode
+import PositionIndex
+from PositionIndex import PositionIndex as Index, build_index
+
+
+GAMES = [
+    "1. e2e4 e7e5 2. g1f3 b8c6 1-0",
+    "e2-e4 c7-c5 g1-f3",
+    "",
+    "d2d4 d7d5 c2c4",
+    "e2e4 e7e5 f1c4 e8e7 a2a3",
+    "e2e4 e7e5 e1e3 d7d5",
+]
+
+
+class PositionIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.directory.name, "games.txt")
+        self.path = os.path.join(self.directory.name, "games.idx")
+        with open(self.archive, "w") as f:
+            f.write("\n".join(GAMES) + "\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def position_after(self, moves):
+        game = Game()
+        for move in moves.split():
+            game.make_move(MoveCode.parse(move))
+        return game
+
+    def test_parse_game(self):
+        codes = PositionIndex.parse_game(GAMES[0])
+        self.assertEqual([MoveCode.to_uci(code) for code in codes], ["e2e4", "e7e5", "g1f3", "b8c6"])
+
+    def test_build_and_query(self):
+        # The last game stops before its illegal third move, after 3 positions
+        count = build_index(self.archive, self.path, processes=0, chunk_size=2)
+        self.assertEqual(count, 5 + 4 + 4 + 6 + 3)
+        with Index(self.path, self.archive) as index:
+            self.assertEqual(len(index), count)
+            self.assertEqual(len(index.offsets), 5)
+            self.assertEqual(sorted(index.lookup(Game())), [(i, 0) for i in range(5)])
+            position = self.position_after("e2e4 e7e5")
+            self.assertEqual(sorted(index.lookup(position)), [(0, 2), (3, 2), (4, 2)])
+            self.assertEqual(index.lookup(self.position_after("h2h3")), [])
+            self.assertEqual(index.continuations(position), {"g1f3": 1, "f1c4": 1, "e1e3": 1})
+            self.assertEqual(index.game_line(2), GAMES[3] + "\n")
+            self.assertEqual(index.lookup(position.position_key()), index.lookup(position))
+
+    def test_unreadable_move(self):
+        with open(self.archive, "w") as f:
+            f.write("e2e4 e7e5 g1f3 e4e5!? b8c6\n")
+        # The positions before the unreadable fourth move are indexed
+        self.assertEqual(build_index(self.archive, self.path, processes=0), 4)
+        with Index(self.path, self.archive) as index:
+            self.assertEqual(index.lookup(self.position_after("e2e4 e7e5 g1f3")), [(0, 3)])
+            self.assertEqual(index.continuations(self.position_after("e2e4 e7e5")), {"g1f3": 1})
+            self.assertEqual(index.continuations(self.position_after("e2e4 e7e5 g1f3")), {})
+
+    def test_parallel_build_matches_serial(self):
+        build_index(self.archive, self.path, processes=0)
+        with open(self.path, "rb") as f:
+            serial = f.read()
+        # One game per run and two runs per merge force several merge passes
+        with mock.patch.object(PositionIndex, "_FAN_IN", 2):
+            build_index(self.archive, self.path, processes=2, chunk_size=1)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), serial)
+
+    def test_rejects_other_files(self):
+        build_index(self.archive, self.path, processes=0)
+        with self.assertRaises(ValueError):
+            Index(self.archive)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import xml.dom.minidom
+from Chessboard import Game
+import MoveCode
+import Notation
+
+try:
+    import Render
+except ImportError:
+    Render = None
+
+
+@unittest.skipIf(Render is None, "svgwrite is not installed")
+class RenderTest(unittest.TestCase):
+    def test_board_to_svg(self):
+        document = xml.dom.minidom.parseString(Render.board_to_svg(Game()))
+        self.assertEqual(len(document.getElementsByTagName("rect")), 64)
+        self.assertEqual(len(document.getElementsByTagName("image")), 32)
+
+    def test_game_to_svg_scales_with_moves(self):
+        game = Game()
+        game.make_move(MoveCode.parse("e2e4"))
+        short = Render.game_to_svg(game)
+        game = Game()
+        for _ in range(10):
+            for move in ("g1f3", "g8f6", "f3g1", "f6g8"):
+                game.make_move(MoveCode.parse(move))
+        document = xml.dom.minidom.parseString(Render.game_to_svg(game))
+        # The board and the glyphs are defined once
+        self.assertEqual(len(document.getElementsByTagName("rect")), 64)
+        self.assertEqual(len(document.getElementsByTagName("image")), 12)
+        self.assertEqual(len(document.getElementsByTagName("use")), 33)
+        # Each knight move animates x and y
+        self.assertEqual(len(document.getElementsByTagName("animate")), 80)
+        self.assertLess(len(Render.game_to_svg(game)) - len(short), 40 * 200)
+
+    def test_game_to_svg_captures_and_promotions(self):
+        game = Game()
+        for move in "e2e4 d7d5 e4d5 g8f6 d5d6 f6e4 d6c7 e4d6 c7b8".split():
+            game.make_move(MoveCode.parse(move))
+        document = xml.dom.minidom.parseString(Render.game_to_svg(game))
+        sets = document.getElementsByTagName("set")
+        # Pawns on d5 and c7, the pawn that promotes and the knight on b8 are hidden
+        self.assertEqual([element.getAttribute("to") for element in sets].count("hidden"), 4)
+        queens = [
+            use for use in document.getElementsByTagName("use")
+            if use.getAttribute("xlink:href") == "#white_queen"
+        ]
+        self.assertEqual(len(queens), 2)
+        self.assertEqual(queens[1].getAttribute("visibility"), "hidden")
+
+    def test_positions_to_svg(self):
+        positions = [Notation.START_FEN, Game(), Game.from_fen("4k3/P7/8/8/8/8/8/4K3 w - - 0 1").to_record()]
+        sheet = Render.positions_to_svg(positions, columns=2)
+        document = xml.dom.minidom.parseString(sheet)
+        self.assertEqual(len(document.getElementsByTagName("rect")), 64)
+        self.assertEqual(len(document.getElementsByTagName("use")), 3 + 32 + 32 + 3)
+        self.assertEqual(document.documentElement.getAttribute("height"), "920px")
+        self.assertEqual(Render.positions_to_svg(positions, columns=2, processes=2, chunk_size=1), sheet)
+
+
+if __name__ == "__main__":
+    unittest.main()
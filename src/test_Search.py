@@ -0,0 +1,70 @@
+import unittest
+from Chessboard import Game
+from Notation import parse_square
+import Search
+
+
+def find_move(game, start, end):
+    return game.legal_moves()[(parse_square(start), parse_square(end))]
+
+
+class SearchTest(unittest.TestCase):
+    def test_capture_moves(self):
+        game = Game.from_fen("4k3/P7/8/3p4/4P3/8/8/4K3 w - - 0 1")
+        moves = {(move.start, move.end) for move in game.capture_moves()}
+        self.assertEqual(moves, {
+            (parse_square("e4"), parse_square("d5")),
+            (parse_square("a7"), parse_square("a8")),
+        })
+
+    def test_see_winning_and_losing_captures(self):
+        # Pawn takes a defended knight: wins a knight for a pawn
+        game = Game.from_fen("4k3/8/2p5/3n4/4P3/8/8/4K3 w - - 0 1")
+        self.assertEqual(game.see(find_move(game, "e4", "d5")), 320 - 100)
+        # Queen takes a pawn defended by a pawn
+        game = Game.from_fen("4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1")
+        self.assertEqual(game.see(find_move(game, "d1", "d5")), 100 - 900)
+
+    def test_see_x_ray(self):
+        # Doubled rooks win the pawn, the second rook attacks through the first
+        game = Game.from_fen("3rk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1")
+        self.assertEqual(game.see(find_move(game, "d2", "d5")), 100)
+
+    def test_see_king_cannot_recapture_defended(self):
+        game = Game.from_fen("8/8/8/3k4/2p5/3P4/8/4K3 w - - 0 1")
+        self.assertEqual(game.see(find_move(game, "d3", "c4")), 0)
+        game = Game.from_fen("8/8/8/3k4/2p5/1P1P4/8/4K3 w - - 0 1")
+        self.assertEqual(game.see(find_move(game, "d3", "c4")), 100)
+
+    def test_quiescence_avoids_losing_capture(self):
+        game = Game.from_fen("4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1")
+        stats = Search.SearchStats()
+        score = Search.quiescence(game, stats=stats)
+        self.assertGreater(score, 500)
+        self.assertGreater(stats.see_pruned, 0)
+        self.assertEqual(game.to_fen(), "4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1")
+
+    def test_quiescence_finds_winning_capture(self):
+        game = Game.from_fen("4k3/8/8/3q4/4P3/8/8/4K3 w - - 0 1")
+        self.assertGreater(Search.quiescence(game), 0)
+
+    def test_quiescence_checks_limits(self):
+        game = Game.from_fen("4k3/8/8/3q4/4P3/8/8/4K3 w - - 0 1")
+        calls = []
+
+        def check_limits():
+            calls.append(None)
+            if len(calls) > 1:
+                raise Search._Stopped()
+
+        with self.assertRaises(Search._Stopped):
+            Search.quiescence(game, check_limits=check_limits)
+        self.assertEqual(game.to_fen(), "4k3/8/8/3q4/4P3/8/8/4K3 w - - 0 1")
+
+    def test_quiescence_checkmated(self):
+        game = Game.from_fen("4k3/4Q3/4K3/8/8/8/8/8 b - - 0 1")
+        self.assertEqual(Search.quiescence(game), -Search.MATE)
+
+
+if __name__ == "__main__":
+    unittest.main()
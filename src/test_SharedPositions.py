@@ -0,0 +1,78 @@
+import unittest
+from Chessboard import Game
+from Piece import Position
+import PositionRecord
+from SharedPositions import SharedPositionBuffer, map_shared
+
+
+def count_white_moves(game):
+    return [len(game.legal_moves("white")), game.current_turn == "black"]
+
+
+class PositionRecordTest(unittest.TestCase):
+    def test_round_trip(self):
+        game = Game()
+        game.make_move(Position(3, 1), Position(3, 3))
+        record = game.to_record()
+        self.assertEqual(len(record), PositionRecord.RECORD_SIZE)
+        self.assertEqual(Game.from_record(record).to_fen(), game.to_fen())
+
+    def test_round_trip_fen(self):
+        fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b Kq - 0 1"
+        self.assertEqual(Game.from_record(Game.from_fen(fen).to_record()).to_fen(), fen)
+
+    def test_board_edit(self):
+        game = Game()
+        # The d2 pawn is taken off the board without going through the game
+        game.board[1][4] = None
+        expected = "rnbqkbnr/pppppppp/8/8/8/8/PPP1PPPP/RNBQKBNR w KQkq - 0 1"
+        self.assertEqual(Game.from_record(game.to_record()).to_fen(), expected)
+        self.assertNotEqual(game.snapshot(), Game().snapshot())
+
+    def test_invalid_record(self):
+        with self.assertRaises(ValueError):
+            Game.from_record(b"\x00" * 10)
+        with self.assertRaises(ValueError):
+            Game.from_record(b"\x0d" + b"\x00" * 65)
+
+
+class SharedPositionBufferTest(unittest.TestCase):
+    def test_push_and_read(self):
+        with SharedPositionBuffer(2, result_width=2) as buffer:
+            slot = buffer.push(Game())
+            self.assertEqual(buffer.game(slot).to_fen(), Game().to_fen())
+            buffer.set_result(slot, [20])
+            self.assertEqual(buffer.result(slot), (20, 0))
+            buffer.push(Game().to_record())
+            with self.assertRaises(BufferError):
+                buffer.push(Game())
+            buffer.release()
+            self.assertEqual(buffer.push(Game()), 0)
+
+    def test_map_shared(self):
+        game = Game()
+        game.make_move(Position(3, 1), Position(3, 3))
+        positions = [Game(), game, Game()]
+        results = list(map_shared(count_white_moves, positions, processes=2, capacity=2, result_width=2))
+        self.assertEqual(results, [(20, 0), (30, 1), (20, 0)])
+
+    def test_map_shared_refills_slots(self):
+        game = Game()
+        game.make_move(Position(3, 1), Position(3, 3))
+        pulled = []
+
+        def positions():
+            for i in range(10):
+                pulled.append(i)
+                yield game if i % 3 == 1 else Game()
+
+        results = map_shared(count_white_moves, positions(), processes=2, capacity=3, result_width=2, chunk_size=2)
+        self.assertEqual(next(results), (20, 0))
+        # Only the ring's capacity is read ahead of the consumer
+        self.assertLessEqual(len(pulled), 3)
+        expected = [(30, 1) if i % 3 == 1 else (20, 0) for i in range(1, 10)]
+        self.assertEqual(list(results), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
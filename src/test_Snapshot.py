@@ -0,0 +1,69 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from Chessboard import Game
+from Notation import parse_square
+from Piece import Pawn, Queen
+from Snapshot import PositionSnapshot
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_start_position(self):
+        snapshot = Game().snapshot()
+        self.assertEqual(snapshot.current_turn, "white")
+        self.assertEqual(len(snapshot.legal_moves()), 20)
+        self.assertEqual(snapshot.get_piece_at(parse_square("e2")), (Pawn, "white"))
+        self.assertEqual(snapshot.king_position("black"), parse_square("e8"))
+        self.assertFalse(snapshot.is_check())
+
+    def test_hashable_and_immutable(self):
+        first, second = Game().snapshot(), Game().snapshot()
+        self.assertEqual(first, second)
+        self.assertEqual(len({first, second}), 1)
+        with self.assertRaises(AttributeError):
+            first.record = b""
+
+    def test_play_returns_new_snapshot(self):
+        game = Game()
+        snapshot = game.snapshot()
+        after = snapshot.play(parse_square("e2"), parse_square("e4"))
+        self.assertEqual(snapshot, game.snapshot())
+        game.make_move(parse_square("e2"), parse_square("e4"))
+        self.assertEqual(after, game.snapshot())
+        self.assertEqual(after.to_game().to_fen(), game.to_fen())
+        with self.assertRaises(ValueError):
+            after.play(parse_square("e4"), parse_square("e5"))
+
+    def test_matches_game(self):
+        for fen in [
+            "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w Kq f6 0 1",
+            "4r1k1/8/8/8/8/8/4N3/4K3 w - - 0 1",
+            "4k3/P7/8/8/8/8/8/4K3 w - - 0 1",
+            # En passant takes the pawn giving check
+            "8/8/8/1k6/Pp6/8/8/4K3 b - a3 0 1",
+        ]:
+            game = Game.from_fen(fen)
+            snapshot = game.snapshot()
+            self.assertEqual(set(snapshot.legal_moves()), set(game.legal_moves()), fen)
+            self.assertEqual(snapshot.is_check(), game.is_check(game.current_turn))
+
+    def test_promotion(self):
+        snapshot = Game.from_fen("4k3/P7/8/8/8/8/8/4K3 w - - 0 1").snapshot()
+        after = snapshot.play(parse_square("a7"), parse_square("a8"))
+        self.assertEqual(after.get_piece_at(parse_square("a8")), (Queen, "white"))
+        self.assertTrue(after.is_check())
+
+    def test_checkmate_and_stalemate(self):
+        mate = Game.from_fen("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3")
+        self.assertTrue(mate.snapshot().is_checkmate())
+        stalemate = Game.from_fen("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")
+        self.assertTrue(stalemate.snapshot().is_stalemate())
+
+    def test_concurrent_reads(self):
+        snapshot = PositionSnapshot(Game().to_record())
+        with ThreadPoolExecutor(4) as pool:
+            counts = list(pool.map(lambda _: len(snapshot.legal_moves()), range(16)))
+        self.assertEqual(counts, [20] * 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
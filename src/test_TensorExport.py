@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from Chessboard import Game
+from Piece import Position
+import Notation
+
+try:
+    import numpy as np
+    import TensorExport
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TensorExportTest(unittest.TestCase):
+    def test_start_position(self):
+        tensors = TensorExport.encode_positions([Notation.START_FEN])
+        self.assertEqual(tensors.planes.shape, (1, 12, 8, 8))
+        self.assertEqual(tensors.planes.sum(), 32)
+        # White king on e1
+        self.assertEqual(tensors.planes[0, 5, 0, 3], 1)
+        # Black pawns fill rank 7
+        self.assertEqual(tensors.planes[0, 6, 6].tolist(), [1] * 8)
+        self.assertEqual(tensors.side_to_move.tolist(), [1])
+        self.assertEqual(tensors.castling.tolist(), [[1, 1, 1, 1]])
+        self.assertEqual(tensors.en_passant.sum(), 0)
+
+    def test_games_match_fens(self):
+        game = Game()
+        game.make_move(Position(3, 1), Position(3, 3))
+        fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b Kq - 0 1"
+        games = [game, Game.from_fen(fen)]
+        from_games = TensorExport.encode_positions(games)
+        from_fens = TensorExport.encode_positions([g.to_fen() for g in games])
+        for field in ("planes", "side_to_move", "castling", "en_passant"):
+            np.testing.assert_array_equal(getattr(from_games, field), getattr(from_fens, field))
+        self.assertEqual(from_fens.en_passant[0, 3], 1)
+        self.assertEqual(from_fens.castling[1].tolist(), [1, 0, 0, 1])
+
+    def test_board_edit(self):
+        game = Game()
+        # The d2 pawn is taken off the board without going through the game
+        game.board[1][4] = None
+        tensors = TensorExport.encode_positions([game])
+        self.assertEqual(tensors.planes.sum(), 31)
+        self.assertEqual(tensors.planes[0, 0, 1, 4], 0)
+
+    def test_preallocated_buffer(self):
+        out = TensorExport.allocate(3)
+        out.planes[:] = 1
+        TensorExport.encode_positions([Game()], out, offset=1)
+        self.assertEqual(out.planes[1].sum(), 32)
+        self.assertEqual(out.planes[0].sum(), 12 * 64)
+        with self.assertRaises(ValueError):
+            TensorExport.encode_positions([Game(), Game()], out, offset=2)
+
+    def test_invalid_fen(self):
+        with self.assertRaises(ValueError):
+            TensorExport.encode_positions(["rnbqkbnr/ppxppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1"])
+
+    def test_export_shards(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = TensorExport.export_shards(
+                (Notation.START_FEN for _ in range(5)), directory, shard_size=2
+            )
+            self.assertEqual(len(paths), 3)
+            shard = TensorExport.load_shard(paths[-1])
+            self.assertEqual(len(shard), 1)
+            self.assertEqual(shard.planes.sum(), 32)
+            self.assertTrue(os.path.exists(paths[0] + "_castling.npy"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from Chessboard import Game
+import Evaluation
+import Notation
+
+try:
+    import numpy as np
+    import Tuning
+except ImportError:
+    np = None
+
+
+POSITIONS = [
+    (Notation.START_FEN, 0.5),
+    ("4k3/8/8/8/8/8/8/3QK3 w - - 0 1", 1.0),
+    ("4k3/8/8/8/8/8/3q4/4K3 w - - 0 1", 0.0),
+    ("4k3/pppp4/8/8/8/8/PPP5/4K3 b - - 0 1", 0.0),
+    ("r3k3/8/8/8/8/8/8/R3K2R w - - 0 1", 1.0),
+]
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TuningTest(unittest.TestCase):
+    def test_parse_labelled(self):
+        self.assertEqual(Tuning.parse_labelled(f"{Notation.START_FEN} 1/2-1/2\n"), (Notation.START_FEN, 0.5))
+        self.assertEqual(Tuning.parse_labelled(f"{Notation.START_FEN}; 1-0"), (Notation.START_FEN, 1.0))
+        self.assertEqual(Tuning.parse_labelled(f"{Notation.START_FEN} 0.25"), (Notation.START_FEN, 0.25))
+
+    def test_batch_evaluation_matches_game(self):
+        features = Tuning.extract_features(POSITIONS)
+        scores = Tuning.evaluate_batch(Tuning.initial_weights(), features)
+        for (fen, _), score in zip(POSITIONS, scores):
+            game = Game.from_fen(fen)
+            expected = Evaluation.taper(game.mg_score, game.eg_score, game.phase)
+            self.assertAlmostEqual(score, expected, delta=1)
+
+    def test_gradient(self):
+        features = Tuning.extract_features(POSITIONS)
+        weights = Tuning.initial_weights()
+        gradient = Tuning._gradient(weights, features, 1.0)
+        # Compare with a finite difference on the white queen of d1
+        feature = Tuning.PIECE_TYPES.index(Evaluation.Queen) * 64 + 59
+        for row in (0, 1):
+            shifted = weights.copy()
+            shifted[row, feature] += 1e-3
+            numeric = (Tuning.loss(shifted, features) - Tuning.loss(weights, features)) / 1e-3
+            self.assertAlmostEqual(gradient[row, feature], numeric, places=6)
+
+    def test_tune_reduces_loss(self):
+        features = Tuning.extract_features(POSITIONS)
+        weights = Tuning.initial_weights()
+        tuned = Tuning.tune(features, weights, epochs=20, batch_size=2)
+        self.assertLess(Tuning.loss(tuned, features), Tuning.loss(weights, features))
+        self.assertEqual(weights.tolist(), Tuning.initial_weights().tolist())
+
+    def test_memory_mapped_features_and_tables(self):
+        with tempfile.TemporaryDirectory() as directory:
+            base = os.path.join(directory, "features")
+            Tuning.extract_features(POSITIONS, base)
+            features = Tuning.load_features(base)
+            self.assertIsInstance(features.indices, np.memmap)
+            self.assertEqual(len(features), len(POSITIONS))
+
+            path = os.path.join(directory, "tables.json")
+            Tuning.save_tables(path, Tuning.initial_weights())
+            tables_mg, tables_eg = Tuning.load_tables(path)
+            self.assertEqual(tables_mg, Evaluation.TABLES_MG)
+            self.assertEqual(tables_eg, Evaluation.TABLES_EG)
+            del features
+
+
+if __name__ == "__main__":
+    unittest.main()
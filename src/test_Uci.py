@@ -0,0 +1,112 @@
+import time
+import unittest
+from Search import Searcher
+from Uci import UciEngine
+
+
+class UciTest(unittest.TestCase):
+    def setUp(self):
+        self.lines = []
+        self.engine = UciEngine(self.lines.append)
+
+    def tearDown(self):
+        self.engine.handle("quit")
+
+    def bestmove(self):
+        return [line for line in self.lines if line.startswith("bestmove")]
+
+    def test_handshake(self):
+        self.engine.handle("uci")
+        self.engine.handle("isready")
+        self.assertEqual(self.lines[-2:], ["uciok", "readyok"])
+        self.assertFalse(self.engine.handle("quit"))
+
+    def test_position_is_applied_incrementally(self):
+        self.engine.handle("position startpos moves e2e4 e7e5")
+        game = self.engine.game
+        self.engine.handle("position startpos moves e2e4 e7e5 g1f3")
+        self.assertIs(self.engine.game, game)
+        self.assertEqual(len(game.move_log), 3)
+        # A different continuation only takes back the moves that differ
+        self.engine.handle("position startpos moves e2e4 c7c5")
+        self.assertIs(self.engine.game, game)
+        self.assertEqual(game.to_fen(), "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2")
+
+    def test_position_fen(self):
+        self.engine.handle("position fen 4k3/P7/8/8/8/8/8/4K3 w - - 0 1 moves a7a8q")
+        self.assertEqual(self.engine.game.to_fen(), "Q3k3/8/8/8/8/8/8/4K3 b - - 0 1")
+
+    def test_position_underpromotion_is_rejected(self):
+        self.engine.handle("position fen 4k3/P7/8/8/8/8/8/4K3 w - - 0 1 moves a7a8n")
+        # Only promotion to a queen is supported, the pawn stays on a7
+        self.assertEqual(self.engine.game.to_fen(), "4k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        self.assertEqual(self.engine.moves, [])
+        self.assertTrue(any(line.startswith("info string error") for line in self.lines))
+
+    def test_go_depth_finds_mate(self):
+        fen = "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 0 1"
+        self.engine.handle(f"position fen {fen}")
+        self.engine.handle("go depth 2")
+        self.engine.wait()
+        self.assertEqual(self.bestmove(), ["bestmove f3f7"])
+        self.assertTrue(any("score mate 1" in line for line in self.lines))
+
+    def test_go_nodes(self):
+        self.engine.handle("position startpos")
+        self.engine.handle("go nodes 50")
+        self.engine.wait()
+        self.assertEqual(len(self.bestmove()), 1)
+        self.assertLess(self.engine.searcher.stats.nodes, 200)
+
+    def test_infinite_search_answers_isready_and_stop(self):
+        self.engine.handle("position startpos")
+        self.engine.handle("go infinite")
+        self.engine.handle("isready")
+        self.assertIn("readyok", self.lines)
+        self.assertEqual(self.bestmove(), [])
+        self.engine.handle("stop")
+        self.assertEqual(len(self.bestmove()), 1)
+
+    def test_stop_before_search_starts(self):
+        run = self.engine.searcher.run
+
+        def delayed_run(*args):
+            # The stop command arrives before the search thread is scheduled
+            time.sleep(0.05)
+            return run(*args)
+
+        self.engine.searcher.run = delayed_run
+        self.engine.handle("position startpos")
+        self.engine.handle("go infinite")
+        self.engine.handle("stop")
+        self.assertEqual(len(self.bestmove()), 1)
+
+    def test_bad_commands_are_reported(self):
+        self.assertTrue(self.engine.handle("go wtime abc"))
+        # Game does not play castling, so the position stops before it
+        self.assertTrue(self.engine.handle("position fen r3k3/8/8/8/8/8/8/4K2R w Kq - 0 1 moves e1g1"))
+        self.assertEqual([line.startswith("info string error") for line in self.lines], [True, True])
+        self.engine.handle("position startpos moves e2e4")
+        self.assertEqual(len(self.engine.game.move_log), 1)
+
+    def test_ponderhit(self):
+        self.engine.handle("position startpos moves e2e4")
+        self.engine.handle("go ponder movetime 50")
+        time.sleep(0.1)
+        self.assertEqual(self.bestmove(), [])
+        self.engine.handle("ponderhit")
+        self.engine.wait()
+        self.assertEqual(len(self.bestmove()), 1)
+
+    def test_searcher_leaves_game_untouched(self):
+        self.engine.handle("position startpos moves d2d4")
+        fen = self.engine.game.to_fen()
+        result = Searcher().search(self.engine.game, depth=2)
+        self.assertEqual(self.engine.game.to_fen(), fen)
+        self.assertEqual(result.depth, 2)
+        self.assertIs(result.pv[0], result.move)
+        self.assertIn((result.move.start, result.move.end), self.engine.game.legal_moves())
+
+
+if __name__ == "__main__":
+    unittest.main()
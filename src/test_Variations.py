@@ -0,0 +1,81 @@
+import unittest
+from Chessboard import Game
+import MoveCode
+from Variations import CHECK, CHECKMATE, ONGOING, STALEMATE, VariationTree
+
+
+class VariationsTest(unittest.TestCase):
+    def test_lines_share_prefixes(self):
+        tree = VariationTree(Game())
+        tree.add_line(["e2e4", "e7e5", "g1f3"])
+        tree.add_line(["e2e4", "e7e5", "f1c4"], tree.root)
+        sicilian = tree.add_line(["e2e4", "c7c5"], tree.root)
+        self.assertEqual(len(tree), 1 + 2 + 2 + 1)
+        self.assertEqual(sorted(" ".join(leaf.line()) for leaf in tree.leaves()), [
+            "e2e4 c7c5", "e2e4 e7e5 f1c4", "e2e4 e7e5 g1f3",
+        ])
+        self.assertIs(tree.current, sicilian)
+        self.assertEqual(sicilian.ply, 2)
+        # Replaying a known move reuses its node
+        tree.goto(tree.root)
+        self.assertIs(tree.play("e2-e4"), sicilian.parent)
+        self.assertEqual(len(tree), 6)
+
+    def test_goto_between_siblings(self):
+        tree = VariationTree(Game())
+        italian = tree.add_line(["e2e4", "e7e5", "g1f3", "b8c6", "f1c4"])
+        spanish = tree.add_line(["f1b5"], italian.parent)
+        game = tree.game
+        moves = []
+        original_make_move = game.make_move
+        game.make_move = lambda *args: moves.append(args) or original_make_move(*args)
+        tree.goto(italian)
+        self.assertEqual(len(moves), 1)
+        self.assertEqual(game.to_fen(), "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 0 3")
+        tree.goto(spanish)
+        tree.goto(tree.root)
+        self.assertEqual(game.to_fen(), Game().to_fen())
+        tree.goto(spanish)
+        self.assertEqual(len(moves), 7)
+        self.assertEqual(MoveCode.to_uci(game.move_log[-1]['code']), "f1b5")
+
+    def test_status_is_cached(self):
+        tree = VariationTree(Game())
+        mate = tree.add_line(["f2f3", "e7e5", "g2g4", "d8h4"])
+        self.assertEqual(tree.status(tree.root), ONGOING)
+        self.assertEqual(tree.status(mate), CHECKMATE)
+        tree.goto(tree.root)
+        self.assertEqual(tree.status(mate), CHECKMATE)
+        self.assertIs(tree.current, tree.root)
+
+        tree = VariationTree(Game.from_fen("7k/8/5K2/6Q1/8/8/8/8 w - - 0 1"))
+        self.assertEqual(tree.status(tree.add_line(["g5g6"])), STALEMATE)
+        self.assertEqual(tree.status(tree.add_line(["g5h5"], tree.root)), CHECK)
+
+    def test_annotations_and_remove(self):
+        tree = VariationTree(Game())
+        node = tree.add_line(["e2e4", "e7e5"])
+        tree.annotate(node.parent, "Best by test", [1])
+        tree.annotate(node.parent, nags=[1, 3])
+        self.assertEqual(node.parent.comment, "Best by test")
+        self.assertEqual(node.parent.nags, [1, 3])
+        tree.remove(node.parent)
+        self.assertIs(tree.current, tree.root)
+        self.assertEqual(len(tree), 1)
+        self.assertEqual(tree.game.to_fen(), Game().to_fen())
+        with self.assertRaises(ValueError):
+            tree.remove(tree.root)
+
+    def test_illegal_move_adds_nothing(self):
+        game = Game()
+        tree = VariationTree(game)
+        with self.assertRaises(ValueError):
+            tree.play("e2e5")
+        self.assertEqual(len(tree), 1)
+        tree.play("e2e4")
+        # The tree works on its own copy
+        self.assertEqual(game.move_log, [])
+
+
+if __name__ == "__main__":
+    unittest.main()